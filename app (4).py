@@ -20,7 +20,7 @@ import plotly.graph_objects as go
 import traceback
 import xml.etree.ElementTree as ET
 
-from neo4j_handler import Neo4jHandler
+from neo4j_handler import get_neo4j_handler
 from rag_module import RAGSystem
 from sentiment_module import SentimentAnalyzer
 from translation_module import TranslationSystem
@@ -48,7 +48,7 @@ class AutomotiveAssistantApp:
         logger.info("="*60)
         
         try:
-            self.neo4j = Neo4jHandler()
+            self.neo4j = get_neo4j_handler()
             self.rag = RAGSystem(self.neo4j)
             self.sentiment = SentimentAnalyzer()
             self.translator = TranslationSystem()
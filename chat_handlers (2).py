@@ -218,7 +218,7 @@ def process_text_chat_with_session(app, message, history, session_token, session
                 'preferred_language': 'en',
                 'email_collected': bool(user_email),
                 'email_gate_shown': False,
-                'viewed_vehicles': [],
+                'viewed_vehicles': {},  # ordered set of vehicle ids
                 'interests': [],
                 'last_intent': None,
                 'email_prompted': False
@@ -7,9 +7,18 @@ chatbot_module.py - FIXED VERSION
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime
+import logging.handlers
+import queue
+import atexit
+import collections
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
 import uuid
+import secrets
 import re
 from sentiment_response_handler import SentimentResponseHandler
 from gradio_agent_transfer import GradioAgentTransfer
@@ -17,6 +26,909 @@ from gradio_agent_transfer import GradioAgentTransfer
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ✅ Log through a queue so request threads only enqueue records;
+# a background listener formats them and does the actual I/O
+
+
+class _RawQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that enqueues the record as-is
+    
+    The stdlib prepare() formats the message on the caller's thread; here the
+    %-args are merged by the listener instead, so objects passed as log args
+    must not be mutated right after the call.
+    """
+    
+    def prepare(self, record):
+        return record
+
+
+class _RootDispatchHandler(logging.Handler):
+    """Listener-side handler: hands records to whatever handlers the root logger has"""
+    
+    def emit(self, record):
+        logging.getLogger().handle(record)
+
+
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, _RootDispatchHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger.addHandler(_RawQueueHandler(_log_queue))
+# Records reach the root handlers via the listener only (not a second time synchronously)
+logger.propagate = False
+
+
+# Button-command prefixes for the feedback handlers
+_FEEDBACK_PREFIX = "💬 FEEDBACK:"
+_DRIVE_FEEDBACK_PREFIX = "💬 DRIVE_FEEDBACK:"
+
+# All machine-generated button commands (routed before translation/agent)
+_BUTTON_COMMAND_PREFIXES = ('🚗 BOOK_START:', '📋 DETAILS_SUBMITTED:', 
+                            '📍 LOCATION_TYPE:', '📍 BRANCH_SELECTED:', 
+                            '📍 ADDRESS_SUBMITTED:', '📅 SELECT_DATE:', 
+                            '⏰ CONFIRM_BOOKING:', '🔄 RESCHEDULE:', 
+                            '❌ CANCEL:', _FEEDBACK_PREFIX, _DRIVE_FEEDBACK_PREFIX,
+                            '🆘 ESCALATE:', '🔚 END_AGENT_SESSION',
+                            'CONFIRM_AGENT_TRANSFER:')
+
+# Batched feedback writer: flush window (seconds) and max records per flush
+_FEEDBACK_FLUSH_INTERVAL = 0.05
+_FEEDBACK_BATCH_SIZE = 100
+_FEEDBACK_MAX_ATTEMPTS = 3
+
+# Feedback writer queries per record kind (all idempotent so a failed batch can be replayed)
+_FEEDBACK_QUERIES = {
+    'cancel': (
+        """
+        UNWIND $rows AS r
+        MATCH (b:TestDriveBooking {booking_id: r.booking_id})
+        SET b.cancellation_feedback = r.feedback_type,
+            b.feedback_sentiment = r.sentiment,
+            b.feedback_score = r.sentiment_score,
+            b.feedback_timestamp = r.now
+        """,
+        """
+        UNWIND $rows AS r
+        MERGE (l:Lead {email: r.email})
+        ON CREATE SET 
+            l.id = r.lead_id,
+            l.name = r.name,
+            l.created_at = r.now
+        SET l.status = r.status,
+            l.sentiment = r.sentiment,
+            l.last_interaction = r.now,
+            l.cancellation_reason = r.feedback_type,
+            l.notes = r.notes
+        """,
+    ),
+    'drive': (
+        """
+        UNWIND $rows AS r
+        MATCH (b:TestDriveBooking {booking_id: r.booking_id})
+        SET b.drive_rating = r.rating,
+            b.drive_sentiment = r.sentiment,
+            b.drive_sentiment_score = r.sentiment_score,
+            b.feedback_timestamp = r.now,
+            b.status = 'completed'
+        """,
+        """
+        UNWIND $rows AS r
+        MERGE (l:Lead {email: r.email})
+        ON CREATE SET 
+            l.id = r.lead_id,
+            l.name = r.name,
+            l.created_at = r.now
+        SET l.status = r.status,
+            l.sentiment = r.sentiment,
+            l.last_interaction = r.now,
+            l.test_drive_rating = r.rating,
+            l.notes = r.notes
+        """,
+    ),
+    'escalation': (
+        """
+        UNWIND $rows AS r
+        MERGE (e:Escalation {id: r.id})
+        ON CREATE SET
+            e.type = r.type,
+            e.customer_email = r.email,
+            e.customer_name = r.name,
+            e.status = 'pending',
+            e.priority = 'high',
+            e.created_at = r.now,
+            e.session_id = r.session_id
+        """,
+    ),
+}
+
+# Batched message writer: flush interval (seconds) and per-session batch size
+_MESSAGE_FLUSH_INTERVAL = 1.0
+_MESSAGE_BATCH_SIZE = 20
+
+# Message-write circuit breaker: after N consecutive failed batches, skip Neo4j
+# for a blackout window and hold batches locally for a later retry
+_NEO4J_FAILURE_THRESHOLD = 3
+_NEO4J_BLACKOUT_SECONDS = 30.0
+_PENDING_BATCHES_MAX = 500
+
+# Background persistence pool; beyond the pending limit writes run inline (backpressure)
+_WRITE_POOL_WORKERS = 4
+_WRITE_PENDING_LIMIT = 256
+
+# Messages returned per conversation by get_conversation_history_by_email
+_HISTORY_MESSAGES_PER_CONVERSATION = 20
+
+# Message sentiment is stored as a small int code; anything else (mixed,
+# greeting, ...) is neutral. Score = base + slope * confidence, indexed by code.
+SENTIMENT_NEUTRAL, SENTIMENT_POSITIVE, SENTIMENT_NEGATIVE, SENTIMENT_SEVERE_NEGATIVE = range(4)
+_SENTIMENT_CODES = {
+    'positive': SENTIMENT_POSITIVE,
+    'negative': SENTIMENT_NEGATIVE,
+    'severe_negative': SENTIMENT_SEVERE_NEGATIVE,
+}
+_SENTIMENT_SCORE_COEFFS = (
+    (0.5, 0.0),    # neutral / mixed: 0.5
+    (0.5, 0.5),    # positive: 0.5-1.0
+    (0.5, -0.3),   # negative: 0.2-0.5
+    (0.2, -0.2),   # severe_negative: 0.0-0.2
+)
+
+# Sentiment cache: only short messages are cached to bound memory
+_SENTIMENT_CACHE_SIZE = 4096
+_SENTIMENT_CACHE_MAX_LEN = 200
+
+# Prompts injected by the CTA buttons - fixed purchase-intent text with no
+# sentiment signal; these and button commands are scored neutral without a model call
+_BUTTON_MESSAGES = frozenset({
+    "Tell me about financing options",
+    "I want to make an offer",
+    "What documents do I need to purchase?",
+})
+_SENTIMENT_SKIP_PREFIXES = _BUTTON_COMMAND_PREFIXES + ('/',)
+_NEUTRAL_SENTIMENT = (SENTIMENT_NEUTRAL, 0.5)
+
+# Precompiled patterns for message cleaning / HTML minification
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w')
+
+# Financial report keywords (substring match, case-insensitive) - one C-level scan
+_FINANCIAL_KEYWORDS = (
+    'revenue', 'profit', 'sales', 'earnings', 'financial', 'income',
+    'quarterly', 'annual', 'report', 'performance', 'margin',
+    'cash flow', 'balance sheet', 'r&d', 'operating', 'net income',
+    'market share', 'delivery', 'production', 'units sold'
+)
+_FINANCIAL_QUERY_RE = re.compile('|'.join(map(re.escape, _FINANCIAL_KEYWORDS)), re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+_INTERTAG_WS_RE = re.compile(r'>\s+<')
+
+# HTML-escape table for user-supplied values (single C-level translate pass)
+_HTML_ESCAPE = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'
+})
+
+
+def _minify_html(html: str) -> str:
+    """Collapse indentation/newlines in static HTML (run once at import)"""
+    html = _INTERTAG_WS_RE.sub('><', html)
+    return _WS_RE.sub(' ', html).strip()
+
+
+# ✅ Static feedback pickers - minified once at import, only the dynamic
+# slots are filled per request
+_FEEDBACK_PICKER_HTML = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #e5e7eb; margin: 15px 0;'>
+    <h4 style='color: #374151; margin: 0 0 15px 0;'>📝 Why did you cancel?</h4>
+    <p style='color: #6b7280; font-size: 0.9em; margin: 0 0 15px 0;'>
+        Please select the option that best describes your reason:
+    </p>
+    
+    <div style='display: grid; gap: 10px;'>
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {
+                chatInput.value = "💬 FEEDBACK:changed_mind";
+                chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }
+        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
+                 padding: 12px; border-radius: 8px; cursor: pointer; 
+                 font-weight: 500; text-align: left; transition: all 0.2s;'
+           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
+           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
+            🤔 Changed my mind / Not interested anymore
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {
+                chatInput.value = "💬 FEEDBACK:schedule_conflict";
+                chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }
+        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
+                 padding: 12px; border-radius: 8px; cursor: pointer; 
+                 font-weight: 500; text-align: left; transition: all 0.2s;'
+           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
+           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
+            📅 Schedule conflict / Will reschedule later
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {
+                chatInput.value = "💬 FEEDBACK:found_better";
+                chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }
+        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
+                 padding: 12px; border-radius: 8px; cursor: pointer; 
+                 font-weight: 500; text-align: left; transition: all 0.2s;'
+           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
+           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
+            🚗 Found a better option elsewhere
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {
+                chatInput.value = "💬 FEEDBACK:price_concern";
+                chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }
+        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
+                 padding: 12px; border-radius: 8px; cursor: pointer; 
+                 font-weight: 500; text-align: left; transition: all 0.2s;'
+           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
+           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
+            💰 Price concerns / Budget issues
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {
+                chatInput.value = "💬 FEEDBACK:poor_service";
+                chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }
+        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
+                 padding: 12px; border-radius: 8px; cursor: pointer; 
+                 font-weight: 500; text-align: left; transition: all 0.2s;'
+           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
+           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
+            😞 Unhappy with service / experience
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {
+                chatInput.value = "💬 FEEDBACK:other";
+                chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }
+        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
+                 padding: 12px; border-radius: 8px; cursor: pointer; 
+                 font-weight: 500; text-align: left; transition: all 0.2s;'
+           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
+           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
+            💭 Other reason
+        </button>
+    </div>
+</div>
+
+<div style='padding: 15px; background: #f0f9ff; border-radius: 10px; 
+            border-left: 4px solid #3b82f6; margin: 15px 0;'>
+    <p style='margin: 0; color: #1e40af; font-size: 0.9em;'>
+        💙 <strong>Your feedback helps us improve!</strong> We appreciate your honesty.
+    </p>
+</div>
+""")
+
+_DRIVE_FEEDBACK_PICKER_TMPL = _minify_html("""
+<div style='padding: 20px; background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
+            border-radius: 12px; color: white; margin: 15px 0;'>
+    <h3 style='margin: 0 0 10px 0;'>🎉 How Was Your Test Drive?</h3>
+    <p style='margin: 0; opacity: 0.95;'>
+        Hi {customer_name}! We hope you enjoyed your test drive experience.
+    </p>
+</div>
+
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #e5e7eb; margin: 15px 0;'>
+    <h4 style='color: #374151; margin: 0 0 15px 0;'>⭐ Rate Your Experience</h4>
+    <p style='color: #6b7280; font-size: 0.9em; margin: 0 0 15px 0;'>
+        Your feedback helps us improve our service
+    </p>
+    
+    <div style='display: grid; gap: 10px;'>
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {{
+                chatInput.value = "💬 DRIVE_FEEDBACK:excellent|{booking_id}";
+                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }}
+        ' style='background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
+                 color: white; border: none; padding: 15px; 
+                 border-radius: 10px; cursor: pointer; 
+                 font-weight: 600; text-align: center; transition: all 0.2s;'
+           onmouseover='this.style.transform="scale(1.02)";'
+           onmouseout='this.style.transform="scale(1)";'>
+            😍 Excellent - I loved it!
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {{
+                chatInput.value = "💬 DRIVE_FEEDBACK:good|{booking_id}";
+                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }}
+        ' style='background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%); 
+                 color: white; border: none; padding: 15px; 
+                 border-radius: 10px; cursor: pointer; 
+                 font-weight: 600; text-align: center; transition: all 0.2s;'
+           onmouseover='this.style.transform="scale(1.02)";'
+           onmouseout='this.style.transform="scale(1)";'>
+            😊 Good - It was nice
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {{
+                chatInput.value = "💬 DRIVE_FEEDBACK:neutral|{booking_id}";
+                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }}
+        ' style='background: linear-gradient(135deg, #f59e0b 0%, #d97706 100%); 
+                 color: white; border: none; padding: 15px; 
+                 border-radius: 10px; cursor: pointer; 
+                 font-weight: 600; text-align: center; transition: all 0.2s;'
+           onmouseover='this.style.transform="scale(1.02)";'
+           onmouseout='this.style.transform="scale(1)";'>
+            😐 Okay - It was average
+        </button>
+        
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {{
+                chatInput.value = "💬 DRIVE_FEEDBACK:poor|{booking_id}";
+                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }}
+        ' style='background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%); 
+                 color: white; border: none; padding: 15px; 
+                 border-radius: 10px; cursor: pointer; 
+                 font-weight: 600; text-align: center; transition: all 0.2s;'
+           onmouseover='this.style.transform="scale(1.02)";'
+           onmouseout='this.style.transform="scale(1)";'>
+            😞 Poor - Not satisfied
+        </button>
+    </div>
+</div>
+
+<div style='padding: 15px; background: #ecfdf5; border-radius: 10px; 
+            border-left: 4px solid #10b981; margin: 15px 0;'>
+    <p style='margin: 0; color: #065f46; font-size: 0.9em;'>
+        💚 <strong>Your honest feedback matters!</strong> It helps us serve you better.
+    </p>
+</div>
+""")
+
+# ✅ Feedback response blocks - same treatment as the pickers above
+_FEEDBACK_RESPONSE_TMPL = _minify_html("""
+<div style='padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            border-radius: 12px; color: white; margin: 15px 0;'>
+    <h3 style='margin: 0 0 10px 0; display: flex; align-items: center; gap: 10px;'>
+        <span style='font-size: 1.5em;'>{emoji}</span>
+        <span>Thank You for Your Feedback!</span>
+    </h3>
+    <p style='margin: 0; opacity: 0.95;'>
+        {response}
+    </p>
+</div>
+""")
+
+# ✅ Chat-input CTA buttons are generated from tables of
+# (prompt, style, hover-in, hover-out, label) rows and one shared template
+_WARM_FOLLOWUP_CTA_BUTTONS = (
+    ("Show me vehicles within my budget",
+     "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border: none; padding: 12px; border-radius: 8px; cursor: pointer; font-weight: 600;",
+     'this.style.opacity="0.9";', 'this.style.opacity="1";',
+     "💰 Show Budget-Friendly Options"),
+    ("Tell me about financing options",
+     "background: white; color: #667eea; border: 2px solid #667eea; padding: 12px; border-radius: 8px; cursor: pointer; font-weight: 600;",
+     'this.style.background="#f9fafb";', 'this.style.background="white";',
+     "📊 Explore Financing Options"),
+    ("Show me similar vehicles to {vehicle_name}",
+     "background: white; color: #667eea; border: 2px solid #667eea; padding: 12px; border-radius: 8px; cursor: pointer; font-weight: 600;",
+     'this.style.background="#f9fafb";', 'this.style.background="white";',
+     "🔍 See Similar Vehicles"),
+)
+
+# Purchase-intent buttons (hot lead follow-up)
+_HOT_LEAD_CTA_BUTTONS = (
+    ("Tell me about financing options",
+     "background: linear-gradient(135deg, #10b981 0%, #059669 100%); color: white; border: none; padding: 14px; border-radius: 10px; cursor: pointer; font-weight: 600;",
+     'this.style.opacity="0.9";', 'this.style.opacity="1";',
+     "💰 Explore Financing Options"),
+    ("I want to make an offer",
+     "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border: none; padding: 14px; border-radius: 10px; cursor: pointer; font-weight: 600;",
+     'this.style.opacity="0.9";', 'this.style.opacity="1";',
+     "🤝 Make an Offer"),
+    ("What documents do I need to purchase?",
+     "background: white; color: #667eea; border: 2px solid #667eea; padding: 14px; border-radius: 10px; cursor: pointer; font-weight: 600;",
+     'this.style.background="#f9fafb";', 'this.style.background="white";',
+     "📄 Purchase Information"),
+)
+
+_CTA_BUTTON_TMPL = """
+        <button onclick='
+            var chatInput = document.querySelector("#chat_input textarea") || 
+                           document.querySelector("textarea[placeholder*=\\"message\\"]");
+            if (chatInput) {{
+                chatInput.value = "{prompt}";
+                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
+                var sendBtn = document.querySelector("#send_btn") || 
+                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+                if (sendBtn) sendBtn.click();
+            }}
+        ' style='{style}'
+           onmouseover='{hover_in}'
+           onmouseout='{hover_out}'>
+            {label}
+        </button>
+"""
+
+
+def _render_cta_buttons(buttons, escape_braces: bool = False) -> str:
+    """Render a CTA button table; escape_braces keeps the result str.format-safe
+    (prompts may still carry {placeholders} for the enclosing template)"""
+    parts = []
+    for prompt, style, hover_in, hover_out, label in buttons:
+        html = _CTA_BUTTON_TMPL.format(prompt="\0", style=style, hover_in=hover_in,
+                                       hover_out=hover_out, label=label)
+        if escape_braces:
+            html = html.replace("{", "{{").replace("}", "}}")
+        parts.append(html.replace("\0", prompt))
+    return "".join(parts)
+
+
+_FEEDBACK_WARM_FOLLOWUP_TMPL = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #fbbf24; margin: 15px 0;'>
+    <h4 style='color: #f59e0b; margin: 0 0 15px 0;'>🌟 We'd Love to Keep Helping!</h4>
+    <p style='color: #374151; margin: 0 0 15px 0;'>
+        Based on your feedback, here are some ways I can assist:
+    </p>
+    
+    <div style='display: grid; gap: 10px;'>
+""" + _render_cta_buttons(_WARM_FOLLOWUP_CTA_BUTTONS, escape_braces=True) + """
+    </div>
+</div>
+""")
+
+_FEEDBACK_HOT_FOLLOWUP_HTML = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #10b981; margin: 15px 0;'>
+    <h4 style='color: #10b981; margin: 0 0 15px 0;'>🎯 Let's Find the Perfect Time!</h4>
+    <p style='color: #374151; margin: 0 0 15px 0;'>
+        Since you're still interested, let me help you reschedule at a more convenient time.
+    </p>
+    
+    <button onclick='
+        var chatInput = document.querySelector("#chat_input textarea") || 
+                       document.querySelector("textarea[placeholder*=\\"message\\"]");
+        if (chatInput) {
+            chatInput.value = "Show me available slots for test drive";
+            chatInput.dispatchEvent(new Event("input", { bubbles: true }));
+            var sendBtn = document.querySelector("#send_btn") || 
+                         document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
+            if (sendBtn) sendBtn.click();
+        }
+    ' style='width: 100%; background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
+             color: white; border: none; padding: 14px; 
+             border-radius: 10px; cursor: pointer; font-weight: 600; font-size: 1em;'
+       onmouseover='this.style.transform="scale(1.02)";'
+       onmouseout='this.style.transform="scale(1)";'>
+        📅 Book New Test Drive
+    </button>
+</div>
+""")
+
+_FEEDBACK_COLD_FOLLOWUP_TMPL = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #e5e7eb; margin: 15px 0;'>
+    <h4 style='color: #6b7280; margin: 0 0 15px 0;'>💙 We're Here When You're Ready</h4>
+    <p style='color: #374151; margin: 0;'>
+        Thank you for your time, {customer_name}. If your plans change or you'd like to explore other options, 
+        we're always here to help. Feel free to reach out anytime!
+    </p>
+</div>
+
+<div style='padding: 15px; background: #f0f9ff; border-radius: 10px; margin: 15px 0;'>
+    <p style='margin: 0; color: #1e40af; font-size: 0.9em;'>
+        💡 <strong>Stay Connected:</strong> I can send you updates on new arrivals, special offers, and more.
+    </p>
+</div>
+""")
+
+_DRIVE_FEEDBACK_RESPONSE_TMPL = _minify_html("""
+<div style='padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            border-radius: 12px; color: white; margin: 15px 0;'>
+    <h3 style='margin: 0 0 10px 0; display: flex; align-items: center; gap: 10px;'>
+        <span style='font-size: 1.5em;'>{emoji}</span>
+        <span>Thank You for Your Feedback!</span>
+    </h3>
+    <p style='margin: 0; opacity: 0.95; font-size: 1.05em;'>
+        {response}
+    </p>
+</div>
+""")
+
+_DRIVE_FEEDBACK_HOT_FOLLOWUP_HTML = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #10b981; margin: 15px 0;'>
+    <h4 style='color: #10b981; margin: 0 0 15px 0;'>🎯 Ready to Make It Yours?</h4>
+    <p style='color: #374151; margin: 0 0 15px 0;'>
+        Since you loved the test drive, let's talk about the next steps to make this vehicle yours!
+    </p>
+    
+    <div style='display: grid; gap: 10px;'>
+""" + _render_cta_buttons(_HOT_LEAD_CTA_BUTTONS) + """
+    </div>
+</div>
+
+<div style='padding: 15px; background: #fef3c7; border-radius: 10px; 
+            border-left: 4px solid #f59e0b; margin: 15px 0;'>
+    <p style='margin: 0; color: #92400e;'>
+        🔥 <strong>Hot Lead Alert!</strong> Our team will contact you shortly with a special offer!
+    </p>
+</div>
+""")
+
+# ✅ Vehicle carousel / comparison / prompt templates - minified once at import,
+# filled with str.format per request (no per-call f-string concatenation)
+_DEFAULT_VEHICLE_IMAGE = "https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400"
+
+_VEHICLE_CARDS_HEADER_TMPL = _minify_html("""
+<div style='padding: 12px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            border-radius: 10px; color: white; margin: 10px 0;'>
+    <h3 style='margin: 0; font-size: 1.1em;'>🚗 Found {original_count} Vehicle(s)</h3>
+    {showing}
+</div>
+
+<!-- Carousel -->
+<div style='position: relative; margin: 15px 0;'>
+    <button onclick='document.getElementById("vc").scrollBy({{left:-320,behavior:"smooth"}})' 
+            style='position: absolute; left: -12px; top: 45%; z-index: 10; 
+                   background: #667eea; color: white; border: none; width: 35px; height: 35px; 
+                   border-radius: 50%; cursor: pointer; font-size: 1.1em;'>◀</button>
+    
+    <div id='vc' style='display: flex; overflow-x: auto; gap: 12px; padding: 15px 5px; scroll-behavior: smooth;'>
+""")
+
+_VEHICLE_CARDS_SHOWING_TMPL = "<p style='margin: 3px 0 0 0; font-size: 0.85em; opacity: 0.9;'>Showing top {total_vehicles}</p>"
+
+_BADGE_IN_STOCK = '<span style="background:#10b981;color:white;padding:3px 8px;border-radius:8px;font-size:0.75em;">✅</span>'
+_BADGE_LOW_STOCK_TMPL = '<span style="background:#f59e0b;color:white;padding:3px 8px;border-radius:8px;font-size:0.75em;">⚠️{stock}</span>'
+_BADGE_OUT_OF_STOCK = '<span style="background:#ef4444;color:white;padding:3px 8px;border-radius:8px;font-size:0.75em;">❌</span>'
+
+_FEATURE_TAGS_TMPL = "<div style='display:flex;gap:4px;margin:6px 0;'>{tags}</div>"
+_FEATURE_TAG_TMPL = "<span style='background:#dbeafe;color:#1e40af;padding:2px 6px;border-radius:6px;font-size:0.7em;'>{feature}</span>"
+
+_VEHICLE_CARD_TMPL = _minify_html("""
+<div style='min-width:280px;max-width:280px;background:white;border-radius:10px;
+            box-shadow:0 2px 8px rgba(0,0,0,0.1);border:1px solid #e5e7eb;'>
+    <img src='{image}' style='width:100%;height:140px;object-fit:cover;border-radius:10px 10px 0 0;'
+         onerror="this.src='""" + _DEFAULT_VEHICLE_IMAGE + """'">
+    <div style='padding:12px;'>
+        <div style='display:flex;justify-content:space-between;align-items:start;margin-bottom:6px;'>
+            <h4 style='margin:0;color:#1f2937;font-size:1em;'>{year} {make} {model}</h4>
+            {badge}
+        </div>
+        <p style='font-size:1.4em;color:#667eea;font-weight:700;margin:6px 0;'>AED {price}</p>
+        <p style='color:#9ca3af;font-size:0.8em;margin:4px 0;'>ID: {vid}</p>
+        {features}
+        <button onclick='
+var i=document.querySelector("#chat_input textarea");
+if(i){{i.value="🚗 BOOK_START:{vid}";i.dispatchEvent(new Event("input",{{bubbles:true}}));
+setTimeout(()=>{{var b=document.querySelector("#send_btn");if(b)b.click();}},150);}}
+else{{alert("Type: Book test drive for {vid}");}}
+' style='width:100%;background:#667eea;color:white;border:none;padding:8px;
+         border-radius:6px;cursor:pointer;font-weight:600;font-size:0.85em;margin-top:6px;'>
+            📅 Book
+        </button>
+    </div>
+</div>
+""")
+
+_VEHICLE_CARDS_FOOTER_TMPL = _minify_html("""
+    </div>
+    <button onclick='document.getElementById("vc").scrollBy({{left:320,behavior:"smooth"}})' 
+            style='position:absolute;right:-12px;top:45%;z-index:10;
+                   background:#667eea;color:white;border:none;width:35px;height:35px;
+                   border-radius:50%;cursor:pointer;font-size:1.1em;'>▶</button>
+</div>
+
+<div style='text-align:center;padding:8px;background:#f3f4f6;border-radius:8px;margin:8px 0;'>
+    <p style='margin:0;color:#6b7280;font-size:0.85em;'>
+        📊 Showing {total_vehicles} of {original_count} • {hint}
+    </p>
+</div>
+""")
+
+_NO_RESULTS_TMPL = _minify_html("""
+<div style='text-align: center; padding: 40px 20px; background: #f9fafb; 
+            border-radius: 12px; margin: 15px 0; border: 2px dashed #d1d5db;'>
+    <div style='font-size: 3em; margin-bottom: 15px;'>🔍</div>
+    <h3 style='color: #4a5568; margin: 10px 0;'>No Vehicles Found</h3>
+    <p style='color: #718096;'>No results for "{query}"</p>
+    
+    <div style='margin-top: 20px;'>
+        <p style='font-size: 0.9em; color: #777;'><strong>Try:</strong></p>
+        <div style='display: flex; gap: 10px; justify-content: center; flex-wrap: wrap; margin-top: 10px;'>
+            <span style='background: white; padding: 8px 16px; border-radius: 20px; border: 1px solid #e5e7eb;'>luxury SUV</span>
+            <span style='background: white; padding: 8px 16px; border-radius: 20px; border: 1px solid #e5e7eb;'>cars under 200k</span>
+            <span style='background: white; padding: 8px 16px; border-radius: 20px; border: 1px solid #e5e7eb;'>Toyota</span>
+        </div>
+    </div>
+</div>
+""")
+
+_COMPARISON_HEADER_HTML = _minify_html("""
+<div style='padding: 15px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            border-radius: 12px; color: white; margin: 10px 0;'>
+    <h3 style='margin: 0;'>⚖️ Vehicle Comparison</h3>
+</div>
+
+<div style='display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 15px 0;'>
+""")
+
+_COMPARISON_CARD_TMPL = _minify_html("""
+    <div style='background: white; border-radius: 12px; overflow: hidden; 
+                border: 2px solid #e5e7eb; box-shadow: 0 4px 12px rgba(0,0,0,0.1);'>
+        <img src='{image}' 
+             style='width: 100%; height: 150px; object-fit: cover;'
+             onerror="this.src='""" + _DEFAULT_VEHICLE_IMAGE + """'">
+        <div style='padding: 15px;'>
+            <h4 style='margin: 0 0 10px 0; color: #1f2937;'>{year} {make} {model}</h4>
+            <p style='font-size: 1.5em; color: #667eea; font-weight: 700; margin: 8px 0;'>AED {price}</p>
+            <p style='color: #6b7280; font-size: 0.9em;'>Stock: {stock} units</p>
+        </div>
+    </div>
+""")
+
+_RECOMMENDATIONS_HEADER_HTML = _minify_html("""
+<div style='padding: 15px; background: linear-gradient(135deg, #fbbf24 0%, #f59e0b 100%); 
+            border-radius: 12px; color: white; margin: 20px 0;'>
+    <h3 style='margin: 0 0 10px 0;'>💡 You Might Also Like</h3>
+    <p style='margin: 0; opacity: 0.95;'>Based on your browsing history</p>
+</div>
+
+<div style='display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 12px; margin: 15px 0;'>
+""")
+
+_RECOMMENDATION_CARD_TMPL = _minify_html("""
+    <div style='background: white; border-radius: 10px; overflow: hidden; 
+                border: 2px solid #e5e7eb; cursor: pointer;'>
+        <img src='{image}' 
+             style='width: 100%; height: 120px; object-fit: cover;'
+             onerror="this.src='""" + _DEFAULT_VEHICLE_IMAGE + """'">
+        <div style='padding: 12px;'>
+            <h4 style='margin: 0 0 6px 0; color: #1f2937; font-size: 0.95em;'>{year} {make}</h4>
+            <p style='margin: 0; color: #667eea; font-weight: 700;'>AED {price:,}</p>
+        </div>
+    </div>
+""")
+
+_EMAIL_PROMPT_HTML = _minify_html("""
+<div style='padding: 20px; background: linear-gradient(135deg, #fbbf24 0%, #f59e0b 100%); 
+            border-radius: 12px; color: white; margin: 20px 0; box-shadow: 0 4px 12px rgba(251,191,36,0.3);'>
+    <h3 style='margin: 0 0 12px 0; display: flex; align-items: center; gap: 10px;'>
+        <span style='font-size: 1.5em;'>📧</span>
+        <span>Stay Connected!</span>
+    </h3>
+    <p style='margin: 0 0 15px 0; opacity: 0.95; line-height: 1.6;'>
+        I'd love to keep you updated on:
+    </p>
+    <ul style='margin: 0 0 15px 0; opacity: 0.95; line-height: 1.8;'>
+        <li>✨ New vehicle arrivals matching your interests</li>
+        <li>💰 Exclusive deals and offers</li>
+        <li>📅 Your test drive appointments</li>
+    </ul>
+    <p style='margin: 0; font-size: 0.9em; opacity: 0.9;'>
+        💡 <strong>Type:</strong> "My email is your@email.com" to get started!
+    </p>
+</div>
+""")
+
+# ✅ Financial query templates
+_FINANCIAL_UNAVAILABLE_HTML = _minify_html("""
+<div style='padding: 15px; background: #fff3cd; border-left: 4px solid #ffc107; border-radius: 8px; margin: 10px 0;'>
+    <strong>📊 Financial Reports</strong>
+    <p>Financial analysis module is not available at the moment. Please contact support for detailed financial information.</p>
+</div>
+""")
+
+_FINANCIAL_RESULT_TMPL = _minify_html("""
+<div style='padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            border-radius: 12px; color: white; margin: 15px 0; box-shadow: 0 4px 12px rgba(0,0,0,0.15);'>
+    <h3 style='margin: 0 0 10px 0; display: flex; align-items: center; gap: 10px;'>
+        <span style='font-size: 1.5em;'>📊</span>
+        <span>Financial Analysis Results</span>
+    </h3>
+    <div style='background: rgba(255,255,255,0.1); padding: 12px; border-radius: 8px; margin: 10px 0;'>
+        <p style='margin: 0; font-size: 0.9em;'><strong>Search Method:</strong> {method}</p>
+        <p style='margin: 5px 0 0 0; font-size: 0.9em;'><strong>Confidence:</strong> {confidence:.1%}</p>
+    </div>
+</div>
+
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #e5e7eb; margin: 15px 0;'>
+    <h4 style='color: #667eea; margin-top: 0;'>📈 Answer:</h4>
+    <p style='color: #374151; line-height: 1.6; font-size: 1.05em;'>{answer}</p>
+</div>
+""")
+
+_FINANCIAL_SOURCES_OPEN_HTML = _minify_html("""
+<div style='padding: 15px; background: #f9fafb; border-radius: 10px; 
+            border-left: 4px solid #667eea; margin: 15px 0;'>
+    <h4 style='color: #374151; margin-top: 0; font-size: 0.95em;'>📚 Sources:</h4>
+    <div style='max-height: 200px; overflow-y: auto;'>
+""")
+
+_FINANCIAL_SOURCE_TMPL = _minify_html("""
+        <div style='padding: 10px; background: white; border-radius: 6px; 
+                    margin: 8px 0; border: 1px solid #e5e7eb;'>
+            <p style='margin: 0; font-size: 0.85em; color: #6b7280;'>
+                <strong>Source {index}</strong> ({section}) - Relevance: {score:.0%}
+            </p>
+            <p style='margin: 5px 0 0 0; font-size: 0.9em; color: #374151;'>{content}...</p>
+        </div>
+""")
+
+_FINANCIAL_SOURCES_CLOSE_HTML = "</div></div>"
+
+_FINANCIAL_SUGGESTIONS_HTML = _minify_html("""
+<div style='padding: 15px; background: #ecfdf5; border-radius: 10px; margin: 15px 0;'>
+    <p style='margin: 0; color: #065f46; font-weight: 600;'>💡 Try asking:</p>
+    <ul style='margin: 10px 0 0 0; color: #047857;'>
+        <li>Compare revenues of Toyota and Tesla</li>
+        <li>What was the operating margin in 2023?</li>
+        <li>Show me R&D spending trends</li>
+        <li>Which company has the highest net income?</li>
+    </ul>
+</div>
+""")
+
+_FINANCIAL_ERROR_TMPL = _minify_html("""
+<div style='padding: 15px; background: #fee2e2; border-left: 4px solid #ef4444; 
+            border-radius: 8px; margin: 10px 0;'>
+    <strong>⚠️ Error</strong>
+    <p>Unable to process financial query: {error}</p>
+</div>
+""")
+
+# ✅ Agent response wrappers - only the response text changes per call
+_SENTIMENT_RESPONSE_TMPL = _minify_html("""
+<div style='padding: 20px; background: {bg}; border-left: 4px solid {border}; 
+            border-radius: 10px; margin: 15px 0;'>
+    <div style='display: flex; align-items: center; gap: 12px; margin-bottom: 12px;'>
+        <span style='font-size: 2em;'>{emoji}</span>
+        <div>
+            <p style='margin: 0; color: {text}; font-weight: 600; font-size: 1.1em;'>
+                {title} Sentiment
+            </p>
+            <p style='margin: 4px 0 0 0; color: {text}; font-size: 0.9em;'>
+                Confidence: {score_pct}
+            </p>
+        </div>
+    </div>
+    <p style='margin: 0; color: {text}; line-height: 1.6;'>{base}</p>
+</div>
+""")
+
+_SENTIMENT_COLORS = {
+    'positive': {'bg': '#ecfdf5', 'border': '#10b981', 'text': '#065f46'},
+    'negative': {'bg': '#fef2f2', 'border': '#ef4444', 'text': '#991b1b'},
+    'neutral': {'bg': '#f0f9ff', 'border': '#3b82f6', 'text': '#1e3a8a'}
+}
+
+# Colours baked in once per sentiment; per-call fields stay as placeholders
+_SENTIMENT_SHELL = {
+    sentiment: _SENTIMENT_RESPONSE_TMPL.format(
+        emoji='{emoji}', title='{title}', score_pct='{score_pct}', base='{base}', **color
+    )
+    for sentiment, color in _SENTIMENT_COLORS.items()
+}
+
+_APPOINTMENT_OPTIONS_TMPL = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #667eea; margin: 15px 0;'>
+    <h3 style='color: #667eea; margin: 0 0 15px 0;'>📅 Book Your Test Drive</h3>
+    <p style='color: #4b5563; margin: 0 0 15px 0;'>{base}</p>
+    
+    <div style='background: #f9fafb; padding: 15px; border-radius: 8px;'>
+        <p style='margin: 0 0 10px 0; color: #1f2937; font-weight: 600;'>📋 What you'll need:</p>
+        <ul style='margin: 0; color: #4b5563; line-height: 1.8;'>
+            <li>Vehicle ID (from search results)</li>
+            <li>Preferred date and time</li>
+            <li>Your contact information</li>
+        </ul>
+    </div>
+</div>
+""")
+
+# Plain-text line breaks -> HTML for info responses
+_INFO_PARAGRAPH_BREAK = '</p><p style="margin: 12px 0;">'
+_INFO_LINE_BREAK = '<br>'
+
+_INFO_RESPONSE_TMPL = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #e5e7eb; margin: 15px 0;'>
+    <p style='color: #374151; line-height: 1.8;'>{base}</p>
+</div>
+""")
+
+_DEFAULT_RESPONSE_TMPL = _minify_html("""
+<div style='padding: 20px; background: white; border-radius: 12px; 
+            border: 2px solid #e5e7eb; margin: 15px 0;'>
+    <p style='color: #374151; line-height: 1.6;'>{base}</p>
+</div>
+""")
+
+_ERROR_RESPONSE_TMPL = _minify_html("""
+<div style='padding: 20px; background: #fef2f2; border-left: 4px solid #ef4444; 
+            border-radius: 10px; margin: 15px 0;'>
+    <div style='display: flex; align-items: center; gap: 12px;'>
+        <span style='font-size: 2em;'>⚠️</span>
+        <div>
+            <p style='margin: 0; color: #991b1b; font-weight: 600;'>Oops! Something went wrong</p>
+            <p style='margin: 6px 0 0 0; color: #dc2626;'>{message}</p>
+            <p style='margin: 6px 0 0 0; color: #dc2626;'>Please try:</p>
+            <ul style='margin: 8px 0 0 0; color: #dc2626;'>
+                <li>Rephrasing your question</li>
+                <li>Asking about something else</li>
+                <li>Contacting support if the issue persists</li>
+            </ul>
+        </div>
+    </div>
+</div>
+""")
+
 
 class AutomotiveChatbot:
     """Enhanced Chatbot with Translation, Voice, and Neo4j"""
@@ -34,9 +946,38 @@ class AutomotiveChatbot:
         self.user_sessions = {}
         self.financial_rag = None
         self.sentiment_handler = SentimentResponseHandler()
+        self._cached_sentiment = functools.lru_cache(maxsize=_SENTIMENT_CACHE_SIZE)(self._score_sentiment)
         self.gradio_transfer = GradioAgentTransfer(self.neo4j)
         self.agent_check_interval = 2
         
+        # Feedback and escalation writes are coalesced and flushed by a background thread
+        self._feedback_queue = queue.Queue()
+        threading.Thread(target=self._feedback_writer_loop, daemon=True).start()
+        atexit.register(self._drain_feedback_queue)
+        
+        # Chat messages are buffered per session and written in UNWIND batches
+        self._msg_buffer: Dict[str, List[Dict]] = {}
+        self._msg_buffer_emails: Dict[str, str] = {}
+        self._msg_buffer_lock = threading.Lock()
+        self._msg_flush_event = threading.Event()
+        self._neo4j_failures = 0
+        self._neo4j_blackout_until = 0.0
+        self._pending_batches = collections.deque(maxlen=_PENDING_BATCHES_MAX)
+        threading.Thread(target=self._message_flush_loop, daemon=True).start()
+        atexit.register(self._flush_message_buffer)
+        
+        # Sentiment + Neo4j persistence runs off the request thread
+        self._write_pool = ThreadPoolExecutor(max_workers=_WRITE_POOL_WORKERS,
+                                              thread_name_prefix="chat-writer")
+        self._write_slots = threading.BoundedSemaphore(_WRITE_PENDING_LIMIT)
+        
+        # Session metadata goes through one writer so saves land in submission order;
+        # VIEWED ids from a failed save wait here until that session's next save
+        self._session_write_pool = ThreadPoolExecutor(max_workers=1,
+                                                      thread_name_prefix="session-writer")
+        self._unsaved_viewed: Dict[str, Dict] = {}
+        self._unsaved_viewed_lock = threading.Lock()
+        
         logger.info("✅ Gradio Agent Transfer integrated")
         
         # Initialize financial RAG if available
@@ -56,8 +997,8 @@ class AutomotiveChatbot:
         queries = [
             "CREATE CONSTRAINT conversation_id IF NOT EXISTS FOR (c:Conversation) REQUIRE c.id IS UNIQUE",
             "CREATE CONSTRAINT message_id IF NOT EXISTS FOR (m:Message) REQUIRE m.id IS UNIQUE",
-            "CREATE INDEX conversation_session IF NOT EXISTS FOR (c:Conversation) ON (c.session_id)",
             "CREATE INDEX conversation_email IF NOT EXISTS FOR (c:Conversation) ON (c.user_email)",
+            "CREATE INDEX conversation_created_at IF NOT EXISTS FOR (c:Conversation) ON (c.created_at)",
             "CREATE INDEX message_timestamp IF NOT EXISTS FOR (m:Message) ON (m.timestamp)",
         ]
         
@@ -67,8 +1008,57 @@ class AutomotiveChatbot:
             except Exception as e:
                 logger.debug(f"Schema creation (may exist): {e}")
         
+        self._ensure_session_id_constraint()
+        
         logger.info("✅ Conversation schema initialized")
     
+    def _ensure_session_id_constraint(self):
+        """
+        Make Conversation.session_id unique, replacing the plain conversation_session index
+        
+        session_id is the MERGE key for every conversation write, so it must never
+        be left unindexed. The constraint is tried first; the old index is dropped
+        only to make room for it (Neo4j refuses a constraint alongside an equivalent
+        index) and is re-created if existing duplicates still block the constraint.
+        """
+        create_constraint = ("CREATE CONSTRAINT conversation_session_id IF NOT EXISTS "
+                             "FOR (c:Conversation) REQUIRE c.session_id IS UNIQUE")
+        
+        def constraint_exists() -> bool:
+            rows = self.neo4j.execute_with_retry(
+                "SHOW CONSTRAINTS YIELD name WHERE name = 'conversation_session_id' RETURN name",
+                timeout=10.0
+            )
+            return bool(rows)
+        
+        # Fails while the equivalent plain index still exists on an older database
+        self.neo4j.execute_with_retry(create_constraint, timeout=10.0)
+        if not constraint_exists():
+            self.neo4j.execute_with_retry("DROP INDEX conversation_session IF EXISTS", timeout=10.0)
+            self.neo4j.execute_with_retry(create_constraint, timeout=10.0)
+        
+        if constraint_exists():
+            self.neo4j.execute_with_retry("DROP INDEX conversation_session IF EXISTS", timeout=10.0)
+            return
+        
+        self.neo4j.execute_with_retry(
+            "CREATE INDEX conversation_session IF NOT EXISTS FOR (c:Conversation) ON (c.session_id)",
+            timeout=10.0
+        )
+        duplicates = self.neo4j.execute_with_retry("""
+            MATCH (c:Conversation)
+            WHERE c.session_id IS NOT NULL
+            WITH c.session_id as session_id, count(*) as copies
+            WHERE copies > 1
+            RETURN session_id, copies
+            LIMIT 20
+        """, timeout=30.0) or []
+        logger.warning(
+            "⚠️ Conversation.session_id uniqueness constraint not created - kept the plain "
+            "conversation_session index. Duplicate session_ids (first 20): %s",
+            ", ".join(f"{r['session_id']} (x{r['copies']})" for r in duplicates) or "none found"
+        )
+    
     def process_voice_input(self, audio_file: str, user_id: str = "default") -> Tuple[str, str, Optional[str]]:
         """Process voice input with translation support"""
         try:
@@ -128,7 +1118,7 @@ class AutomotiveChatbot:
             RETURN u.is_vip as is_vip, u.tier as tier
             """
         
-            result = self.neo4j.execute_with_retry(query, {'email': user_email})
+            result = self.neo4j.execute_with_retry(query, {'email': user_email}, read_only=True)
         
             if result and len(result) > 0:
                 is_vip = result[0].get('is_vip', False)
@@ -175,7 +1165,7 @@ class AutomotiveChatbot:
                         'last_intent': None,
                         'conversation_history': [],
                         'user_email': user_email,
-                        'viewed_vehicles': [],
+                        'viewed_vehicles': {},  # ordered set of vehicle ids
                         'interests': [],
                         'preferred_language': detected_language or 'en',
                         'email_prompted': False
@@ -193,13 +1183,7 @@ class AutomotiveChatbot:
             # ✅ STEP 1: CHECK BUTTON COMMANDS FIRST (BEFORE TRANSLATION!)
             # ═══════════════════════════════════════════════════════════
             
-            is_button_command = message.startswith(('🚗 BOOK_START:', '📋 DETAILS_SUBMITTED:', 
-                                        '📍 LOCATION_TYPE:', '📍 BRANCH_SELECTED:', 
-                                        '📍 ADDRESS_SUBMITTED:', '📅 SELECT_DATE:', 
-                                        '⏰ CONFIRM_BOOKING:', '🔄 RESCHEDULE:', 
-                                        '❌ CANCEL:', '💬 FEEDBACK:', '💬 DRIVE_FEEDBACK:',
-                                        '🆘 ESCALATE:', '🔚 END_AGENT_SESSION',
-                                        'CONFIRM_AGENT_TRANSFER:'))
+            is_button_command = message.startswith(_BUTTON_COMMAND_PREFIXES)
 
             # ═══════════════════════════════════════════════════════════
             # HANDLE INTERACTIVE BUTTON COMMANDS (unchanged)
@@ -394,7 +1378,7 @@ class AutomotiveChatbot:
                             return response, None
 
                 # Handle feedback submission
-                if message.startswith("💬 FEEDBACK:"):
+                if message.startswith(_FEEDBACK_PREFIX):
                     response = self._process_feedback(message, session)
                     self._save_message_to_neo4j(session_id, response, 'assistant', user_email)
                     session['conversation_history'].append({
@@ -816,7 +1800,7 @@ class AutomotiveChatbot:
                     user_email=session.get('user_email', 'unknown'),
                     conversation_history=session['conversation_history'],
                     user_context={
-                        'viewed_vehicles': session.get('viewed_vehicles', []),
+                        'viewed_vehicles': list(session.get('viewed_vehicles', [])),
                         'interests': session.get('interests', []),
                         'message_count': session['message_count'],
                         'failed_interactions': session.get('failed_interactions', 0),
@@ -1052,7 +2036,7 @@ class AutomotiveChatbot:
                 'session_messages': session['message_count'],
                 'last_intent': session.get('last_intent'),
                 'conversation_history': session['conversation_history'][-5:],
-                'viewed_vehicles': session.get('viewed_vehicles', []),
+                'viewed_vehicles': list(session.get('viewed_vehicles', [])),
                 'interests': session.get('interests', []),
                 'preferred_language': session.get('preferred_language', 'en')
             }
@@ -1962,7 +2946,7 @@ Landmark: Next to Springs Town Centre'
                 
                 vehicle_name = vehicle_result['vehicle_name'] if vehicle_result else vehicle_id
             
-            calendar_html = f"""
+            parts = [f"""
 <div style='padding: 20px; background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
             border-radius: 12px; color: white; margin: 15px 0;'>
     <h3 style='margin: 0 0 10px 0;'>📅 Select Your Date & Time</h3>
@@ -1975,7 +2959,7 @@ Landmark: Next to Springs Town Centre'
     <h4 style='color: #374151; margin: 0 0 15px 0;'>📆 Step 1: Choose a Date</h4>
     <div style='display: grid; grid-template-columns: repeat(auto-fill, minmax(200px, 1fr)); 
                 gap: 10px; margin-bottom: 20px;'>
-"""
+"""]
             
             # Generate next 14 days as clickable buttons
             time_slots = ["09:00", "10:00", "11:00", "14:00", "15:00", "16:00", "17:00"]
@@ -1996,7 +2980,7 @@ Landmark: Next to Springs Town Centre'
                     bg_color = '#d1fae5' if available_count > 4 else '#fef3c7'
                     text_color = '#065f46' if available_count > 4 else '#92400e'
                     
-                    calendar_html += f"""
+                    parts.append(f"""
         <button onclick='
             var chatInput = document.querySelector("#chat_input textarea") || 
                            document.querySelector("textarea[placeholder*=\\"message\\"]");
@@ -2020,9 +3004,9 @@ Landmark: Next to Springs Town Centre'
                 ✅ {available_count} slots
             </div>
         </button>
-"""
+""")
             
-            calendar_html += """
+            parts.append("""
     </div>
 </div>
 
@@ -2032,9 +3016,9 @@ Landmark: Next to Springs Town Centre'
         💡 <strong>Tip:</strong> Click on any date to see available time slots
     </p>
 </div>
-"""
+""")
             
-            return calendar_html
+            return "".join(parts)
             
         except Exception as e:
             logger.error(f"❌ Calendar error: {e}", exc_info=True)
@@ -2246,7 +3230,7 @@ Landmark: Next to Springs Town Centre'
             date_obj = datetime.strptime(date_str, '%Y-%m-%d')
             date_display = date_obj.strftime('%A, %B %d, %Y')
             
-            time_html = f"""
+            parts = [f"""
 <div style='padding: 20px; background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%); 
             border-radius: 12px; color: white; margin: 15px 0;'>
     <h3 style='margin: 0 0 10px 0;'>⏰ Select Your Time</h3>
@@ -2263,7 +3247,7 @@ Landmark: Next to Springs Town Centre'
             <strong>Morning Slots</strong>
         </p>
         <div style='display: grid; grid-template-columns: repeat(auto-fill, minmax(120px, 1fr)); gap: 10px;'>
-"""
+"""]
             
             morning_slots = ["09:00", "10:00", "11:00"]
             afternoon_slots = ["14:00", "15:00", "16:00", "17:00"]
@@ -2271,7 +3255,7 @@ Landmark: Next to Springs Town Centre'
             # Morning slots
             for time_slot in morning_slots:
                 if time_slot in booked_times:
-                    time_html += f"""
+                    parts.append(f"""
             <button disabled style='background: #fee2e2; color: #991b1b; 
                      border: 2px solid #f87171; padding: 15px; 
                      border-radius: 10px; cursor: not-allowed; 
@@ -2279,9 +3263,9 @@ Landmark: Next to Springs Town Centre'
                 <div style='font-size: 1.2em;'>{time_slot}</div>
                 <div style='font-size: 0.75em; margin-top: 5px;'>❌ Booked</div>
             </button>
-"""
+""")
                 else:
-                    time_html += f"""
+                    parts.append(f"""
             <button onclick='
                 var chatInput = document.querySelector("#chat_input textarea") || 
                                document.querySelector("textarea[placeholder*=\\"message\\"]");
@@ -2302,9 +3286,9 @@ Landmark: Next to Springs Town Centre'
                 <div style='font-size: 1.2em;'>{time_slot}</div>
                 <div style='font-size: 0.75em; margin-top: 5px;'>✅ Available</div>
             </button>
-"""
+""")
             
-            time_html += """
+            parts.append("""
         </div>
     </div>
     
@@ -2313,12 +3297,12 @@ Landmark: Next to Springs Town Centre'
             <strong>Afternoon Slots</strong>
         </p>
         <div style='display: grid; grid-template-columns: repeat(auto-fill, minmax(120px, 1fr)); gap: 10px;'>
-"""
+""")
             
             # Afternoon slots
             for time_slot in afternoon_slots:
                 if time_slot in booked_times:
-                    time_html += f"""
+                    parts.append(f"""
             <button disabled style='background: #fee2e2; color: #991b1b; 
                      border: 2px solid #f87171; padding: 15px; 
                      border-radius: 10px; cursor: not-allowed; 
@@ -2326,9 +3310,9 @@ Landmark: Next to Springs Town Centre'
                 <div style='font-size: 1.2em;'>{time_slot}</div>
                 <div style='font-size: 0.75em; margin-top: 5px;'>❌ Booked</div>
             </button>
-"""
+""")
                 else:
-                    time_html += f"""
+                    parts.append(f"""
             <button onclick='
                 var chatInput = document.querySelector("#chat_input textarea") || 
                                document.querySelector("textarea[placeholder*=\\"message\\"]");
@@ -2349,9 +3333,9 @@ Landmark: Next to Springs Town Centre'
                 <div style='font-size: 1.2em;'>{time_slot}</div>
                 <div style='font-size: 0.75em; margin-top: 5px;'>✅ Available</div>
             </button>
-"""
+""")
             
-            time_html += """
+            parts.append("""
         </div>
     </div>
 </div>
@@ -2362,9 +3346,9 @@ Landmark: Next to Springs Town Centre'
         💡 <strong>Tip:</strong> Click on any available time to book your test drive instantly!
     </p>
 </div>
-"""
+""")
             
-            return time_html
+            return "".join(parts)
             
         except Exception as e:
             logger.error(f"❌ Time slots error: {e}", exc_info=True)
@@ -2573,9 +3557,10 @@ Landmark: Next to Springs Town Centre'
             booking_id = booking_result['booking_id']
             vehicle_name = booking_result['vehicle_name']
             email_sent = booking_result.get('email_sent', False)
+            email_queued = booking_result.get('email_queued', False)
 
 
-            logger.info(f"✅ Booking created: {booking_id} | Email sent: {email_sent}")
+            logger.info(f"✅ Booking created: {booking_id} | Email sent: {email_sent} | Email queued: {email_queued}")
             
             # Clear booking context
             session.pop('pending_booking', None)
@@ -2610,6 +3595,19 @@ Landmark: Next to Springs Town Centre'
             </p>
         </div>
     </div>
+    """
+            elif email_queued:
+                email_badge = """
+    <div style='display: flex; align-items: center; gap: 10px; background: #dbeafe; 
+                padding: 12px; border-radius: 8px; border: 1px solid #3b82f6;'>
+        <span style='font-size: 1.5em;'>📨</span>
+        <div>
+            <strong style='color: #1e3a8a;'>Confirmation Email On Its Way</strong>
+            <p style='margin: 5px 0 0 0; color: #1d4ed8; font-size: 0.9em;'>
+                Your booking details are being sent to <strong>{user_email}</strong>
+            </p>
+        </div>
+    </div>
     """
             else:
                 email_badge = """
@@ -3135,6 +4133,71 @@ Landmark: Next to Springs Town Centre'
 
     # cancellation FeedBack
 
+    def _feedback_writer_loop(self):
+        """Background thread: drain queued feedback and write it in UNWIND batches"""
+        while True:
+            batch = [self._feedback_queue.get()]
+            deadline = time.monotonic() + _FEEDBACK_FLUSH_INTERVAL
+            
+            # Coalesce whatever else arrives within the flush window
+            while len(batch) < _FEEDBACK_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._feedback_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._flush_feedback_batch(batch)
+            except Exception as e:
+                logger.error("❌ Feedback batch write failed (%d records): %s", len(batch), e)
+    
+    def _drain_feedback_queue(self):
+        """Flush whatever feedback is still queued (registered with atexit)"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._feedback_queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._flush_feedback_batch(batch, requeue=False)
+    
+    def _flush_feedback_batch(self, batch: List[Tuple[str, Dict]], requeue: bool = True):
+        """Write a batch of cancellation/drive feedback and escalation records
+        
+        Each kind is written with its own managed transaction; the queries are
+        idempotent, so records of a kind whose write failed go back on the queue
+        (up to _FEEDBACK_MAX_ATTEMPTS) and are simply re-applied.
+        """
+        rows_by_kind = {'cancel': [], 'drive': [], 'escalation': []}
+        for kind, row in batch:
+            rows_by_kind[kind].append(row)
+        
+        failed = []
+        for kind, rows in rows_by_kind.items():
+            if not rows:
+                continue
+            if any(self.neo4j.execute_with_retry(query, {'rows': rows}, timeout=10.0) is None
+                   for query in _FEEDBACK_QUERIES[kind]):
+                failed.extend((kind, row) for row in rows)
+        
+        if not failed:
+            logger.debug("💾 Flushed %d feedback records to Neo4j", len(batch))
+            return
+        
+        for kind, row in failed:
+            row['_attempts'] = row.get('_attempts', 0) + 1
+            if requeue and row['_attempts'] < _FEEDBACK_MAX_ATTEMPTS:
+                self._feedback_queue.put((kind, row))
+            else:
+                logger.error("❌ Dropping %s feedback record after %d failed writes",
+                             kind, row['_attempts'])
+        logger.warning("⚠️ %d of %d feedback records not written to Neo4j",
+                       len(failed), len(batch))
+    
     def _request_cancellation_feedback(self, session: Dict) -> str:
         """Request feedback after cancellation to qualify lead"""
         customer_name = session.get('pending_feedback', {}).get('customer_name', 'there')
@@ -3147,143 +4210,23 @@ Landmark: Next to Springs Town Centre'
         {customer_name}, we'd love to understand your decision better to serve you better in the future.
     </p>
 </div>
-
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #e5e7eb; margin: 15px 0;'>
-    <h4 style='color: #374151; margin: 0 0 15px 0;'>📝 Why did you cancel?</h4>
-    <p style='color: #6b7280; font-size: 0.9em; margin: 0 0 15px 0;'>
-        Please select the option that best describes your reason:
-    </p>
-    
-    <div style='display: grid; gap: 10px;'>
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 FEEDBACK:changed_mind";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; 
-                 font-weight: 500; text-align: left; transition: all 0.2s;'
-           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
-           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
-            🤔 Changed my mind / Not interested anymore
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 FEEDBACK:schedule_conflict";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; 
-                 font-weight: 500; text-align: left; transition: all 0.2s;'
-           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
-           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
-            📅 Schedule conflict / Will reschedule later
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 FEEDBACK:found_better";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; 
-                 font-weight: 500; text-align: left; transition: all 0.2s;'
-           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
-           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
-            🚗 Found a better option elsewhere
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 FEEDBACK:price_concern";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; 
-                 font-weight: 500; text-align: left; transition: all 0.2s;'
-           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
-           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
-            💰 Price concerns / Budget issues
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 FEEDBACK:poor_service";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; 
-                 font-weight: 500; text-align: left; transition: all 0.2s;'
-           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
-           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
-            😞 Unhappy with service / experience
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 FEEDBACK:other";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #374151; border: 2px solid #e5e7eb; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; 
-                 font-weight: 500; text-align: left; transition: all 0.2s;'
-           onmouseover='this.style.borderColor="#667eea"; this.style.background="#f9fafb";'
-           onmouseout='this.style.borderColor="#e5e7eb"; this.style.background="white";'>
-            💭 Other reason
-        </button>
-    </div>
-</div>
-
-<div style='padding: 15px; background: #f0f9ff; border-radius: 10px; 
-            border-left: 4px solid #3b82f6; margin: 15px 0;'>
-    <p style='margin: 0; color: #1e40af; font-size: 0.9em;'>
-        💙 <strong>Your feedback helps us improve!</strong> We appreciate your honesty.
-    </p>
-</div>
-"""
+""" + _FEEDBACK_PICKER_HTML
 
     def _process_feedback(self, message: str, session: Dict) -> str:
         """Process feedback and qualify lead based on sentiment"""
+        return "".join(self._iter_feedback_response(message, session))
+
+    def _iter_feedback_response(self, message: str, session: Dict) -> Iterator[str]:
+        """Yield the feedback response section by section (header, then follow-up)"""
         try:
-            # Extract feedback type
-            feedback_match = re.search(r'FEEDBACK:(\w+)', message)
+            # Extract feedback type (caller already dispatched on the prefix)
+            fields = message[len(_FEEDBACK_PREFIX):].split(None, 1)
             
-            if not feedback_match:
-                return self._error_response("Invalid feedback format")
+            if not message.startswith(_FEEDBACK_PREFIX) or not fields:
+                yield self._error_response("Invalid feedback format")
+                return
             
-            feedback_type = feedback_match.group(1)
+            feedback_type = fields[0]
             
             # Get pending feedback data
             pending = session.get('pending_feedback', {})
@@ -3340,297 +4283,70 @@ Landmark: Next to Springs Town Centre'
             
             feedback_info = feedback_mapping.get(feedback_type, feedback_mapping['other'])
             
-            # Save feedback to Neo4j
+            # Queue feedback for the batched Neo4j writer
             if booking_id and user_email:
-                with self.neo4j.driver.session(database=self.neo4j.database) as neo_session:
-                    # Update booking with feedback
-                    neo_session.run("""
-                        MATCH (b:TestDriveBooking {id: $booking_id})
-                        SET b.cancellation_feedback = $feedback_type,
-                            b.feedback_sentiment = $sentiment,
-                            b.feedback_score = $sentiment_score,
-                            b.feedback_timestamp = datetime()
-                    """, booking_id=booking_id, feedback_type=feedback_type,
-                        sentiment=feedback_info['sentiment'], 
-                        sentiment_score=feedback_info['sentiment_score'])
-                    
-                    # Create or update lead
-                    lead_id = f"L{abs(hash(user_email)) % 100000:05d}"
-                    
-                    neo_session.run("""
-                        MERGE (l:Lead {email: $email})
-                        ON CREATE SET 
-                            l.id = $lead_id,
-                            l.name = $name,
-                            l.created_at = datetime()
-                        SET l.status = $status,
-                            l.sentiment = $sentiment,
-                            l.last_interaction = datetime(),
-                            l.cancellation_reason = $feedback_type,
-                            l.notes = $notes
-                    """, email=user_email, lead_id=lead_id, name=customer_name,
-                        status=feedback_info['lead_status'], 
-                        sentiment=feedback_info['sentiment'],
-                        feedback_type=feedback_type,
-                        notes=f"Cancelled test drive for {vehicle_name}. Reason: {feedback_type}")
+                self._feedback_queue.put(('cancel', {
+                    'booking_id': booking_id,
+                    'feedback_type': feedback_type,
+                    'sentiment': feedback_info['sentiment'],
+                    'sentiment_score': feedback_info['sentiment_score'],
+                    'email': user_email,
+                    'lead_id': f"L{abs(hash(user_email)) % 100000:05d}",
+                    'name': customer_name,
+                    'status': feedback_info['lead_status'],
+                    'notes': f"Cancelled test drive for {vehicle_name}. Reason: {feedback_type}",
+                    'now': datetime.now(timezone.utc)
+                }))
             
             # Clear pending feedback
             session.pop('pending_feedback', None)
             
             # Generate response based on feedback type
-            response = f"""
-<div style='padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            border-radius: 12px; color: white; margin: 15px 0;'>
-    <h3 style='margin: 0 0 10px 0; display: flex; align-items: center; gap: 10px;'>
-        <span style='font-size: 1.5em;'>{feedback_info['emoji']}</span>
-        <span>Thank You for Your Feedback!</span>
-    </h3>
-    <p style='margin: 0; opacity: 0.95;'>
-        {feedback_info['response']}
-    </p>
-</div>
-"""
+            yield _FEEDBACK_RESPONSE_TMPL.format(
+                emoji=feedback_info['emoji'], response=feedback_info['response']
+            )
             
             # Add sentiment-based follow-up
             if feedback_info['lead_status'] == 'warm':
-                response += f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #fbbf24; margin: 15px 0;'>
-    <h4 style='color: #f59e0b; margin: 0 0 15px 0;'>🌟 We'd Love to Keep Helping!</h4>
-    <p style='color: #374151; margin: 0 0 15px 0;'>
-        Based on your feedback, here are some ways I can assist:
-    </p>
-    
-    <div style='display: grid; gap: 10px;'>
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "Show me vehicles within my budget";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                 color: white; border: none; padding: 12px; 
-                 border-radius: 8px; cursor: pointer; font-weight: 600;'
-           onmouseover='this.style.opacity="0.9";'
-           onmouseout='this.style.opacity="1";'>
-            💰 Show Budget-Friendly Options
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "Tell me about financing options";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #667eea; border: 2px solid #667eea; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; font-weight: 600;'
-           onmouseover='this.style.background="#f9fafb";'
-           onmouseout='this.style.background="white";'>
-            📊 Explore Financing Options
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "Show me similar vehicles to {vehicle_name}";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #667eea; border: 2px solid #667eea; 
-                 padding: 12px; border-radius: 8px; cursor: pointer; font-weight: 600;'
-           onmouseover='this.style.background="#f9fafb";'
-           onmouseout='this.style.background="white";'>
-            🔍 See Similar Vehicles
-        </button>
-    </div>
-</div>
-"""
+                yield _FEEDBACK_WARM_FOLLOWUP_TMPL.format(vehicle_name=vehicle_name)
             
             elif feedback_info['lead_status'] == 'hot':
-                response += f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #10b981; margin: 15px 0;'>
-    <h4 style='color: #10b981; margin: 0 0 15px 0;'>🎯 Let's Find the Perfect Time!</h4>
-    <p style='color: #374151; margin: 0 0 15px 0;'>
-        Since you're still interested, let me help you reschedule at a more convenient time.
-    </p>
-    
-    <button onclick='
-        var chatInput = document.querySelector("#chat_input textarea") || 
-                       document.querySelector("textarea[placeholder*=\\"message\\"]");
-        if (chatInput) {{
-            chatInput.value = "Show me available slots for test drive";
-            chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-            var sendBtn = document.querySelector("#send_btn") || 
-                         document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-            if (sendBtn) sendBtn.click();
-        }}
-    ' style='width: 100%; background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
-             color: white; border: none; padding: 14px; 
-             border-radius: 10px; cursor: pointer; font-weight: 600; font-size: 1em;'
-       onmouseover='this.style.transform="scale(1.02)";'
-       onmouseout='this.style.transform="scale(1)";'>
-        📅 Book New Test Drive
-    </button>
-</div>
-"""
-            
-            else:  # cold lead
-                response += f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #e5e7eb; margin: 15px 0;'>
-    <h4 style='color: #6b7280; margin: 0 0 15px 0;'>💙 We're Here When You're Ready</h4>
-    <p style='color: #374151; margin: 0;'>
-        Thank you for your time, {customer_name}. If your plans change or you'd like to explore other options, 
-        we're always here to help. Feel free to reach out anytime!
-    </p>
-</div>
-
-<div style='padding: 15px; background: #f0f9ff; border-radius: 10px; margin: 15px 0;'>
-    <p style='margin: 0; color: #1e40af; font-size: 0.9em;'>
-        💡 <strong>Stay Connected:</strong> I can send you updates on new arrivals, special offers, and more.
-    </p>
-</div>
-"""
+                yield _FEEDBACK_HOT_FOLLOWUP_HTML
             
-            # Log lead qualification
-            logger.info(f"🎯 Lead Qualified: {user_email} - Status: {feedback_info['lead_status'].upper()} | Sentiment: {feedback_info['sentiment']} | Score: {feedback_info['sentiment_score']}")
+            else:  # cold lead
+                yield _FEEDBACK_COLD_FOLLOWUP_TMPL.format(customer_name=customer_name)
             
-            return response
+            # Log lead qualification
+            logger.info("🎯 Lead Qualified: %s - Status: %s | Sentiment: %s | Score: %s",
+                        user_email, feedback_info['lead_status'].upper(),
+                        feedback_info['sentiment'], feedback_info['sentiment_score'])
             
+
         except Exception as e:
-            logger.error(f"❌ Feedback processing error: {e}", exc_info=True)
-            return self._error_response("Unable to process feedback. Thank you for trying!")
+            logger.error("❌ Feedback processing error: %s", e, exc_info=True)
+            yield self._error_response("Unable to process feedback. Thank you for trying!")
 
     def _request_post_drive_feedback(self, booking_id: str, session: Dict) -> str:
         """Request feedback after test drive is completed"""
         customer_name = session.get('user_name', 'there')
         
-        return f"""
-<div style='padding: 20px; background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
-            border-radius: 12px; color: white; margin: 15px 0;'>
-    <h3 style='margin: 0 0 10px 0;'>🎉 How Was Your Test Drive?</h3>
-    <p style='margin: 0; opacity: 0.95;'>
-        Hi {customer_name}! We hope you enjoyed your test drive experience.
-    </p>
-</div>
-
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #e5e7eb; margin: 15px 0;'>
-    <h4 style='color: #374151; margin: 0 0 15px 0;'>⭐ Rate Your Experience</h4>
-    <p style='color: #6b7280; font-size: 0.9em; margin: 0 0 15px 0;'>
-        Your feedback helps us improve our service
-    </p>
-    
-    <div style='display: grid; gap: 10px;'>
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 DRIVE_FEEDBACK:excellent|{booking_id}";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
-                 color: white; border: none; padding: 15px; 
-                 border-radius: 10px; cursor: pointer; 
-                 font-weight: 600; text-align: center; transition: all 0.2s;'
-           onmouseover='this.style.transform="scale(1.02)";'
-           onmouseout='this.style.transform="scale(1)";'>
-            😍 Excellent - I loved it!
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 DRIVE_FEEDBACK:good|{booking_id}";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%); 
-                 color: white; border: none; padding: 15px; 
-                 border-radius: 10px; cursor: pointer; 
-                 font-weight: 600; text-align: center; transition: all 0.2s;'
-           onmouseover='this.style.transform="scale(1.02)";'
-           onmouseout='this.style.transform="scale(1)";'>
-            😊 Good - It was nice
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 DRIVE_FEEDBACK:neutral|{booking_id}";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #f59e0b 0%, #d97706 100%); 
-                 color: white; border: none; padding: 15px; 
-                 border-radius: 10px; cursor: pointer; 
-                 font-weight: 600; text-align: center; transition: all 0.2s;'
-           onmouseover='this.style.transform="scale(1.02)";'
-           onmouseout='this.style.transform="scale(1)";'>
-            😐 Okay - It was average
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "💬 DRIVE_FEEDBACK:poor|{booking_id}";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%); 
-                 color: white; border: none; padding: 15px; 
-                 border-radius: 10px; cursor: pointer; 
-                 font-weight: 600; text-align: center; transition: all 0.2s;'
-           onmouseover='this.style.transform="scale(1.02)";'
-           onmouseout='this.style.transform="scale(1)";'>
-            😞 Poor - Not satisfied
-        </button>
-    </div>
-</div>
-
-<div style='padding: 15px; background: #ecfdf5; border-radius: 10px; 
-            border-left: 4px solid #10b981; margin: 15px 0;'>
-    <p style='margin: 0; color: #065f46; font-size: 0.9em;'>
-        💚 <strong>Your honest feedback matters!</strong> It helps us serve you better.
-    </p>
-</div>
-"""
+        return _DRIVE_FEEDBACK_PICKER_TMPL.format(
+            customer_name=customer_name, booking_id=booking_id
+        )
 
     def _process_drive_feedback(self, message: str, session: Dict) -> str:
         """Process post-drive feedback and qualify as hot lead"""
+        return "".join(self._iter_drive_feedback_response(message, session))
+
+    def _iter_drive_feedback_response(self, message: str, session: Dict) -> Iterator[str]:
+        """Yield the post-drive feedback response section by section"""
         try:
             # Extract feedback rating and booking ID
-            match = re.search(r'DRIVE_FEEDBACK:(\w+)\|([A-Z0-9]+)', message)
-            
-            if not match:
-                return self._error_response("Invalid feedback format")
+            rating, _, booking_id = message[len(_DRIVE_FEEDBACK_PREFIX):].strip().partition('|')
             
-            rating = match.group(1)
-            booking_id = match.group(2)
+            if not message.startswith(_DRIVE_FEEDBACK_PREFIX) or not rating or not booking_id:
+                yield self._error_response("Invalid feedback format")
+                return
             
             customer_name = session.get('user_name', 'Customer')
             user_email = session.get('user_email')
@@ -3669,324 +4385,393 @@ Landmark: Next to Springs Town Centre'
             
             rating_info = rating_mapping.get(rating, rating_mapping['neutral'])
             
-            # Save to Neo4j
+            # Queue feedback for the batched Neo4j writer
             if booking_id and user_email:
-                with self.neo4j.driver.session(database=self.neo4j.database) as neo_session:
-                    # Update booking
-                    neo_session.run("""
-                        MATCH (b:TestDriveBooking {booking_id: $booking_id})
-                        SET b.drive_rating = $rating,
-                            b.drive_sentiment = $sentiment,
-                            b.drive_sentiment_score = $sentiment_score,
-                            b.feedback_timestamp = datetime(),
-                            b.status = 'completed'
-                    """, booking_id=booking_id, rating=rating,
-                        sentiment=rating_info['sentiment'],
-                        sentiment_score=rating_info['sentiment_score'])
-                    
-                    # Update lead to HOT if positive feedback
-                    lead_id = f"L{abs(hash(user_email)) % 100000:05d}"
-                    
-                    neo_session.run("""
-                        MERGE (l:Lead {email: $email})
-                        ON CREATE SET 
-                            l.id = $lead_id,
-                            l.name = $name,
-                            l.created_at = datetime()
-                        SET l.status = $status,
-                            l.sentiment = $sentiment,
-                            l.last_interaction = datetime(),
-                            l.test_drive_rating = $rating,
-                            l.notes = $notes
-                    """, email=user_email, lead_id=lead_id, name=customer_name,
-                        status=rating_info['lead_status'],
-                        sentiment=rating_info['sentiment'],
-                        rating=rating,
-                        notes=f"Completed test drive. Rating: {rating}")
+                self._feedback_queue.put(('drive', {
+                    'booking_id': booking_id,
+                    'rating': rating,
+                    'sentiment': rating_info['sentiment'],
+                    'sentiment_score': rating_info['sentiment_score'],
+                    'email': user_email,
+                    'lead_id': f"L{abs(hash(user_email)) % 100000:05d}",
+                    'name': customer_name,
+                    'status': rating_info['lead_status'],
+                    'notes': f"Completed test drive. Rating: {rating}",
+                    'now': datetime.now(timezone.utc)
+                }))
             
             # Generate response
-            response = f"""
-<div style='padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            border-radius: 12px; color: white; margin: 15px 0;'>
-    <h3 style='margin: 0 0 10px 0; display: flex; align-items: center; gap: 10px;'>
-        <span style='font-size: 1.5em;'>{rating_info['emoji']}</span>
-        <span>Thank You for Your Feedback!</span>
-    </h3>
-    <p style='margin: 0; opacity: 0.95; font-size: 1.05em;'>
-        {rating_info['response']}
-    </p>
-</div>
-"""
+            yield _DRIVE_FEEDBACK_RESPONSE_TMPL.format(
+                emoji=rating_info['emoji'], response=rating_info['response']
+            )
             
             # Add next steps based on rating
             if rating_info['lead_status'] == 'hot':
-                response += f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #10b981; margin: 15px 0;'>
-    <h4 style='color: #10b981; margin: 0 0 15px 0;'>🎯 Ready to Make It Yours?</h4>
-    <p style='color: #374151; margin: 0 0 15px 0;'>
-        Since you loved the test drive, let's talk about the next steps to make this vehicle yours!
-    </p>
-    
-    <div style='display: grid; gap: 10px;'>
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "Tell me about financing options";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
-                 color: white; border: none; padding: 14px; 
-                 border-radius: 10px; cursor: pointer; font-weight: 600;'
-           onmouseover='this.style.opacity="0.9";'
-           onmouseout='this.style.opacity="1";'>
-            💰 Explore Financing Options
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "I want to make an offer";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                 color: white; border: none; padding: 14px; 
-                 border-radius: 10px; cursor: pointer; font-weight: 600;'
-           onmouseover='this.style.opacity="0.9";'
-           onmouseout='this.style.opacity="1";'>
-            🤝 Make an Offer
-        </button>
-        
-        <button onclick='
-            var chatInput = document.querySelector("#chat_input textarea") || 
-                           document.querySelector("textarea[placeholder*=\\"message\\"]");
-            if (chatInput) {{
-                chatInput.value = "What documents do I need to purchase?";
-                chatInput.dispatchEvent(new Event("input", {{ bubbles: true }}));
-                var sendBtn = document.querySelector("#send_btn") || 
-                             document.querySelectorAll("button")[document.querySelectorAll("button").length - 2];
-                if (sendBtn) sendBtn.click();
-            }}
-        ' style='background: white; color: #667eea; border: 2px solid #667eea; 
-                 padding: 14px; border-radius: 10px; cursor: pointer; font-weight: 600;'
-           onmouseover='this.style.background="#f9fafb";'
-           onmouseout='this.style.background="white";'>
-            📄 Purchase Information
-        </button>
-    </div>
-</div>
-
-<div style='padding: 15px; background: #fef3c7; border-radius: 10px; 
-            border-left: 4px solid #f59e0b; margin: 15px 0;'>
-    <p style='margin: 0; color: #92400e;'>
-        🔥 <strong>Hot Lead Alert!</strong> Our team will contact you shortly with a special offer!
-    </p>
-</div>
-"""
+                yield _DRIVE_FEEDBACK_HOT_FOLLOWUP_HTML
             
             # Log lead qualification
-            logger.info(f"🔥 HOT LEAD: {user_email} - Positive test drive feedback! Status: {rating_info['lead_status'].upper()} | Score: {rating_info['sentiment_score']}")
-            
-            return response
+            logger.info("🔥 HOT LEAD: %s - Positive test drive feedback! Status: %s | Score: %s",
+                        user_email, rating_info['lead_status'].upper(),
+                        rating_info['sentiment_score'])
             
+
         except Exception as e:
-            logger.error(f"❌ Drive feedback processing error: {e}", exc_info=True)
-            return self._error_response("Thank you for your feedback!")
+            logger.error("❌ Drive feedback processing error: %s", e, exc_info=True)
+            yield self._error_response("Thank you for your feedback!")
     
             
     def _get_or_create_session_id(self, user_id: str) -> str:
         """Generate unique session ID"""
         return f"session_{user_id}_{uuid.uuid4().hex[:12]}"
     
+    def _submit_write(self, fn, *args):
+        """Run a persistence call on the write pool; inline when the pool is saturated"""
+        if not self._write_slots.acquire(blocking=False):
+            logger.warning("⚠️ Write pool saturated - persisting inline")
+            fn(*args)
+            return
+        try:
+            future = self._write_pool.submit(fn, *args)
+        except RuntimeError:
+            # Pool already shut down (interpreter exit)
+            self._write_slots.release()
+            fn(*args)
+            return
+        future.add_done_callback(lambda _: self._write_slots.release())
+    
     def _save_message_to_neo4j(self, session_id: str, message: str, 
                                role: str, user_email: Optional[str] = None):
+        """Queue message for sentiment analysis and saving to Neo4j (non-blocking)"""
+        # Timestamp is taken now so background workers cannot reorder the conversation
+        self._submit_write(self._persist_message, session_id, message, role,
+                           user_email, datetime.now(timezone.utc))
+    
+    def _persist_message(self, session_id: str, message: str, role: str,
+                         user_email: Optional[str], timestamp: datetime):
         """Save message with sentiment analysis to Neo4j"""
         try:
-            message_id = f"msg_{uuid.uuid4().hex[:12]}"
-        
             # Clean message for storage
-            clean_message = re.sub(r'<[^>]+>', ' ', message)
-            clean_message = re.sub(r'\s+', ' ', clean_message).strip()[:1000]
+            clean_message = _WS_RE.sub(' ', _TAG_RE.sub(' ', message)).strip()[:1000]
         
             # ═══════════════════════════════════════════════════════════
             # ✅ ANALYZE SENTIMENT FOR USER MESSAGES
             # ═══════════════════════════════════════════════════════════
-            sentiment_label = None
+            sentiment_code = None
             sentiment_score = None
         
             if role == 'user' and len(clean_message) > 5:
                 try:
-                    sentiment_result = self.sentiment_handler.get_response(clean_message)
-                    if sentiment_result:
-                        sentiment_label = sentiment_result.get('sentiment', 'neutral')
-                        # Map confidence to score (0-1 range)
-                        confidence = sentiment_result.get('confidence', 0.5)
-                    
-                        # Convert sentiment to numeric score
-                        if sentiment_label == 'positive':
-                            sentiment_score = 0.5 + (confidence * 0.5)  # 0.5-1.0
-                        elif sentiment_label == 'negative':
-                            sentiment_score = 0.5 - (confidence * 0.3)  # 0.2-0.5
-                        elif sentiment_label == 'severe_negative':
-                            sentiment_score = 0.2 - (confidence * 0.2)  # 0.0-0.2
-                        else:  # neutral or mixed
-                            sentiment_score = 0.5
+                    if clean_message in _BUTTON_MESSAGES or clean_message.startswith(_SENTIMENT_SKIP_PREFIXES):
+                        sentiment_code, sentiment_score = _NEUTRAL_SENTIMENT
+                    elif not _WORD_RE.search(clean_message):
+                        pass  # Only emoji/punctuation left after cleaning - nothing to analyze
+                    elif len(clean_message) < _SENTIMENT_CACHE_MAX_LEN:
+                        sentiment_code, sentiment_score = self._cached_sentiment(clean_message)
+                    else:
+                        sentiment_code, sentiment_score = self._score_sentiment(clean_message)
                     
-                        logger.debug(f"💭 Sentiment: {sentiment_label} | Score: {sentiment_score:.2f}")
+                    if sentiment_code is not None:
+                        logger.debug(f"💭 Sentiment code: {sentiment_code} | Score: {sentiment_score:.2f}")
                 except Exception as e:
                     logger.warning(f"Sentiment analysis failed: {e}")
         
         # ═══════════════════════════════════════════════════════════
-        # ✅ SAVE TO NEO4J WITH SENTIMENT DATA
+        # ✅ BUFFER FOR THE BATCHED NEO4J WRITER
         # ═══════════════════════════════════════════════════════════
-            query = """
-                MERGE (c:Conversation {session_id: $session_id})
-                ON CREATE SET 
-                    c.id = randomUUID(),
-                    c.created_at = datetime(),
-                    c.user_email = $user_email
-            
-                CREATE (m:Message {
-                    id: $message_id,
-                    content: $content,
-                    clean_content: $clean_content,
-                    role: $role,
-                    timestamp: datetime(),
-                    sentiment: $sentiment_label,
-                    sentiment_score: $sentiment_score
-                })
-            
-                CREATE (c)-[:HAS_MESSAGE]->(m)
-            
-                // ✅ Update conversation-level sentiment aggregation
-                 WITH c, m.id as message_id
-                OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(msg:Message)
-                WHERE msg.role = 'user' AND msg.sentiment IS NOT NULL
-                WITH c, message_id, 
-                     count(msg) as total_messages,
-                     sum(CASE WHEN msg.sentiment = 'positive' THEN 1 ELSE 0 END) as positive_count,
-                     sum(CASE WHEN msg.sentiment IN ['negative', 'severe_negative'] THEN 1 ELSE 0 END) as negative_count,
-                     sum(CASE WHEN msg.sentiment = 'severe_negative' THEN 1 ELSE 0 END) as severe_negative_count,
-                     avg(msg.sentiment_score) as avg_sentiment_score
-                SET c.total_user_messages = total_messages,
-                    c.positive_count = positive_count,
-                    c.negative_count = negative_count,
-                    c.severe_negative_count = severe_negative_count,
-                    c.avg_sentiment_score = avg_sentiment_score,
-                    c.last_updated = datetime()
+            # Only the cleaned text is stored - every reader uses clean_content.
+            # The id is minted once here so a replayed batch MERGEs, not duplicates
+            row = {
+                'message_id': f"msg_{secrets.token_hex(16)}",
+                'clean_content': clean_message,
+                'role': role,
+                'timestamp': timestamp,
+                'sentiment_code': sentiment_code,
+                'sentiment_score': sentiment_score
+            }
             
-                RETURN message_id
-            """
+            with self._msg_buffer_lock:
+                rows = self._msg_buffer.setdefault(session_id, [])
+                if not rows:
+                    self._msg_buffer_emails[session_id] = user_email or 'anonymous'
+                rows.append(row)
+                if len(rows) >= _MESSAGE_BATCH_SIZE:
+                    self._msg_flush_event.set()
         
-            self.neo4j.execute_with_retry(
+            logger.debug(f"💾 Buffered {role} message for Neo4j: {session_id}")
+        
+        except Exception as e:
+            logger.error(f"Failed to save message: {e}")
+    
+    def _score_sentiment(self, clean_message: str) -> Tuple[Optional[int], Optional[float]]:
+        """Run sentiment analysis and map it to a (code, 0-1 score) pair"""
+        sentiment_result = self.sentiment_handler.get_response(clean_message)
+        if not sentiment_result:
+            return None, None
+        
+        code = _SENTIMENT_CODES.get(sentiment_result.get('sentiment'), SENTIMENT_NEUTRAL)
+        # Map confidence to score (0-1 range)
+        base, slope = _SENTIMENT_SCORE_COEFFS[code]
+        return code, base + slope * sentiment_result.get('confidence', 0.5)
+    
+    def _message_flush_loop(self):
+        """Background thread: flush buffered messages every interval or when a batch fills"""
+        while True:
+            self._msg_flush_event.wait(_MESSAGE_FLUSH_INTERVAL)
+            self._msg_flush_event.clear()
+            self._flush_message_buffer()
+    
+    def _flush_message_buffer(self):
+        """Write all buffered messages, one UNWIND query per conversation"""
+        with self._msg_buffer_lock:
+            if not self._msg_buffer and not self._pending_batches:
+                return
+            buffered, self._msg_buffer = self._msg_buffer, {}
+            emails, self._msg_buffer_emails = self._msg_buffer_emails, {}
+            # Batches held back during an outage go first to keep conversation order
+            batches = list(self._pending_batches)
+            self._pending_batches.clear()
+        
+        for session_id, rows in buffered.items():
+            batches.append((session_id, emails.get(session_id, 'anonymous'), rows))
+        
+        # One clock read per flush
+        now = datetime.now(timezone.utc)
+        for batch in batches:
+            if time.monotonic() < self._neo4j_blackout_until or not self._write_message_batch(*batch, now):
+                self._hold_message_batch(batch)
+    
+    def _hold_message_batch(self, batch: Tuple[str, str, List[Dict]]):
+        """Keep a failed/skipped batch for retry on a later flush (bounded)"""
+        with self._msg_buffer_lock:
+            if len(self._pending_batches) == self._pending_batches.maxlen:
+                dropped = self._pending_batches[0]
+                logger.error("❌ Pending message buffer full - dropping %d messages for %s",
+                             len(dropped[2]), dropped[0])
+            self._pending_batches.append(batch)
+    
+    def _record_neo4j_result(self, ok: bool):
+        """Circuit breaker bookkeeping for the message writer"""
+        if ok:
+            if self._neo4j_failures >= _NEO4J_FAILURE_THRESHOLD:
+                logger.info("✅ Neo4j message writes recovered")
+            self._neo4j_failures = 0
+            return
+        
+        self._neo4j_failures += 1
+        if self._neo4j_failures >= _NEO4J_FAILURE_THRESHOLD:
+            self._neo4j_blackout_until = time.monotonic() + _NEO4J_BLACKOUT_SECONDS
+            logger.warning(f"⚠️ Neo4j message writes failing ({self._neo4j_failures}x) - "
+                           f"pausing for {_NEO4J_BLACKOUT_SECONDS:.0f}s, buffering locally")
+    
+    def _write_message_batch(self, session_id: str, user_email: str, rows: List[Dict],
+                             now: datetime) -> bool:
+        """Create a batch of messages under one conversation with a single query
+
+        Messages are MERGEd on their client-minted id, so replaying a batch whose
+        earlier attempt actually committed creates nothing and leaves the
+        sentiment counters alone (they only count newly created messages).
+        """
+        query = """
+            MERGE (c:Conversation {session_id: $session_id})
+            ON CREATE SET 
+                c.id = randomUUID(),
+                c.created_at = $now,
+                c.user_email = $user_email
+            
+            WITH c
+            UNWIND $rows AS r
+            MERGE (m:Message {id: r.message_id})
+            ON CREATE SET
+                m.clean_content = r.clean_content,
+                m.role = r.role,
+                m.timestamp = r.timestamp,
+                m.sentiment_code = r.sentiment_code,
+                m.sentiment_score = r.sentiment_score,
+                m._new = true
+            MERGE (c)-[:HAS_MESSAGE]->(m)
+            WITH c, m, m._new IS NOT NULL as is_new
+            REMOVE m._new
+            
+            // ✅ Incremental conversation-level sentiment counters (O(1), no rescan)
+            WITH c, collect(CASE WHEN is_new THEN m END) as created_msgs
+            WITH c, size(created_msgs) as created,
+                 [x IN created_msgs WHERE x.role = 'user' AND x.sentiment_code IS NOT NULL] as scored_msgs
+            WITH c, created, size(scored_msgs) as scored,
+                 size([x IN scored_msgs WHERE x.sentiment_code = $positive_code]) as positive,
+                 size([x IN scored_msgs WHERE x.sentiment_code >= $negative_code]) as negative,
+                 size([x IN scored_msgs WHERE x.sentiment_code = $severe_negative_code]) as severe_negative,
+                 reduce(s = 0.0, x IN scored_msgs | s + coalesce(x.sentiment_score, 0.0)) as score_sum,
+                 coalesce(c.total_user_messages, 0) as prev_total,
+                 coalesce(c.avg_sentiment_score, 0.0) as prev_avg
+            SET c.total_user_messages = prev_total + scored,
+                c.positive_count = coalesce(c.positive_count, 0) + positive,
+                c.negative_count = coalesce(c.negative_count, 0) + negative,
+                c.severe_negative_count = coalesce(c.severe_negative_count, 0) + severe_negative,
+                c.avg_sentiment_score = CASE
+                    WHEN prev_total + scored = 0 THEN c.avg_sentiment_score
+                    ELSE (prev_avg * prev_total + score_sum) / (prev_total + scored)
+                END,
+                c.last_updated = $now
+            
+            RETURN created
+        """
+        
+        try:
+            result = self.neo4j.execute_with_retry(
                 query,
                 {
                     'session_id': session_id,
-                    'message_id': message_id,
-                    'content': message[:5000],
-                    'clean_content': clean_message,
-                    'role': role,
-                    'user_email': user_email or 'anonymous',
-                    'sentiment_label': sentiment_label,
-                    'sentiment_score': sentiment_score
+                    'user_email': user_email,
+                    'now': now,
+                    'rows': rows,
+                    'positive_code': SENTIMENT_POSITIVE,
+                    'negative_code': SENTIMENT_NEGATIVE,
+                    'severe_negative_code': SENTIMENT_SEVERE_NEGATIVE
                 },
                 timeout=10.0
             )
-        
-            logger.debug(f"💾 Saved message to Neo4j: {message_id}")
-        
         except Exception as e:
-            logger.error(f"Failed to save message: {e}")
+            logger.error("Failed to save %d messages for %s: %s", len(rows), session_id, e)
+            result = None
+        
+        ok = result is not None
+        self._record_neo4j_result(ok)
+        if ok:
+            logger.debug(f"💾 Saved {len(rows)} messages to Neo4j: {session_id}")
+        return ok
     
     def _save_session_to_neo4j(self, session_id: str, session: Dict):
+        """Queue session metadata save (snapshot taken now, written in background)"""
+        # Only vehicles viewed since the last save are sent (as VIEWED edges),
+        # plus any left over from a failed save
+        newly_viewed = session.pop('_newly_viewed', None) or {}
+        with self._unsaved_viewed_lock:
+            unsaved = self._unsaved_viewed.pop(session_id, None)
+        if unsaved:
+            newly_viewed = {**unsaved, **newly_viewed}
+        
+        params = {
+            'session_id': session_id,
+            'message_count': session['message_count'],
+            'last_intent': session.get('last_intent', 'unknown'),
+            'user_email': session.get('user_email', 'anonymous'),
+            'new_viewed': tuple(newly_viewed),
+            'preferred_language': session.get('preferred_language', 'en')
+        }
+        try:
+            self._session_write_pool.submit(self._persist_session, params)
+        except RuntimeError:
+            # Pool already shut down (interpreter exit)
+            self._persist_session(params)
+    
+    def _persist_session(self, params: Dict):
         """Save session metadata to Neo4j"""
+        session_id = params['session_id']
         try:
             query = """
                 MERGE (c:Conversation {session_id: $session_id})
+                ON CREATE SET c.id = randomUUID(), c.created_at = datetime()
                 SET c.message_count = $message_count,
                     c.last_intent = $last_intent,
                     c.user_email = $user_email,
-                    c.viewed_vehicles = $viewed_vehicles,
                     c.preferred_language = $preferred_language,
                     c.last_updated = datetime()
-                RETURN c
+                WITH c
+                UNWIND $new_viewed AS vid
+                MATCH (v:Vehicle {id: vid})
+                MERGE (c)-[r:VIEWED]->(v)
+                ON CREATE SET r.viewed_at = datetime()
+                RETURN count(r) as viewed
             """
             
-            self.neo4j.execute_with_retry(
-                query,
-                {
-                    'session_id': session_id,
-                    'message_count': session['message_count'],
-                    'last_intent': session.get('last_intent', 'unknown'),
-                    'user_email': session.get('user_email', 'anonymous'),
-                    'viewed_vehicles': session.get('viewed_vehicles', []),
-                    'preferred_language': session.get('preferred_language', 'en')
-                },
-                timeout=10.0
-            )
+            result = self.neo4j.execute_with_retry(query, params, timeout=10.0)
             
-            logger.debug(f"💾 Saved session to Neo4j: {session_id}")
+            if result is None:
+                self._keep_unsaved_viewed(session_id, params['new_viewed'])
+                return
+            
+            logger.debug("💾 Saved session to Neo4j: %s", session_id)
             
         except Exception as e:
-            logger.error(f"Failed to save session: {e}")
+            logger.error("Failed to save session %s: %s", session_id, e)
+            self._keep_unsaved_viewed(session_id, params['new_viewed'])
+    
+    def _keep_unsaved_viewed(self, session_id: str, viewed_ids):
+        """Hold VIEWED ids from a failed save so the next save for the session retries them"""
+        if not viewed_ids:
+            return
+        with self._unsaved_viewed_lock:
+            self._unsaved_viewed.setdefault(session_id, {}).update(dict.fromkeys(viewed_ids))
     
     def _load_session_from_neo4j(self, session_id: str) -> Optional[Dict]:
         """Load session from Neo4j"""
+        return self._load_sessions_from_neo4j([session_id]).get(session_id)
+    
+    def _load_sessions_from_neo4j(self, session_ids: List[str]) -> Dict[str, Dict]:
+        """Load several sessions from Neo4j in one round-trip, keyed by session_id"""
+        sessions = {}
+        if not session_ids:
+            return sessions
+        
         try:
             query = """
-                MATCH (c:Conversation {session_id: $session_id})
+                MATCH (c:Conversation)
+                WHERE c.session_id IN $session_ids
+                CALL {
+                    WITH c
+                    OPTIONAL MATCH (c)-[r:VIEWED]->(v:Vehicle)
+                    WITH v ORDER BY r.viewed_at
+                    RETURN collect(v.id) as viewed
+                }
                 OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
-                RETURN c, collect(m) as messages
+                WITH c, viewed, m
                 ORDER BY m.timestamp
+                RETURN c.session_id as session_id, c, viewed, collect(m) as messages
             """
             
             results = self.neo4j.execute_with_retry(
                 query,
-                {'session_id': session_id},
-                timeout=10.0
+                {'session_ids': list(session_ids)},
+                timeout=10.0,
+                read_only=True
             )
             
-            if results and len(results) > 0:
-                record = results[0]
+            for record in results or []:
                 conv = record['c']
                 messages = record['messages']
                 
-                session = {
-                    'session_id': session_id,
+                sessions[record['session_id']] = {
+                    'session_id': record['session_id'],
                     'start_time': conv.get('created_at', datetime.now()),
                     'message_count': conv.get('message_count', 0),
                     'last_intent': conv.get('last_intent'),
                     'conversation_history': [
                         {
                             'timestamp': str(m['timestamp']),
-                            'message': m['content'],
+                            # Older messages may only carry the raw content property
+                            'message': m.get('clean_content') or m.get('content'),
                             'role': m['role']
                         }
                         for m in messages if m
                     ],
                     'user_email': conv.get('user_email'),
-                    'viewed_vehicles': conv.get('viewed_vehicles', []),
+                    # VIEWED edges; older conversations kept a viewed_vehicles list property
+                    'viewed_vehicles': dict.fromkeys(record['viewed'] or conv.get('viewed_vehicles') or []),
                     'interests': [],
                     'preferred_language': conv.get('preferred_language', 'en'),
                     'email_prompted': False
                 }
-                
-                return session
             
         except Exception as e:
-            logger.error(f"Failed to load session: {e}")
+            logger.error(f"Failed to load sessions: {e}")
         
-        return None
+        return sessions
     
     def _update_session_email(self, session_id: str, email: str):
+        """Queue email update for existing session (non-blocking)"""
+        self._submit_write(self._persist_session_email, session_id, email)
+    
+    def _persist_session_email(self, session_id: str, email: str):
         """Update email for existing session"""
         try:
             query = """
@@ -4000,44 +4785,34 @@ Landmark: Next to Springs Town Centre'
                 query,
                 {'session_id': session_id, 'email': email},
                 timeout=10.0
-            )
-            
-            logger.info(f"✅ Updated email for session {session_id}: {email}")
-            
-        except Exception as e:
-            logger.error(f"Failed to update email: {e}")
-    
-    def _generate_email_prompt(self) -> str:
-        """Generate friendly email capture prompt"""
-        return """
-<div style='padding: 20px; background: linear-gradient(135deg, #fbbf24 0%, #f59e0b 100%); 
-            border-radius: 12px; color: white; margin: 20px 0; box-shadow: 0 4px 12px rgba(251,191,36,0.3);'>
-    <h3 style='margin: 0 0 12px 0; display: flex; align-items: center; gap: 10px;'>
-        <span style='font-size: 1.5em;'>📧</span>
-        <span>Stay Connected!</span>
-    </h3>
-    <p style='margin: 0 0 15px 0; opacity: 0.95; line-height: 1.6;'>
-        I'd love to keep you updated on:
-    </p>
-    <ul style='margin: 0 0 15px 0; opacity: 0.95; line-height: 1.8;'>
-        <li>✨ New vehicle arrivals matching your interests</li>
-        <li>💰 Exclusive deals and offers</li>
-        <li>📅 Your test drive appointments</li>
-    </ul>
-    <p style='margin: 0; font-size: 0.9em; opacity: 0.9;'>
-        💡 <strong>Type:</strong> "My email is your@email.com" to get started!
-    </p>
-</div>
-"""
+            )
+            
+            logger.info(f"✅ Updated email for session {session_id}: {email}")
+            
+        except Exception as e:
+            logger.error(f"Failed to update email: {e}")
+    
+    def _generate_email_prompt(self) -> str:
+        """Generate friendly email capture prompt"""
+        return _EMAIL_PROMPT_HTML
     
     def get_conversation_history_by_email(self, email: str, limit: int = 10) -> List[Dict]:
         """Get conversation history for a customer by email"""
         try:
             query = """
                 MATCH (c:Conversation {user_email: $email})
-                OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
+                WITH c
+                ORDER BY c.created_at DESC
+                LIMIT $limit
+                CALL {
+                    WITH c
+                    OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
+                    RETURN m
+                    ORDER BY m.timestamp DESC
+                    LIMIT $message_limit
+                }
                 WITH c, m
-                ORDER BY m.timestamp DESC
+                ORDER BY c.created_at DESC, m.timestamp DESC
                 RETURN c.session_id as session_id, 
                        c.created_at as started_at,
                        c.message_count as message_count,
@@ -4046,14 +4821,14 @@ Landmark: Next to Springs Town Centre'
                            message: m.clean_content,
                            timestamp: m.timestamp
                        }) as messages
-                ORDER BY c.created_at DESC
-                LIMIT $limit
+                ORDER BY started_at DESC
             """
             
             results = self.neo4j.execute_with_retry(
                 query,
-                {'email': email, 'limit': limit},
-                timeout=15.0
+                {'email': email, 'limit': limit, 'message_limit': _HISTORY_MESSAGES_PER_CONVERSATION},
+                timeout=15.0,
+                read_only=True
             )
             
             conversations = []
@@ -4063,7 +4838,7 @@ Landmark: Next to Springs Town Centre'
                         'session_id': record['session_id'],
                         'started_at': str(record['started_at']),
                         'message_count': record['message_count'],
-                        'messages': record['messages'][:20]  # Limit messages per conversation
+                        'messages': record['messages']
                     })
             
             return conversations
@@ -4074,26 +4849,13 @@ Landmark: Next to Springs Town Centre'
     
     def _is_financial_query(self, message: str) -> bool:
         """Check if query is about financial reports"""
-        financial_keywords = [
-            'revenue', 'profit', 'sales', 'earnings', 'financial', 'income',
-            'quarterly', 'annual', 'report', 'performance', 'margin',
-            'cash flow', 'balance sheet', 'r&d', 'operating', 'net income',
-            'market share', 'delivery', 'production', 'units sold'
-        ]
-        
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in financial_keywords)
+        return _FINANCIAL_QUERY_RE.search(message) is not None
     
     def _handle_financial_query(self, message: str, session: Dict) -> str:
         """Handle financial report queries with visual results"""
         try:
             if not self.financial_rag:
-                return """
-                <div style='padding: 15px; background: #fff3cd; border-left: 4px solid #ffc107; border-radius: 8px; margin: 10px 0;'>
-                    <strong>📊 Financial Reports</strong>
-                    <p>Financial analysis module is not available at the moment. Please contact support for detailed financial information.</p>
-                </div>
-                """
+                return _FINANCIAL_UNAVAILABLE_HTML
             
             logger.info(f"📊 Processing financial query: {message}")
             
@@ -4113,78 +4875,34 @@ Landmark: Next to Springs Town Centre'
             retrieved = result.get('retrieved', [])
             
             # Format response with visual elements
-            response = f"""
-<div style='padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            border-radius: 12px; color: white; margin: 15px 0; box-shadow: 0 4px 12px rgba(0,0,0,0.15);'>
-    <h3 style='margin: 0 0 10px 0; display: flex; align-items: center; gap: 10px;'>
-        <span style='font-size: 1.5em;'>📊</span>
-        <span>Financial Analysis Results</span>
-    </h3>
-    <div style='background: rgba(255,255,255,0.1); padding: 12px; border-radius: 8px; margin: 10px 0;'>
-        <p style='margin: 0; font-size: 0.9em;'><strong>Search Method:</strong> {method.upper()}</p>
-        <p style='margin: 5px 0 0 0; font-size: 0.9em;'><strong>Confidence:</strong> {confidence:.1%}</p>
-    </div>
-</div>
-
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #e5e7eb; margin: 15px 0;'>
-    <h4 style='color: #667eea; margin-top: 0;'>📈 Answer:</h4>
-    <p style='color: #374151; line-height: 1.6; font-size: 1.05em;'>{answer}</p>
-</div>
-"""
+            parts = [_FINANCIAL_RESULT_TMPL.format(
+                method=method.upper(),
+                confidence=confidence,
+                answer=answer
+            )]
             
             # Add source references if available
-            if retrieved and len(retrieved) > 0:
-                response += """
-<div style='padding: 15px; background: #f9fafb; border-radius: 10px; 
-            border-left: 4px solid #667eea; margin: 15px 0;'>
-    <h4 style='color: #374151; margin-top: 0; font-size: 0.95em;'>📚 Sources:</h4>
-    <div style='max-height: 200px; overflow-y: auto;'>
-"""
-                for i, item in enumerate(retrieved[:3], 1):
-                    content = item.get('content', '')[:150]
-                    section = item.get('section', 'Unknown')
-                    score = item.get('score', 0)
-                    
-                    response += f"""
-        <div style='padding: 10px; background: white; border-radius: 6px; 
-                    margin: 8px 0; border: 1px solid #e5e7eb;'>
-            <p style='margin: 0; font-size: 0.85em; color: #6b7280;'>
-                <strong>Source {i}</strong> ({section}) - Relevance: {score:.0%}
-            </p>
-            <p style='margin: 5px 0 0 0; font-size: 0.9em; color: #374151;'>{content}...</p>
-        </div>
-"""
-                
-                response += """
-    </div>
-</div>
-"""
+            if retrieved:
+                parts.append(_FINANCIAL_SOURCES_OPEN_HTML)
+                parts.extend(
+                    _FINANCIAL_SOURCE_TMPL.format(
+                        index=i,
+                        section=item.get('section', 'Unknown'),
+                        score=item.get('score', 0),
+                        content=item.get('content', '')[:150]
+                    )
+                    for i, item in enumerate(retrieved[:3], 1)
+                )
+                parts.append(_FINANCIAL_SOURCES_CLOSE_HTML)
             
             # Add follow-up suggestions
-            response += """
-<div style='padding: 15px; background: #ecfdf5; border-radius: 10px; margin: 15px 0;'>
-    <p style='margin: 0; color: #065f46; font-weight: 600;'>💡 Try asking:</p>
-    <ul style='margin: 10px 0 0 0; color: #047857;'>
-        <li>Compare revenues of Toyota and Tesla</li>
-        <li>What was the operating margin in 2023?</li>
-        <li>Show me R&D spending trends</li>
-        <li>Which company has the highest net income?</li>
-    </ul>
-</div>
-"""
+            parts.append(_FINANCIAL_SUGGESTIONS_HTML)
             
-            return response
+            return "".join(parts)
             
         except Exception as e:
             logger.error(f"❌ Financial query error: {e}")
-            return f"""
-<div style='padding: 15px; background: #fee2e2; border-left: 4px solid #ef4444; 
-            border-radius: 8px; margin: 10px 0;'>
-    <strong>⚠️ Error</strong>
-    <p>Unable to process financial query: {str(e)}</p>
-</div>
-"""
+            return _FINANCIAL_ERROR_TMPL.format(error=str(e))
     
     def _generate_rich_response(self, agent_result: Dict, session: Dict, 
                                 original_message: str) -> str:
@@ -4238,157 +4956,85 @@ Landmark: Next to Springs Town Centre'
         if len(vehicles) > 5:
             vehicles = vehicles[:5]
         
-        # Track viewed vehicles
-        session['viewed_vehicles'].extend([v['id'] for v in vehicles])
-        session['viewed_vehicles'] = list(set(session['viewed_vehicles']))
+        ids = [v['id'] for v in vehicles]
+        
+        # Track viewed vehicles (+ the unsaved delta for VIEWED edges)
+        viewed = session['viewed_vehicles']
+        session.setdefault('_newly_viewed', {}).update(
+            dict.fromkeys(vid for vid in ids if vid not in viewed)
+        )
+        viewed.update(dict.fromkeys(ids))
         
         total_vehicles = len(vehicles)
         
         # ✅ SIMPLIFIED: Smaller header
-        response = f"""
-<div style='padding: 12px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            border-radius: 10px; color: white; margin: 10px 0;'>
-    <h3 style='margin: 0; font-size: 1.1em;'>🚗 Found {original_count} Vehicle(s)</h3>
-    {f"<p style='margin: 3px 0 0 0; font-size: 0.85em; opacity: 0.9;'>Showing top {total_vehicles}</p>" if original_count > 5 else ""}
-</div>
-
-<!-- Carousel -->
-<div style='position: relative; margin: 15px 0;'>
-    <button onclick='document.getElementById("vc").scrollBy({{left:-320,behavior:"smooth"}})' 
-            style='position: absolute; left: -12px; top: 45%; z-index: 10; 
-                   background: #667eea; color: white; border: none; width: 35px; height: 35px; 
-                   border-radius: 50%; cursor: pointer; font-size: 1.1em;'>◀</button>
-    
-    <div id='vc' style='display: flex; overflow-x: auto; gap: 12px; padding: 15px 5px; scroll-behavior: smooth;'>
-"""
-        
-        # ✅ OPTIMIZED: Generate compact vehicle cards
-        for i, v in enumerate(vehicles, 1):
-            vid = v['id']
-            make = v['make']
-            model = v['model']
-            year = v['year']
-            price = v['price']
-            features = v.get('features', [])
-            image = v.get('image', 'https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400')
-            stock = v.get('stock', 0)
-            
-            # ✅ SIMPLIFIED: Stock badge
-            if stock > 5:
-                badge = '<span style="background:#10b981;color:white;padding:3px 8px;border-radius:8px;font-size:0.75em;">✅</span>'
-            elif stock > 0:
-                badge = f'<span style="background:#f59e0b;color:white;padding:3px 8px;border-radius:8px;font-size:0.75em;">⚠️{stock}</span>'
-            else:
-                badge = '<span style="background:#ef4444;color:white;padding:3px 8px;border-radius:8px;font-size:0.75em;">❌</span>'
-            
-            # ✅ COMPACT: Much smaller card HTML
-            response += f"""
-<div style='min-width:280px;max-width:280px;background:white;border-radius:10px;
-            box-shadow:0 2px 8px rgba(0,0,0,0.1);border:1px solid #e5e7eb;'>
-    <img src='{image}' style='width:100%;height:140px;object-fit:cover;border-radius:10px 10px 0 0;'
-         onerror="this.src='https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400'">
-    <div style='padding:12px;'>
-        <div style='display:flex;justify-content:space-between;align-items:start;margin-bottom:6px;'>
-            <h4 style='margin:0;color:#1f2937;font-size:1em;'>{year} {make} {model}</h4>
-            {badge}
-        </div>
-        <p style='font-size:1.4em;color:#667eea;font-weight:700;margin:6px 0;'>AED {price:,}</p>
-        <p style='color:#9ca3af;font-size:0.8em;margin:4px 0;'>ID: {vid}</p>
-"""
-            
-            # ✅ COMPACT: Only show 2 features
-            if features:
-                response += "<div style='display:flex;gap:4px;margin:6px 0;'>"
-                for feature in features[:2]:
-                    response += f"<span style='background:#dbeafe;color:#1e40af;padding:2px 6px;border-radius:6px;font-size:0.7em;'>{feature}</span>"
-                response += "</div>"
-            
-            # ✅ SIMPLIFIED: Booking button with less JavaScript
-            response += f"""
-        <button onclick='
-var i=document.querySelector("#chat_input textarea");
-if(i){{i.value="🚗 BOOK_START:{vid}";i.dispatchEvent(new Event("input",{{bubbles:true}}));
-setTimeout(()=>{{var b=document.querySelector("#send_btn");if(b)b.click();}},150);}}
-else{{alert("Type: Book test drive for {vid}");}}
-' style='width:100%;background:#667eea;color:white;border:none;padding:8px;
-         border-radius:6px;cursor:pointer;font-weight:600;font-size:0.85em;margin-top:6px;'>
-            📅 Book
-        </button>
-    </div>
-</div>
-"""
+        parts = [_VEHICLE_CARDS_HEADER_TMPL.format(
+            original_count=original_count,
+            showing=_VEHICLE_CARDS_SHOWING_TMPL.format(total_vehicles=total_vehicles) if original_count > 5 else ""
+        )]
+        
+        # ✅ OPTIMIZED: Column views built once, then one format per card
+        years = [v['year'] for v in vehicles]
+        makes = [v['make'] for v in vehicles]
+        models = [v['model'] for v in vehicles]
+        prices = [f"{v['price']:,}" for v in vehicles]
+        images = [v.get('image', _DEFAULT_VEHICLE_IMAGE) for v in vehicles]
+        badges = [self._stock_badge(v.get('stock', 0)) for v in vehicles]
+        # ✅ COMPACT: Only show 2 features
+        features = [self._feature_tags(v.get('features', ())[:2]) for v in vehicles]
+        
+        parts.extend(
+            _VEHICLE_CARD_TMPL.format(image=image, year=year, make=make, model=model,
+                                      badge=badge, price=price, vid=vid, features=feats)
+            for vid, year, make, model, price, image, badge, feats
+            in zip(ids, years, makes, models, prices, images, badges, features)
+        )
         
         # Close carousel
-        response += f"""
-    </div>
-    <button onclick='document.getElementById("vc").scrollBy({{left:320,behavior:"smooth"}})' 
-            style='position:absolute;right:-12px;top:45%;z-index:10;
-                   background:#667eea;color:white;border:none;width:35px;height:35px;
-                   border-radius:50%;cursor:pointer;font-size:1.1em;'>▶</button>
-</div>
-
-<div style='text-align:center;padding:8px;background:#f3f4f6;border-radius:8px;margin:8px 0;'>
-    <p style='margin:0;color:#6b7280;font-size:0.85em;'>
-        📊 Showing {total_vehicles} of {original_count} • {"Try specific search for more" if original_count > 5 else "Scroll to browse"}
-    </p>
-</div>
-"""
+        parts.append(_VEHICLE_CARDS_FOOTER_TMPL.format(
+            total_vehicles=total_vehicles,
+            original_count=original_count,
+            hint="Try specific search for more" if original_count > 5 else "Scroll to browse"
+        ))
         
-        return response
+        return "".join(parts)
+    
+    @staticmethod
+    def _stock_badge(stock: int) -> str:
+        """Stock badge for a vehicle card"""
+        if stock > 5:
+            return _BADGE_IN_STOCK
+        if stock > 0:
+            return _BADGE_LOW_STOCK_TMPL.format(stock=stock)
+        return _BADGE_OUT_OF_STOCK
+    
+    @staticmethod
+    def _feature_tags(features) -> str:
+        """Feature pills for a vehicle card (empty when no features)"""
+        if not features:
+            return ""
+        return _FEATURE_TAGS_TMPL.format(
+            tags="".join(_FEATURE_TAG_TMPL.format(feature=f) for f in features)
+        )
     
     def _format_no_results(self, query: str) -> str:
         """Format no results message with suggestions"""
-        return f"""
-<div style='text-align: center; padding: 40px 20px; background: #f9fafb; 
-            border-radius: 12px; margin: 15px 0; border: 2px dashed #d1d5db;'>
-    <div style='font-size: 3em; margin-bottom: 15px;'>🔍</div>
-    <h3 style='color: #4a5568; margin: 10px 0;'>No Vehicles Found</h3>
-    <p style='color: #718096;'>No results for "{query}"</p>
-    
-    <div style='margin-top: 20px;'>
-        <p style='font-size: 0.9em; color: #777;'><strong>Try:</strong></p>
-        <div style='display: flex; gap: 10px; justify-content: center; flex-wrap: wrap; margin-top: 10px;'>
-            <span style='background: white; padding: 8px 16px; border-radius: 20px; border: 1px solid #e5e7eb;'>luxury SUV</span>
-            <span style='background: white; padding: 8px 16px; border-radius: 20px; border: 1px solid #e5e7eb;'>cars under 200k</span>
-            <span style='background: white; padding: 8px 16px; border-radius: 20px; border: 1px solid #e5e7eb;'>Toyota</span>
-        </div>
-    </div>
-</div>
-"""
+        return _NO_RESULTS_TMPL.format(query=query)
     
     def _format_comparison(self, vehicles: List[Dict], base_response: str) -> str:
         """Format vehicle comparison"""
-        v1, v2 = vehicles[0], vehicles[1]
-        
-        response = f"""
-<div style='padding: 15px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            border-radius: 12px; color: white; margin: 10px 0;'>
-    <h3 style='margin: 0;'>⚖️ Vehicle Comparison</h3>
-</div>
-
-<div style='display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 15px 0;'>
-"""
-        
-        for vehicle in [v1, v2]:
-            response += f"""
-    <div style='background: white; border-radius: 12px; overflow: hidden; 
-                border: 2px solid #e5e7eb; box-shadow: 0 4px 12px rgba(0,0,0,0.1);'>
-        <img src='{vehicle.get("image", "https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400")}' 
-             style='width: 100%; height: 150px; object-fit: cover;'
-             onerror="this.src='https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400'">
-        <div style='padding: 15px;'>
-            <h4 style='margin: 0 0 10px 0; color: #1f2937;'>{vehicle['year']} {vehicle['make']} {vehicle['model']}</h4>
-            <p style='font-size: 1.5em; color: #667eea; font-weight: 700; margin: 8px 0;'>AED {vehicle['price']:,}</p>
-            <p style='color: #6b7280; font-size: 0.9em;'>Stock: {vehicle.get('stock', 0)} units</p>
-        </div>
-    </div>
-"""
-        
-        response += """
-</div>
-"""
-        
-        return response
+        vehicles = vehicles[:2]
+        images = [v.get('image', _DEFAULT_VEHICLE_IMAGE) for v in vehicles]
+        prices = [f"{v['price']:,}" for v in vehicles]
+        stocks = [v.get('stock', 0) for v in vehicles]
+        
+        return "".join((
+            _COMPARISON_HEADER_HTML,
+            *(_COMPARISON_CARD_TMPL.format(image=image, year=v['year'], make=v['make'],
+                                           model=v['model'], price=price, stock=stock)
+              for v, image, price, stock in zip(vehicles, images, prices, stocks)),
+            "</div>"
+        ))
     
     def _format_sentiment_response(self, sentiment_data: Dict, base_response: str) -> str:
         """Format sentiment response"""
@@ -4396,68 +5042,30 @@ else{{alert("Type: Book test drive for {vid}");}}
         emoji = sentiment_data.get('emoji', '😊')
         score = sentiment_data.get('score', 0.5)
         
-        colors = {
-            'positive': {'bg': '#ecfdf5', 'border': '#10b981', 'text': '#065f46'},
-            'negative': {'bg': '#fef2f2', 'border': '#ef4444', 'text': '#991b1b'},
-            'neutral': {'bg': '#f0f9ff', 'border': '#3b82f6', 'text': '#1e3a8a'}
-        }
-        
-        color = colors.get(sentiment, colors['neutral'])
-        
-        return f"""
-<div style='padding: 20px; background: {color['bg']}; border-left: 4px solid {color['border']}; 
-            border-radius: 10px; margin: 15px 0;'>
-    <div style='display: flex; align-items: center; gap: 12px; margin-bottom: 12px;'>
-        <span style='font-size: 2em;'>{emoji}</span>
-        <div>
-            <p style='margin: 0; color: {color['text']}; font-weight: 600; font-size: 1.1em;'>
-                {sentiment.title()} Sentiment
-            </p>
-            <p style='margin: 4px 0 0 0; color: {color['text']}; font-size: 0.9em;'>
-                Confidence: {score:.1%}
-            </p>
-        </div>
-    </div>
-    <p style='margin: 0; color: {color['text']}; line-height: 1.6;'>{base_response}</p>
-</div>
-"""
+        shell = _SENTIMENT_SHELL.get(sentiment, _SENTIMENT_SHELL['neutral'])
+        return shell.format(emoji=emoji, title=sentiment.title(), score_pct=f"{score:.1%}", base=base_response)
     
     def _format_appointment_options(self, base_response: str) -> str:
         """Format appointment options"""
-        return f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #667eea; margin: 15px 0;'>
-    <h3 style='color: #667eea; margin: 0 0 15px 0;'>📅 Book Your Test Drive</h3>
-    <p style='color: #4b5563; margin: 0 0 15px 0;'>{base_response}</p>
-    
-    <div style='background: #f9fafb; padding: 15px; border-radius: 8px;'>
-        <p style='margin: 0 0 10px 0; color: #1f2937; font-weight: 600;'>📋 What you'll need:</p>
-        <ul style='margin: 0; color: #4b5563; line-height: 1.8;'>
-            <li>Vehicle ID (from search results)</li>
-            <li>Preferred date and time</li>
-            <li>Your contact information</li>
-        </ul>
-    </div>
-</div>
-"""
+        return _APPOINTMENT_OPTIONS_TMPL.format(base=base_response)
     
     def _format_info_response(self, base_response: str) -> str:
         """Format info response"""
-        return f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #e5e7eb; margin: 15px 0;'>
-    <p style='color: #374151; line-height: 1.8;'>{base_response.replace(chr(10)+chr(10), '</p><p style="margin: 12px 0;">').replace(chr(10), '<br>')}</p>
-</div>
-"""
+        if not base_response:
+            return ""
+        if base_response.lstrip().startswith('<div'):
+            return base_response  # Already rendered HTML
+        if '\n' in base_response:
+            base_response = base_response.replace('\n\n', _INFO_PARAGRAPH_BREAK).replace('\n', _INFO_LINE_BREAK)
+        return _INFO_RESPONSE_TMPL.format(base=base_response)
     
     def _format_default_response(self, base_response: str) -> str:
         """Format default response"""
-        return f"""
-<div style='padding: 20px; background: white; border-radius: 12px; 
-            border: 2px solid #e5e7eb; margin: 15px 0;'>
-    <p style='color: #374151; line-height: 1.6;'>{base_response}</p>
-</div>
-"""
+        if not base_response:
+            return ""
+        if base_response.lstrip().startswith('<div'):
+            return base_response  # Already rendered HTML
+        return _DEFAULT_RESPONSE_TMPL.format(base=base_response)
     
     def _get_smart_recommendations(self, session: Dict) -> str:
         """Get smart recommendations based on browsing history"""
@@ -4467,60 +5075,30 @@ else{{alert("Type: Book test drive for {vid}");}}
             return ""
         
         try:
-            # Get similar vehicles from Neo4j
-            with self.app.neo4j.driver.session(database=self.app.neo4j.database) as neo_session:
-                result = neo_session.run("""
-                    MATCH (v:Vehicle)
-                    WHERE NOT v.id IN $viewed_ids
-                    RETURN v
-                    ORDER BY v.price
-                    LIMIT 3
-                """, viewed_ids=viewed[-3:])
-                
-                recommendations = []
-                for record in result:
-                    v = record['v']
-                    recommendations.append({
-                        'id': v['id'],
-                        'make': v['make'],
-                        'model': v['model'],
-                        'year': v['year'],
-                        'price': v['price'],
-                        'image': v.get('image', 'https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400')
-                    })
+            # Get similar vehicles from Neo4j (pooled read transaction)
+            # Index-backed (vehicle_price) ordered scan; only the card fields come back
+            result = self.neo4j.execute_with_retry("""
+                MATCH (v:Vehicle)
+                WHERE v.price IS NOT NULL AND NOT v.id IN $viewed_ids
+                RETURN v.id AS id, v.make AS make, v.model AS model, v.year AS year,
+                       v.price AS price, coalesce(v.image, $default_image) AS image
+                ORDER BY v.price
+                LIMIT 3
+            """, {
+                'viewed_ids': list(viewed)[-3:],
+                'default_image': _DEFAULT_VEHICLE_IMAGE
+            }, timeout=10.0, read_only=True)
+            
+            recommendations = [record.data() for record in result or []]
             
             if not recommendations:
                 return ""
             
-            response = """
-<div style='padding: 15px; background: linear-gradient(135deg, #fbbf24 0%, #f59e0b 100%); 
-            border-radius: 12px; color: white; margin: 20px 0;'>
-    <h3 style='margin: 0 0 10px 0;'>💡 You Might Also Like</h3>
-    <p style='margin: 0; opacity: 0.95;'>Based on your browsing history</p>
-</div>
-
-<div style='display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 12px; margin: 15px 0;'>
-"""
-            
-            for rec in recommendations:
-                response += f"""
-    <div style='background: white; border-radius: 10px; overflow: hidden; 
-                border: 2px solid #e5e7eb; cursor: pointer;'>
-        <img src='{rec['image']}' 
-             style='width: 100%; height: 120px; object-fit: cover;'
-             onerror="this.src='https://images.unsplash.com/photo-1552519507-da3b142c6e3d?w=400'">
-        <div style='padding: 12px;'>
-            <h4 style='margin: 0 0 6px 0; color: #1f2937; font-size: 0.95em;'>{rec['year']} {rec['make']}</h4>
-            <p style='margin: 0; color: #667eea; font-weight: 700;'>AED {rec['price']:,}</p>
-        </div>
-    </div>
-"""
-            
-            response += """
-</div>
-"""
+            parts = [_RECOMMENDATIONS_HEADER_HTML]
+            parts.extend(_RECOMMENDATION_CARD_TMPL.format(**rec) for rec in recommendations)
+            parts.append("</div>")
             
-            return response
+            return "".join(parts)
             
         except Exception as e:
             logger.error(f"Recommendations error: {e}")
@@ -4528,25 +5106,7 @@ else{{alert("Type: Book test drive for {vid}");}}
     
     def _error_response(self, custom_message: str = None) -> str:
         """Format error response"""
-        message = custom_message or "I apologize for the inconvenience."
-        return f"""
-<div style='padding: 20px; background: #fef2f2; border-left: 4px solid #ef4444; 
-            border-radius: 10px; margin: 15px 0;'>
-    <div style='display: flex; align-items: center; gap: 12px;'>
-        <span style='font-size: 2em;'>⚠️</span>
-        <div>
-            <p style='margin: 0; color: #991b1b; font-weight: 600;'>Oops! Something went wrong</p>
-            <p style='margin: 6px 0 0 0; color: #dc2626;'>{message}</p>
-            <p style='margin: 6px 0 0 0; color: #dc2626;'>Please try:</p>
-            <ul style='margin: 8px 0 0 0; color: #dc2626;'>
-                <li>Rephrasing your question</li>
-                <li>Asking about something else</li>
-                <li>Contacting support if the issue persists</li>
-            </ul>
-        </div>
-    </div>
-</div>
-"""
+        return _ERROR_RESPONSE_TMPL.format(message=custom_message or "I apologize for the inconvenience.")
 
     def _handle_escalation(self, message: str, session: Dict) -> str:
         """Handle escalation requests"""
@@ -4555,38 +5115,30 @@ else{{alert("Type: Book test drive for {vid}");}}
             user_name = session.get('user_name', 'Customer')
             user_email = session.get('user_email', 'anonymous')
         
-        # Log to Neo4j
-            try:
-                with self.neo4j.driver.session(database=self.neo4j.database) as neo_session:
-                    escalation_id = f"ESC{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                
-                    neo_session.run("""
-                        CREATE (e:Escalation {
-                            id: $id,
-                            type: $type,
-                            customer_email: $email,
-                            customer_name: $name,
-                            status: 'pending',
-                            priority: 'high',
-                            created_at: datetime(),
-                            session_id: $session_id
-                        })
-                    """, id=escalation_id, type=escalation_type, 
-                        email=user_email, name=user_name,
-                        session_id=session.get('session_id'))
-                
-                    logger.info(f"✅ Escalation logged: {escalation_id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to log escalation: {e}")
-        
-        # Generate response based on escalation type
+        # Log to Neo4j (ticket id is minted here; the batched writer creates the node)
+            # Suffix keeps same-second escalations apart (the writer MERGEs on this id)
+            escalation_id = f"ESC{time.strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(3)}"
+            self._feedback_queue.put(('escalation', {
+                'id': escalation_id,
+                'type': escalation_type,
+                'email': user_email,
+                'name': user_name,
+                'session_id': session.get('session_id'),
+                'now': datetime.now(timezone.utc)
+            }))
+            logger.info(f"✅ Escalation queued: {escalation_id}")
+        
+        # Generate response based on escalation type (escape user values once)
+            safe_name = str(user_name or 'Customer').translate(_HTML_ESCAPE)
+            safe_email = str(user_email or 'anonymous').translate(_HTML_ESCAPE)
+            
             if escalation_type == 'urgent_support':
                 return f"""
 <div style='padding: 20px; background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
             border-radius: 12px; color: white; margin: 15px 0;'>
     <h3 style='margin: 0 0 12px 0;'>✅ Support Request Received</h3>
     <p style='margin: 0 0 15px 0; opacity: 0.95;'>
-        Hi {user_name}, I've escalated your request to our support team.
+        Hi {safe_name}, I've escalated your request to our support team.
     </p>
     
     <div style='background: rgba(255,255,255,0.15); padding: 15px; border-radius: 8px;'>
@@ -4598,7 +5150,7 @@ else{{alert("Type: Book test drive for {vid}");}}
 
 <div style='padding: 15px; background: #ecfdf5; border-radius: 10px; margin: 15px 0;'>
     <p style='margin: 0; color: #065f46;'>
-        📧 A support agent will contact you at <strong>{user_email}</strong> shortly.
+        📧 A support agent will contact you at <strong>{safe_email}</strong> shortly.
     </p>
 </div>
 """
@@ -4617,7 +5169,7 @@ else{{alert("Type: Book test drive for {vid}");}}
             border: 2px solid #e5e7eb; margin: 15px 0;'>
     <h4 style='margin: 0 0 10px 0; color: #374151;'>Request Details</h4>
     <p style='margin: 0 0 8px 0;'><strong>Reference:</strong> {escalation_id}</p>
-    <p style='margin: 0 0 8px 0;'><strong>Callback:</strong> {user_email}</p>
+    <p style='margin: 0 0 8px 0;'><strong>Callback:</strong> {safe_email}</p>
     <p style='margin: 0;'><strong>Status:</strong> Priority Queue</p>
 </div>
 """
@@ -4636,8 +5188,8 @@ else{{alert("Type: Book test drive for {vid}");}}
             border: 2px solid #e5e7eb; margin: 15px 0;'>
     <h4 style='margin: 0 0 10px 0; color: #374151;'>Complaint Reference</h4>
     <p style='margin: 0 0 8px 0;'><strong>Complaint ID:</strong> {escalation_id}</p>
-    <p style='margin: 0 0 8px 0;'><strong>Filed By:</strong> {user_name}</p>
-    <p style='margin: 0 0 8px 0;'><strong>Contact:</strong> {user_email}</p>
+    <p style='margin: 0 0 8px 0;'><strong>Filed By:</strong> {safe_name}</p>
+    <p style='margin: 0 0 8px 0;'><strong>Contact:</strong> {safe_email}</p>
     <p style='margin: 0;'><strong>Review Timeline:</strong> 24-48 hours</p>
 </div>
 
@@ -7,17 +7,71 @@ Features:
 - Privacy-compliant exports
 """
 
+import csv
 import logging
 import json
-import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import os
 import tempfile
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+try:
+    import xlsxwriter
+    _HAS_XLSXWRITER = True
+except ImportError:
+    _HAS_XLSXWRITER = False
+
+try:
+    import openpyxl
+    _HAS_OPENPYXL = True
+except ImportError:
+    _HAS_OPENPYXL = False
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Lightweight export records (rows are only iterated, never mutated)
+ExportMessage = namedtuple('ExportMessage', 'role message timestamp')
+ExportConversation = namedtuple(
+    'ExportConversation',
+    'session_id user_email started_at last_updated message_count last_intent language messages'
+)
+
+# Column order for CSV exports (one row per message)
+_CSV_FIELDNAMES = (
+    'session_id', 'user_email', 'started_at', 'last_updated',
+    'message_count', 'last_intent', 'language',
+    'message_number', 'message_role', 'message_content', 'message_timestamp'
+)
+
+# Sheet headers for Excel exports
+_EXCEL_SUMMARY_COLUMNS = (
+    'Session ID', 'User Email', 'Started At', 'Last Updated',
+    'Messages', 'Last Intent', 'Language'
+)
+_EXCEL_MESSAGE_COLUMNS = (
+    'Session ID', 'User Email', 'Message #', 'Role', 'Content', 'Timestamp'
+)
+_EXCEL_STATS_COLUMNS = ('Metric', 'Value')
+
+# Dashboard re-polls of the same date range are served from memory for this long
+_STATS_CACHE_TTL_SECONDS = 60.0
+_STATS_CACHE_MAX_ENTRIES = 32
+
+
+def _file_timestamp() -> str:
+    """Local-time stamp for export filenames (no datetime object needed)"""
+    return time.strftime('%Y%m%d_%H%M%S')
+
 
 class ConversationExporter:
     """Export conversation data from Neo4j"""
@@ -26,6 +80,9 @@ class ConversationExporter:
         self.neo4j = neo4j_handler
         # Set output directory to temp
         self.output_dir = tempfile.gettempdir()
+        # (start_date, end_date) -> (cached_at, statistics)
+        self._stats_cache: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._stats_cache_lock = threading.Lock()
         logger.info(f"✅ ConversationExporter initialized (output: {self.output_dir})")
     
     def get_conversations_by_date_range(
@@ -33,7 +90,7 @@ class ConversationExporter:
         start_date: str, 
         end_date: str,
         email_filter: Optional[str] = None
-    ) -> List[Dict]:
+    ) -> List[ExportConversation]:
         """
         Get conversations within date range
         
@@ -63,25 +120,30 @@ class ConversationExporter:
                 query += " AND c.user_email = $email"
                 params['email'] = email_filter
             
-            # ✅ KEY FIX: Order conversations BEFORE collecting messages
+            # ✅ Sort conversations once; sort each conversation's messages
+            # separately (no global sort over every conversation/message pair)
             query += """
                 WITH c
                 ORDER BY c.created_at DESC
-                OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
-                WITH c, m
-                ORDER BY c.created_at DESC, m.timestamp ASC
+                CALL {
+                    WITH c
+                    MATCH (c)-[:HAS_MESSAGE]->(m:Message)
+                    WHERE m.clean_content IS NOT NULL AND m.clean_content <> ""
+                    WITH m
+                    ORDER BY m.timestamp ASC
+                    // Aggregating no rows still yields one row ([] for a conversation
+                    // without messages); collect() keeps the ordered WITH's row order
+                    // [role, message, timestamp] - positional, matches ExportMessage
+                    RETURN collect([m.role, m.clean_content, toString(m.timestamp)]) as messages
+                }
                 RETURN c.session_id as session_id,
                        c.user_email as user_email,
-                       c.created_at as started_at,
-                       c.last_updated as last_updated,
+                       toString(c.created_at) as started_at,
+                       toString(c.last_updated) as last_updated,
                        c.message_count as message_count,
                        c.last_intent as last_intent,
                        c.preferred_language as language,
-                       collect(DISTINCT {
-                           role: m.role,
-                           message: m.clean_content,
-                           timestamp: m.timestamp
-                       }) as messages
+                       messages
             """
             
             logger.info(f"🔍 Querying conversations from {start_date} to {end_date}")
@@ -94,40 +156,20 @@ class ConversationExporter:
             conversations = []
             if results:
                 for record in results:
-                    # Convert all datetime objects to strings
-                    started_at = record['started_at']
-                    if started_at:
-                        started_at = str(started_at)
-                    
-                    last_updated = record['last_updated']
-                    if last_updated:
-                        last_updated = str(last_updated)
-                    
-                    # Process messages - filter out empty ones
-                    messages = []
-                    for msg in record['messages']:
-                        # Skip empty message objects
-                        if msg and msg.get('message'):
-                            timestamp = msg.get('timestamp')
-                            if timestamp:
-                                timestamp = str(timestamp)
-                            
-                            messages.append({
-                                'role': msg['role'],
-                                'message': msg['message'],
-                                'timestamp': timestamp
-                            })
+                    # Datetimes arrive as strings (toString in Cypher) and
+                    # empty messages are already filtered out there too
+                    messages = [ExportMessage._make(msg) for msg in record['messages']]
                     
-                    conversations.append({
-                        'session_id': record['session_id'],
-                        'user_email': record['user_email'] or 'anonymous',
-                        'started_at': started_at,
-                        'last_updated': last_updated,
-                        'message_count': record['message_count'] or len(messages),
-                        'last_intent': record['last_intent'],
-                        'language': record['language'] or 'en',
-                        'messages': messages
-                    })
+                    conversations.append(ExportConversation(
+                        record['session_id'],
+                        record['user_email'] or 'anonymous',
+                        record['started_at'],
+                        record['last_updated'],
+                        record['message_count'] or len(messages),
+                        record['last_intent'],
+                        record['language'] or 'en',
+                        messages
+                    ))
             
             logger.info(f"✅ Processed {len(conversations)} conversations")
             return conversations
@@ -140,7 +182,7 @@ class ConversationExporter:
     
     def export_to_csv(
         self, 
-        conversations: List[Dict], 
+        conversations: List[ExportConversation], 
         output_path: Optional[str] = None
     ) -> Tuple[bool, str]:
         """
@@ -159,43 +201,29 @@ class ConversationExporter:
             
             # Use temp directory if no path specified
             if output_path is None:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                timestamp = _file_timestamp()
                 output_path = os.path.join(self.output_dir, f"conversations_{timestamp}.csv")
             
-            # Flatten data for CSV
-            rows = []
-            for conv in conversations:
-                base_data = {
-                    'session_id': conv['session_id'],
-                    'user_email': conv['user_email'],
-                    'started_at': conv['started_at'],
-                    'last_updated': conv['last_updated'],
-                    'message_count': conv['message_count'],
-                    'last_intent': conv['last_intent'],
-                    'language': conv['language']
-                }
-                
-                # Add each message as a separate row
-                for idx, msg in enumerate(conv['messages'], 1):
-                    row = base_data.copy()
-                    row.update({
-                        'message_number': idx,
-                        'message_role': msg['role'],
-                        'message_content': msg['message'],
-                        'message_timestamp': str(msg['timestamp'])
-                    })
-                    rows.append(row)
-            
-            # Create DataFrame and save
-            df = pd.DataFrame(rows)
-            
             # Ensure output directory exists
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            df.to_csv(output_path, index=False, encoding='utf-8')
-            
-            logger.info(f"✅ Exported {len(rows)} messages to {output_path}")
-            return True, f"Successfully exported {len(conversations)} conversations ({len(rows)} messages) to CSV"
+            # Stream one row per message instead of materializing a DataFrame
+            row_count = 0
+            with open(output_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(_CSV_FIELDNAMES)
+                for conv in conversations:
+                    # session_id .. language: the first seven conversation fields
+                    conv_fields = conv[:7]
+                    for idx, msg in enumerate(conv.messages, 1):
+                        writer.writerow((
+                            *conv_fields,
+                            idx, msg.role, msg.message, str(msg.timestamp)
+                        ))
+                    row_count += len(conv.messages)
+            
+            logger.info(f"✅ Exported {row_count} messages to {output_path}")
+            return True, f"Successfully exported {len(conversations)} conversations ({row_count} messages) to CSV"
             
         except Exception as e:
             logger.error(f"❌ CSV export error: {e}")
@@ -205,7 +233,7 @@ class ConversationExporter:
     
     def export_to_json(
         self, 
-        conversations: List[Dict], 
+        conversations: List[ExportConversation], 
         output_path: Optional[str] = None
     ) -> Tuple[bool, str]:
         """
@@ -224,7 +252,7 @@ class ConversationExporter:
             
             # Use temp directory if no path specified
             if output_path is None:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                timestamp = _file_timestamp()
                 output_path = os.path.join(self.output_dir, f"conversations_{timestamp}.json")
             
             # Ensure output directory exists
@@ -234,12 +262,23 @@ class ConversationExporter:
             export_data = {
                 'export_date': datetime.now().isoformat(),
                 'total_conversations': len(conversations),
-                'conversations': conversations
+                'conversations': [
+                    dict(conv._asdict(), messages=[msg._asdict() for msg in conv.messages])
+                    for conv in conversations
+                ]
             }
             
-            # Save to JSON
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            # Save to JSON (timestamps are already strings, so orjson needs no default hook)
+            if _HAS_ORJSON:
+                payload = orjson.dumps(
+                    export_data,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                )
+                with open(output_path, 'wb') as f:
+                    f.write(payload)
+            else:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(export_data, f, indent=2, ensure_ascii=False)
             
             logger.info(f"✅ Exported {len(conversations)} conversations to {output_path}")
             return True, f"Successfully exported {len(conversations)} conversations to JSON"
@@ -252,7 +291,7 @@ class ConversationExporter:
     
     def export_to_excel(
         self, 
-        conversations: List[Dict], 
+        conversations: List[ExportConversation], 
         output_path: Optional[str] = None
     ) -> Tuple[bool, str]:
         """
@@ -266,11 +305,9 @@ class ConversationExporter:
             Tuple of (success: bool, message: str)
         """
         try:
-            # Check for openpyxl first
-            try:
-                import openpyxl
-            except ImportError:
-                error_msg = "❌ openpyxl not installed. Run: pip install openpyxl --break-system-packages"
+            # Prefer xlsxwriter (streams rows in constant memory), fall back to openpyxl
+            if not _HAS_XLSXWRITER and not _HAS_OPENPYXL:
+                error_msg = "❌ No Excel writer installed. Run: pip install xlsxwriter (or openpyxl) --break-system-packages"
                 logger.error(error_msg)
                 return False, error_msg
             
@@ -279,66 +316,66 @@ class ConversationExporter:
             
             # Use temp directory if no path specified
             if output_path is None:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                timestamp = _file_timestamp()
                 output_path = os.path.join(self.output_dir, f"conversations_{timestamp}.xlsx")
             
             # Ensure output directory exists
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            # Create Excel writer
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                # Sheet 1: Summary
-                summary_data = []
-                for conv in conversations:
-                    summary_data.append({
-                        'Session ID': conv['session_id'],
-                        'User Email': conv['user_email'],
-                        'Started At': conv['started_at'],
-                        'Last Updated': conv['last_updated'],
-                        'Messages': conv['message_count'],
-                        'Last Intent': conv['last_intent'],
-                        'Language': conv['language']
-                    })
-                
-                df_summary = pd.DataFrame(summary_data)
-                df_summary.to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Sheet 2: Detailed Messages
-                message_data = []
-                for conv in conversations:
-                    for idx, msg in enumerate(conv['messages'], 1):
-                        message_data.append({
-                            'Session ID': conv['session_id'],
-                            'User Email': conv['user_email'],
-                            'Message #': idx,
-                            'Role': msg['role'],
-                            'Content': msg['message'],
-                            'Timestamp': str(msg['timestamp'])
-                        })
-                
-                df_messages = pd.DataFrame(message_data)
-                df_messages.to_excel(writer, sheet_name='Messages', index=False)
+            # Single pass: summary rows, message rows and statistics accumulators
+            summary_rows = []
+            message_rows = []
+            total_messages = 0
+            unique_users = set()
+            for conv in conversations:
+                session_id = conv.session_id
+                user_email = conv.user_email
+                summary_rows.append(conv[:7])
                 
-                # Sheet 3: Statistics
-                stats_data = {
-                    'Metric': [
-                        'Total Conversations',
-                        'Total Messages',
-                        'Unique Users',
-                        'Average Messages per Conversation',
-                        'Date Range'
-                    ],
-                    'Value': [
-                        len(conversations),
-                        sum(conv['message_count'] for conv in conversations),
-                        len(set(conv['user_email'] for conv in conversations)),
-                        round(sum(conv['message_count'] for conv in conversations) / len(conversations), 2) if conversations else 0,
-                        f"{conversations[-1]['started_at']} to {conversations[0]['started_at']}" if conversations else 'N/A'
-                    ]
-                }
+                for idx, msg in enumerate(conv.messages, 1):
+                    message_rows.append((
+                        session_id, user_email, idx,
+                        msg.role, msg.message, str(msg.timestamp)
+                    ))
                 
-                df_stats = pd.DataFrame(stats_data)
-                df_stats.to_excel(writer, sheet_name='Statistics', index=False)
+                total_messages += conv.message_count
+                unique_users.add(user_email)
+            
+            stats_rows = [
+                ('Total Conversations', len(conversations)),
+                ('Total Messages', total_messages),
+                ('Unique Users', len(unique_users)),
+                ('Average Messages per Conversation', round(total_messages / len(conversations), 2)),
+                ('Date Range', f"{conversations[-1].started_at} to {conversations[0].started_at}")
+            ]
+            
+            sheets = (
+                ('Summary', _EXCEL_SUMMARY_COLUMNS, summary_rows),
+                ('Messages', _EXCEL_MESSAGE_COLUMNS, message_rows),
+                ('Statistics', _EXCEL_STATS_COLUMNS, stats_rows)
+            )
+            
+            if _HAS_XLSXWRITER:
+                # constant_memory flushes each row once the next one starts, so
+                # every sheet is written strictly top-to-bottom via write_row
+                # (pandas' to_excel writes column by column and would lose cells)
+                workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+                try:
+                    header_format = workbook.add_format({'bold': True, 'border': 1})
+                    for sheet_name, columns, rows in sheets:
+                        worksheet = workbook.add_worksheet(sheet_name)
+                        worksheet.write_row(0, 0, columns, header_format)
+                        for row_idx, row in enumerate(rows, 1):
+                            worksheet.write_row(row_idx, 0, row)
+                finally:
+                    workbook.close()
+            else:
+                # pandas is only needed for the openpyxl fallback - import it lazily
+                import pandas as pd
+                with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+                    for sheet_name, columns, rows in sheets:
+                        df = pd.DataFrame(rows, columns=list(columns))
+                        df.to_excel(writer, sheet_name=sheet_name, index=False)
             
             logger.info(f"✅ Exported {len(conversations)} conversations to {output_path}")
             return True, f"Successfully exported {len(conversations)} conversations to Excel (3 sheets)"
@@ -364,17 +401,27 @@ class ConversationExporter:
         Returns:
             Dictionary with statistics
         """
+        cache_key = (start_date, end_date)
+        with self._stats_cache_lock:
+            cached = self._stats_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < _STATS_CACHE_TTL_SECONDS:
+            return cached[1]
+        
         try:
-            # ✅ FIXED QUERY - Added WITH clause
+            # ✅ Count messages per conversation in a subquery so the
+            # conversation-level aggregates run over C rows, not C × M
             query = """
                 MATCH (c:Conversation)
                 WHERE c.created_at >= datetime($start_date)
                   AND c.created_at <= datetime($end_date)
-                WITH c
-                OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
+                CALL {
+                    WITH c
+                    OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
+                    RETURN count(m) as conversation_messages
+                }
                 RETURN 
-                    count(DISTINCT c) as total_conversations,
-                    count(m) as total_messages,
+                    count(c) as total_conversations,
+                    sum(conversation_messages) as total_messages,
                     count(DISTINCT c.user_email) as unique_users,
                     avg(c.message_count) as avg_messages_per_conversation,
                     collect(DISTINCT c.last_intent) as intents,
@@ -395,7 +442,7 @@ class ConversationExporter:
                 intents = [i for i in record['intents'] if i]
                 languages = [l for l in record['languages'] if l]
                 
-                return {
+                stats = {
                     'total_conversations': record['total_conversations'],
                     'total_messages': record['total_messages'],
                     'unique_users': record['unique_users'],
@@ -404,22 +451,39 @@ class ConversationExporter:
                     'languages': languages,
                     'date_range': f"{start_date} to {end_date}"
                 }
+            else:
+                stats = {
+                    'total_conversations': 0,
+                    'total_messages': 0,
+                    'unique_users': 0,
+                    'avg_messages_per_conversation': 0,
+                    'intents': [],
+                    'languages': [],
+                    'date_range': f"{start_date} to {end_date}"
+                }
             
-            return {
-                'total_conversations': 0,
-                'total_messages': 0,
-                'unique_users': 0,
-                'avg_messages_per_conversation': 0,
-                'intents': [],
-                'languages': [],
-                'date_range': f"{start_date} to {end_date}"
-            }
+            # execute_with_retry returns None on failure - don't pin zeros for a minute
+            if results is not None:
+                self._cache_statistics(cache_key, stats)
+            return stats
             
         except Exception as e:
             logger.error(f"❌ Statistics error: {e}")
             import traceback
             traceback.print_exc()
             return {}
+    
+    def _cache_statistics(self, cache_key: Tuple[str, str], stats: Dict):
+        """Store a statistics result, evicting expired/oldest entries when full"""
+        now = time.monotonic()
+        with self._stats_cache_lock:
+            if len(self._stats_cache) >= _STATS_CACHE_MAX_ENTRIES:
+                for key, (cached_at, _) in list(self._stats_cache.items()):
+                    if now - cached_at >= _STATS_CACHE_TTL_SECONDS:
+                        self._stats_cache.pop(key, None)
+                if len(self._stats_cache) >= _STATS_CACHE_MAX_ENTRIES:
+                    self._stats_cache.pop(next(iter(self._stats_cache)), None)
+            self._stats_cache[cache_key] = (now, stats)
 
 
 # Testing function
@@ -4,151 +4,46 @@ Sends confirmation emails for test drive bookings and appointments
 """
 
 import os
+import time
+import asyncio
+import itertools
 import logging
+import threading
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, List, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool for SendGrid (sockets + TLS reused across sends)
+_HTTP_POOL_CONNECTIONS = 10
+_HTTP_POOL_MAXSIZE = 20
+_SEND_TIMEOUT = 10
+# Gateway errors are retried with backoff; SendGrid has not accepted the mail yet
+_RETRY_STATUSES = (502, 503, 504)
+# 429s are handled in _post: wait for SendGrid's Retry-After (capped) and try once more
+_RATE_LIMIT_STATUS = 429
+_MAX_RETRY_AFTER = 5
+# Send failures log a full traceback only 1 in N times (an outage can fail every send)
+_SEND_ERROR_TRACEBACK_EVERY = 100
+# SendGrid v3 accepts at most 1000 personalizations per request
+_MAX_PERSONALIZATIONS = 1000
 
-class EmailNotificationService:
-    """
-    Email notification service using SendGrid API
-    
-    Features:
-    - Test drive confirmations
-    - Appointment confirmations
-    - Rescheduling notifications
-    - Cancellation notices
-    """
-    
-    def __init__(self, api_key: Optional[str] = None, from_email: Optional[str] = None):
-        """
-        Initialize email service
-        
-        Args:
-            api_key: SendGrid API key (or set SENDGRID_API_KEY env var)
-            from_email: Sender email (or set SENDER_EMAIL env var)
-        """
-        ##self.api_key = api_key or os.getenv('SENDGRID_API_KEY')
-        self.api_key = 'XXXXXXXXXXXXXXXXXXXXX'
-        ##self.from_email = from_email or os.getenv('SENDER_EMAIL', 'XXXXXXXXXXXXX@gmail.com')
-        self.from_email = 'XXXXXXXX@gmail.com'
-        self.api_url = 'https://XXXXX.com/v3/mail/send'
-        
-        if not self.api_key:
-            logger.warning("⚠️ SendGrid API key not configured. Email notifications will be disabled.")
-            self.enabled = False
-        else:
-            self.enabled = True
-            logger.info(f"✅ Email service initialized. Sender: {self.from_email}")
-    
-    def _send_email(self, to_email: str, subject: str, html_content: str, text_content: str) -> Dict:
-        """
-        Internal method to send email via SendGrid API
-        
-        Args:
-            to_email: Recipient email
-            subject: Email subject
-            html_content: HTML version of email
-            text_content: Plain text version
-            
-        Returns:
-            Dict with success status and message
-        """
-        if not self.enabled:
-            logger.warning(f"📧 Email service disabled. Would send to: {to_email}")
-            return {
-                'success': False,
-                'message': 'Email service not configured'
-            }
-        
-        try:
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.api_key}'
-            }
-            
-            payload = {
-                "personalizations": [
-                    {
-                        "to": [{"email": to_email}],
-                        "subject": subject
-                    }
-                ],
-                "from": {"email": self.from_email},
-                "content": [
-                    {
-                        "type": "text/plain",
-                        "value": text_content
-                    },
-                    {
-                        "type": "text/html",
-                        "value": html_content
-                    }
-                ]
-            }
-            
-            logger.info(f"📤 Sending email to: {to_email}")
-            logger.info(f"   Subject: {subject}")
-            
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code == 202:
-                logger.info(f"✅ Email sent successfully to {to_email}")
-                return {
-                    'success': True,
-                    'message': 'Email sent successfully'
-                }
-            else:
-                logger.error(f"❌ SendGrid API error: {response.status_code}")
-                logger.error(f"   Response: {response.text}")
-                return {
-                    'success': False,
-                    'message': f'Failed to send email: {response.status_code}'
-                }
-                
-        except requests.exceptions.Timeout:
-            logger.error("❌ Email send timeout")
-            return {
-                'success': False,
-                'message': 'Email send timeout'
-            }
-        except Exception as e:
-            logger.error(f"❌ Email send error: {e}", exc_info=True)
-            return {
-                'success': False,
-                'message': f'Error: {str(e)}'
-            }
-    
-    def send_test_drive_confirmation(self, booking_data: Dict) -> Dict:
-        """
-        Send test drive booking confirmation email
-        
-        Args:
-            booking_data: Dict containing:
-                - customer_email
-                - customer_name
-                - vehicle_name
-                - date
-                - time
-                - booking_id
-                - pickup_location
-                
-        Returns:
-            Dict with success status
-        """
-        try:
-            subject = f"🚗 Test Drive Confirmed - {booking_data['vehicle_name']}"
-            
-            # HTML email template
-            html_content = f"""
+# Sends run on a background pool so booking flows don't wait on SendGrid;
+# EMAIL_SEND_EAGER=true sends inline (tests / debugging)
+EMAIL_SEND_WORKERS = int(os.getenv("EMAIL_SEND_WORKERS", "4"))
+EMAIL_SEND_EAGER = os.getenv("EMAIL_SEND_EAGER", "false").lower() == "true"
+
+
+# ═══════════════════════════════════════════════════════════
+# EMAIL TEMPLATES (built once at import, filled with str.format_map)
+# ═══════════════════════════════════════════════════════════
+
+_TEST_DRIVE_HTML_TMPL = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -175,7 +70,7 @@ class EmailNotificationService:
                     <tr>
                         <td style="padding: 40px 30px;">
                             <p style="font-size: 16px; color: #374151; margin: 0 0 20px 0;">
-                                Hi <strong>{booking_data['customer_name']}</strong>,
+                                Hi <strong>{customer_name}</strong>,
                             </p>
                             
                             <p style="font-size: 16px; color: #374151; margin: 0 0 30px 0;">
@@ -196,7 +91,7 @@ class EmailNotificationService:
                                                     <strong>🆔 Booking ID:</strong>
                                                 </td>
                                                 <td style="color: #111827; font-size: 14px;">
-                                                    {booking_data['booking_id']}
+                                                    {booking_id}
                                                 </td>
                                             </tr>
                                             <tr>
@@ -204,7 +99,7 @@ class EmailNotificationService:
                                                     <strong>🚗 Vehicle:</strong>
                                                 </td>
                                                 <td style="color: #111827; font-size: 14px;">
-                                                    {booking_data['vehicle_name']}
+                                                    {vehicle_name}
                                                 </td>
                                             </tr>
                                             <tr>
@@ -212,7 +107,7 @@ class EmailNotificationService:
                                                     <strong>📅 Date:</strong>
                                                 </td>
                                                 <td style="color: #111827; font-size: 14px;">
-                                                    {booking_data['date']}
+                                                    {date}
                                                 </td>
                                             </tr>
                                             <tr>
@@ -220,7 +115,7 @@ class EmailNotificationService:
                                                     <strong>⏰ Time:</strong>
                                                 </td>
                                                 <td style="color: #111827; font-size: 14px;">
-                                                    {booking_data['time']}
+                                                    {time}
                                                 </td>
                                             </tr>
                                             <tr>
@@ -228,7 +123,7 @@ class EmailNotificationService:
                                                     <strong>📍 Location:</strong>
                                                 </td>
                                                 <td style="color: #111827; font-size: 14px;">
-                                                    {booking_data['pickup_location']}
+                                                    {pickup_location}
                                                 </td>
                                             </tr>
                                         </table>
@@ -244,14 +139,14 @@ class EmailNotificationService:
                                 <ul style="margin: 0; padding-left: 20px; color: #1e3a8a;">
                                     <li style="margin-bottom: 8px;">Please arrive <strong>10 minutes early</strong></li>
                                     <li style="margin-bottom: 8px;">Bring your <strong>valid driver's license</strong></li>
-                                    <li style="margin-bottom: 8px;">Booking ID: <strong>{booking_data['booking_id']}</strong></li>
+                                    <li style="margin-bottom: 8px;">Booking ID: <strong>{booking_id}</strong></li>
                                     <li>Contact us at <strong>+971-4-XXX-XXXX</strong> for any changes</li>
                                 </ul>
                             </div>
                             
                             <!-- Call to Action -->
                             <div style="text-align: center; margin-top: 30px;">
-                                <a href="https://your-website.com/booking/{booking_data['booking_id']}" 
+                                <a href="https://your-website.com/booking/{booking_id}" 
                                    style="display: inline-block; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
                                           color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; 
                                           font-weight: 600; font-size: 16px;">
@@ -280,23 +175,36 @@ class EmailNotificationService:
 </body>
 </html>
 """
-            
-            # Plain text version
-            text_content = f"""
+
+# Only the middle of the test-drive HTML has fields: the static head/tail are
+# concatenated as-is instead of being re-scanned by format_map on every send
+_TD_FIELDS_START = _TEST_DRIVE_HTML_TMPL.index('{')
+_TD_FIELDS_END = _TEST_DRIVE_HTML_TMPL.rindex('}') + 1
+_TD_PREFIX = _TEST_DRIVE_HTML_TMPL[:_TD_FIELDS_START]
+_TD_BODY_FMT = _TEST_DRIVE_HTML_TMPL[_TD_FIELDS_START:_TD_FIELDS_END]
+_TD_SUFFIX = _TEST_DRIVE_HTML_TMPL[_TD_FIELDS_END:]
+
+# Every key a test-drive confirmation needs, fetched in one call so a missing
+# field raises KeyError before anything is rendered
+_TD_FIELD_NAMES = ('customer_email', 'customer_name', 'vehicle_name', 'date',
+                   'time', 'booking_id', 'pickup_location')
+_td_fields = itemgetter(*_TD_FIELD_NAMES)
+
+_TEST_DRIVE_TEXT_TMPL = """
 TEST DRIVE CONFIRMED
 ━━━━━━━━━━━━━━━━━━━━
 
-Hi {booking_data['customer_name']},
+Hi {customer_name},
 
 Your test drive has been successfully booked!
 
 BOOKING DETAILS:
 ━━━━━━━━━━━━━━━━━━━━
-🆔 Booking ID: {booking_data['booking_id']}
-🚗 Vehicle: {booking_data['vehicle_name']}
-📅 Date: {booking_data['date']}
-⏰ Time: {booking_data['time']}
-📍 Location: {booking_data['pickup_location']}
+🆔 Booking ID: {booking_id}
+🚗 Vehicle: {vehicle_name}
+📅 Date: {date}
+⏰ Time: {time}
+📍 Location: {pickup_location}
 
 IMPORTANT REMINDERS:
 ━━━━━━━━━━━━━━━━━━━━
@@ -309,35 +217,8 @@ We look forward to seeing you!
 Best regards,
 Automotive AI Platform Team
 """
-            
-            return self._send_email(
-                to_email=booking_data['customer_email'],
-                subject=subject,
-                html_content=html_content,
-                text_content=text_content
-            )
-            
-        except Exception as e:
-            logger.error(f"❌ Test drive email error: {e}", exc_info=True)
-            return {
-                'success': False,
-                'message': f'Error: {str(e)}'
-            }
-    
-    def send_appointment_confirmation(self, appointment_data: Dict) -> Dict:
-        """
-        Send appointment confirmation email
-        
-        Args:
-            appointment_data: Dict containing appointment details
-            
-        Returns:
-            Dict with success status
-        """
-        try:
-            subject = f"📅 Appointment Confirmed - {appointment_data.get('vehicle', 'Vehicle Inquiry')}"
-            
-            html_content = f"""
+
+_APPOINTMENT_HTML_TMPL = """
 <!DOCTYPE html>
 <html>
 <body style="font-family: Arial, sans-serif; background-color: #f3f4f6; margin: 0; padding: 20px;">
@@ -347,15 +228,15 @@ Automotive AI Platform Team
         </div>
         
         <div style="padding: 30px;">
-            <p>Hi <strong>{appointment_data['customer_name']}</strong>,</p>
+            <p>Hi <strong>{customer_name}</strong>,</p>
             <p>Your appointment has been confirmed!</p>
             
             <div style="background: #f9fafb; padding: 20px; border-radius: 8px; margin: 20px 0;">
                 <h3 style="margin-top: 0;">📋 Details:</h3>
-                <p><strong>ID:</strong> {appointment_data['id']}</p>
-                <p><strong>Date:</strong> {appointment_data['date']}</p>
-                <p><strong>Time:</strong> {appointment_data['time']}</p>
-                <p><strong>Vehicle:</strong> {appointment_data.get('vehicle', 'N/A')}</p>
+                <p><strong>ID:</strong> {id}</p>
+                <p><strong>Date:</strong> {date}</p>
+                <p><strong>Time:</strong> {time}</p>
+                <p><strong>Vehicle:</strong> {vehicle}</p>
             </div>
             
             <p>We look forward to seeing you!</p>
@@ -364,45 +245,27 @@ Automotive AI Platform Team
 </body>
 </html>
 """
-            
-            text_content = f"""
+
+_APPOINTMENT_TEXT_TMPL = """
 APPOINTMENT CONFIRMED
 
-Hi {appointment_data['customer_name']},
+Hi {customer_name},
 
 Your appointment has been confirmed!
 
 DETAILS:
-ID: {appointment_data['id']}
-Date: {appointment_data['date']}
-Time: {appointment_data['time']}
-Vehicle: {appointment_data.get('vehicle', 'N/A')}
+ID: {id}
+Date: {date}
+Time: {time}
+Vehicle: {vehicle}
 
 We look forward to seeing you!
 
 Best regards,
 Automotive AI Platform
 """
-            
-            return self._send_email(
-                to_email=appointment_data['customer_email'],
-                subject=subject,
-                html_content=html_content,
-                text_content=text_content
-            )
-            
-        except Exception as e:
-            logger.error(f"❌ Appointment email error: {e}", exc_info=True)
-            return {
-                'success': False,
-                'message': f'Error: {str(e)}'
-            }
-    
-    def send_cancellation_notice(self, email: str, booking_id: str, booking_type: str = "test drive") -> Dict:
-        """Send cancellation confirmation"""
-        subject = f"🔴 {booking_type.title()} Cancelled - {booking_id}"
-        
-        html_content = f"""
+
+_CANCELLATION_HTML_TMPL = """
 <div style="max-width: 600px; margin: 0 auto; font-family: Arial, sans-serif;">
     <div style="background: #fee2e2; padding: 30px; border-radius: 8px;">
         <h2>❌ Booking Cancelled</h2>
@@ -411,8 +274,8 @@ Automotive AI Platform
     </div>
 </div>
 """
-        
-        text_content = f"""
+
+_CANCELLATION_TEXT_TMPL = """
 BOOKING CANCELLED
 
 Your {booking_type} (ID: {booking_id}) has been cancelled.
@@ -422,8 +285,371 @@ You can rebook anytime by visiting our platform.
 Best regards,
 Automotive AI Platform
 """
+
+
+class EmailNotificationService:
+    """
+    Email notification service using SendGrid API
+    
+    Features:
+    - Test drive confirmations
+    - Appointment confirmations
+    - Rescheduling notifications
+    - Cancellation notices
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, from_email: Optional[str] = None):
+        """
+        Initialize email service
+        
+        Args:
+            api_key: SendGrid API key (or set SENDGRID_API_KEY env var)
+            from_email: Sender email (or set SENDER_EMAIL env var)
+        """
+        ##self.api_key = api_key or os.getenv('SENDGRID_API_KEY')
+        self.api_key = 'XXXXXXXXXXXXXXXXXXXXX'
+        ##self.from_email = from_email or os.getenv('SENDER_EMAIL', 'XXXXXXXXXXXXX@gmail.com')
+        self.from_email = 'XXXXXXXX@gmail.com'
+        self.api_url = 'https://XXXXX.com/v3/mail/send'
+        
+        if not self.api_key:
+            logger.warning("⚠️ SendGrid API key not configured. Email notifications will be disabled.")
+            self.enabled = False
+        else:
+            self.enabled = True
+            logger.info("✅ Email service initialized. Sender: %s", self.from_email)
+        
+        # One pooled session for all sends (auth headers set once)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=_HTTP_POOL_CONNECTIONS,
+            pool_maxsize=_HTTP_POOL_MAXSIZE,
+            max_retries=Retry(
+                total=2,
+                # A read timeout means SendGrid may already have accepted the POST;
+                # retrying it could send the email twice, so only retry connects/statuses
+                read=0,
+                backoff_factor=0.2,
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=frozenset({'POST'}),
+                raise_on_status=False
+            )
+        )
+        self._session.mount('https://', adapter)
+        self._session.headers.update({
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}'
+        })
+        
+        self._err_sampler = itertools.cycle([True] + [False] * (_SEND_ERROR_TRACEBACK_EVERY - 1))
+        
+        self._send_pool = ThreadPoolExecutor(max_workers=EMAIL_SEND_WORKERS,
+                                             thread_name_prefix="email-sender")
+    
+    def _queue_email(self, to_email: str, subject: str, html_content: str, text_content: str) -> Dict:
+        """
+        Hand an email to the background send pool and return immediately
+        
+        Delivery failures are logged by _send_email on the worker thread.
+        
+        Returns:
+            Dict with success status and message. A deferred send reports
+            'queued': True and 'success': False - nothing has been delivered yet.
+        """
+        if not self.enabled or EMAIL_SEND_EAGER:
+            return self._send_email(to_email, subject, html_content, text_content)
+        
+        try:
+            self._send_pool.submit(self._send_email, to_email, subject, html_content, text_content)
+        except RuntimeError:
+            # Pool already shut down (interpreter exit) - send inline
+            return self._send_email(to_email, subject, html_content, text_content)
+        
+        logger.info("📨 Email to %s queued for delivery", to_email)
+        return {
+            'success': False,
+            'queued': True,
+            'message': 'Email queued for delivery'
+        }
+    
+    def _post(self, payload: Dict) -> requests.Response:
+        """
+        POST a payload to SendGrid, honouring Retry-After on a 429
+        
+        Waits at most _MAX_RETRY_AFTER seconds and retries once; a longer
+        (or repeated) rate limit is returned to the caller as-is.
+        """
+        response = self._session.post(self.api_url, json=payload, timeout=_SEND_TIMEOUT)
+        if response.status_code != _RATE_LIMIT_STATUS:
+            return response
+        
+        try:
+            retry_after = int(response.headers.get('Retry-After', '1'))
+        except ValueError:
+            retry_after = 1
+        if retry_after > _MAX_RETRY_AFTER:
+            logger.warning("⏳ SendGrid rate limited, Retry-After %ss exceeds cap; not retrying", retry_after)
+            return response
+        
+        logger.warning("⏳ SendGrid rate limited, retrying in %ss", retry_after)
+        time.sleep(max(retry_after, 0))
+        return self._session.post(self.api_url, json=payload, timeout=_SEND_TIMEOUT)
+    
+    def _send_email(self, to_email: str, subject: str, html_content: str, text_content: str) -> Dict:
+        """
+        Internal method to send email via SendGrid API
+        
+        Args:
+            to_email: Recipient email
+            subject: Email subject
+            html_content: HTML version of email
+            text_content: Plain text version
+            
+        Returns:
+            Dict with success status and message
+        """
+        if not self.enabled:
+            logger.warning("📧 Email service disabled. Would send to: %s", to_email)
+            return {
+                'success': False,
+                'message': 'Email service not configured'
+            }
+        
+        try:
+            payload = {
+                "personalizations": [
+                    {
+                        "to": [{"email": to_email}],
+                        "subject": subject
+                    }
+                ],
+                "from": {"email": self.from_email},
+                "content": [
+                    {
+                        "type": "text/plain",
+                        "value": text_content
+                    },
+                    {
+                        "type": "text/html",
+                        "value": html_content
+                    }
+                ]
+            }
+            
+            logger.info("📤 Sending email to: %s", to_email)
+            logger.info("   Subject: %s", subject)
+            
+            response = self._post(payload)
+            
+            if response.status_code == 202:
+                logger.info("✅ Email sent successfully to %s", to_email)
+                return {
+                    'success': True,
+                    'message': 'Email sent successfully'
+                }
+            else:
+                logger.error("❌ SendGrid API error: %s", response.status_code)
+                logger.error("   Response: %s", response.text)
+                return {
+                    'success': False,
+                    'message': f'Failed to send email: {response.status_code}'
+                }
+                
+        except requests.exceptions.Timeout:
+            logger.error("❌ Email send timeout")
+            return {
+                'success': False,
+                'message': 'Email send timeout'
+            }
+        except Exception as e:
+            logger.error("❌ Email send error to %s: %s: %s", to_email, type(e).__name__, e,
+                         exc_info=next(self._err_sampler))
+            return {
+                'success': False,
+                'message': f'Error: {str(e)}'
+            }
+    
+    def send_bulk(self, messages: List[Dict], html_content: str, text_content: str,
+                  batch_size: int = 500) -> Dict:
+        """
+        Send one shared email body to many recipients, one API call per batch
+        
+        The body is sent once per batch; per-recipient values are filled in
+        by SendGrid from substitution tags (e.g. "-name-", "-booking_id-").
+        
+        Args:
+            messages: List of dicts containing:
+                - to: Recipient email
+                - subject: Email subject (may contain substitution tags)
+                - substitutions: Dict of tag -> value, e.g. {'-name-': 'Sam'}
+            html_content: Shared HTML body with substitution tags
+            text_content: Shared plain text body with substitution tags
+            batch_size: Recipients per request (capped at SendGrid's 1000)
+            
+        Returns:
+            Dict with success status, sent/failed counts and message
+        """
+        if not self.enabled:
+            logger.warning("📧 Email service disabled. Would send %s bulk emails", len(messages))
+            return {
+                'success': False,
+                'sent': 0,
+                'failed': len(messages),
+                'message': 'Email service not configured'
+            }
+        
+        batch_size = max(1, min(batch_size, _MAX_PERSONALIZATIONS))
+        content = [
+            {"type": "text/plain", "value": text_content},
+            {"type": "text/html", "value": html_content}
+        ]
+        sent = failed = 0
+        
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            payload = {
+                "personalizations": [
+                    {
+                        "to": [{"email": msg['to']}],
+                        "subject": msg['subject'],
+                        "substitutions": {
+                            tag: str(value) for tag, value in msg.get('substitutions', {}).items()
+                        }
+                    }
+                    for msg in batch
+                ],
+                "from": {"email": self.from_email},
+                "content": content
+            }
+            
+            try:
+                logger.info("📤 Sending bulk email batch: %s recipients", len(batch))
+                response = self._post(payload)
+                
+                if response.status_code == 202:
+                    sent += len(batch)
+                else:
+                    failed += len(batch)
+                    logger.error("❌ SendGrid API error (bulk): %s", response.status_code)
+                    logger.error("   Response: %s", response.text)
+                    
+            except Exception as e:
+                failed += len(batch)
+                logger.error("❌ Bulk email batch error: %s", e, exc_info=True)
+        
+        logger.info("✅ Bulk send finished: %s sent, %s failed", sent, failed)
+        return {
+            'success': failed == 0,
+            'sent': sent,
+            'failed': failed,
+            'message': f'{sent} emails sent, {failed} failed'
+        }
+    
+    async def _send_email_async(self, to_email: str, subject: str, html_content: str, text_content: str) -> Dict:
+        """
+        Awaitable variant of _send_email for async callers
+        
+        The blocking HTTP call runs in the default executor, so the event
+        loop keeps serving other handlers while SendGrid responds.
+        """
+        return await asyncio.to_thread(self._send_email, to_email, subject, html_content, text_content)
+    
+    async def send_test_drive_confirmation_async(self, booking_data: Dict) -> Dict:
+        """Awaitable variant of send_test_drive_confirmation"""
+        return await asyncio.to_thread(self.send_test_drive_confirmation, booking_data)
+    
+    async def send_appointment_confirmation_async(self, appointment_data: Dict) -> Dict:
+        """Awaitable variant of send_appointment_confirmation"""
+        return await asyncio.to_thread(self.send_appointment_confirmation, appointment_data)
+    
+    async def send_cancellation_notice_async(self, email: str, booking_id: str,
+                                             booking_type: str = "test drive") -> Dict:
+        """Awaitable variant of send_cancellation_notice"""
+        return await asyncio.to_thread(self.send_cancellation_notice, email, booking_id, booking_type)
+    
+    def send_test_drive_confirmation(self, booking_data: Dict) -> Dict:
+        """
+        Send test drive booking confirmation email
+        
+        Args:
+            booking_data: Dict containing:
+                - customer_email
+                - customer_name
+                - vehicle_name
+                - date
+                - time
+                - booking_id
+                - pickup_location
+                
+        Returns:
+            Dict with success status
+        """
+        try:
+            fields = dict(zip(_TD_FIELD_NAMES, _td_fields(booking_data)))
+            subject = f"🚗 Test Drive Confirmed - {fields['vehicle_name']}"
+            
+            # HTML email template
+            html_content = _TD_PREFIX + _TD_BODY_FMT.format_map(fields) + _TD_SUFFIX
+            
+            # Plain text version
+            text_content = _TEST_DRIVE_TEXT_TMPL.format_map(fields)
+            
+            return self._queue_email(
+                to_email=fields['customer_email'],
+                subject=subject,
+                html_content=html_content,
+                text_content=text_content
+            )
+            
+        except Exception as e:
+            logger.error("❌ Test drive email error: %s", e, exc_info=True)
+            return {
+                'success': False,
+                'message': f'Error: {str(e)}'
+            }
+    
+    def send_appointment_confirmation(self, appointment_data: Dict) -> Dict:
+        """
+        Send appointment confirmation email
+        
+        Args:
+            appointment_data: Dict containing appointment details
+            
+        Returns:
+            Dict with success status
+        """
+        try:
+            subject = f"📅 Appointment Confirmed - {appointment_data.get('vehicle', 'Vehicle Inquiry')}"
+            
+            # Only vehicle is optional; missing required fields raise into the except below
+            fields = {**appointment_data, 'vehicle': appointment_data.get('vehicle', 'N/A')}
+            html_content = _APPOINTMENT_HTML_TMPL.format_map(fields)
+            
+            text_content = _APPOINTMENT_TEXT_TMPL.format_map(fields)
+            
+            return self._queue_email(
+                to_email=appointment_data['customer_email'],
+                subject=subject,
+                html_content=html_content,
+                text_content=text_content
+            )
+            
+        except Exception as e:
+            logger.error("❌ Appointment email error: %s", e, exc_info=True)
+            return {
+                'success': False,
+                'message': f'Error: {str(e)}'
+            }
+    
+    def send_cancellation_notice(self, email: str, booking_id: str, booking_type: str = "test drive") -> Dict:
+        """Send cancellation confirmation"""
+        subject = f"🔴 {booking_type.title()} Cancelled - {booking_id}"
+        
+        fields = {'booking_type': booking_type, 'booking_id': booking_id}
+        html_content = _CANCELLATION_HTML_TMPL.format_map(fields)
+        text_content = _CANCELLATION_TEXT_TMPL.format_map(fields)
         
-        return self._send_email(
+        return self._queue_email(
             to_email=email,
             subject=subject,
             html_content=html_content,
@@ -436,11 +662,14 @@ Automotive AI Platform
 # ═══════════════════════════════════════════════════════════
 
 _email_service = None
+_email_service_lock = threading.Lock()
 
 
 def get_email_service() -> EmailNotificationService:
-    """Get singleton email service instance"""
+    """Get singleton email service instance (session pool and send pool are created once)"""
     global _email_service
     if _email_service is None:
-        _email_service = EmailNotificationService()
+        with _email_service_lock:
+            if _email_service is None:
+                _email_service = EmailNotificationService()
     return _email_service
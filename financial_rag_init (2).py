@@ -6,70 +6,151 @@ Financial RAG Smart Initialization
 """
 
 import os
+import gzip
 import json
 import logging
+from collections import Counter
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
 
 logger = logging.getLogger(__name__)
 
+# Q&A index is stored gzip-compressed (JSON text compresses ~5x);
+# the uncompressed file is still read if it's the only one present
+QA_JSON_FILE = "automotive_qa_index.json.gz"  # Repository root
+LEGACY_QA_JSON_FILE = "automotive_qa_index.json"
+_QA_GZIP_LEVEL = 6
+
+
+def _file_size_kb(path: str):
+    """Size of a file in KB from a single stat() call, or None if it doesn't exist"""
+    try:
+        return os.stat(path).st_size / 1024
+    except OSError:
+        return None
+
+
+def _load_qa_json(path: str):
+    """Parse a Q&A JSON file, gzip-compressed if it ends in .gz (orjson's C parser when available)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if _HAS_ORJSON else json.loads(data)
+
+
+def _dump_qa_json(qa_index, path: str):
+    """
+    Write the Q&A index as indented UTF-8 JSON (orjson when available)
+    
+    Written to a temp file and renamed into place, so a crash mid-write
+    never leaves a truncated index behind to force a regeneration.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        if _HAS_ORJSON:
+            payload = orjson.dumps(qa_index, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(qa_index, indent=2, ensure_ascii=False).encode('utf-8')
+        
+        if path.endswith('.gz'):
+            with gzip.open(tmp_path, 'wb', compresslevel=_QA_GZIP_LEVEL) as f:
+                f.write(payload)
+        else:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 def initialize_financial_rag():
     """
     Smart Financial RAG initialization with caching
     
     Fast Path (< 1 second):
-    - Checks if automotive_qa_index.json exists in repository root
-    - If yes, loads pre-generated Q&A
+    - Checks if automotive_qa_index.json.gz (or legacy .json) exists in repository root
+    - If yes, loads pre-generated Q&A (a legacy .json is rewritten as .gz)
     
     Slow Path (2-3 minutes):
     - Generates Q&A from PDFs
     - Saves to repository root
     """
     
-    # ✅ REPOSITORY ROOT PATH (persistent, free, visible in Files tab)
-    QA_JSON_FILE = "automotive_qa_index.json"  # Repository root
-    
     logger.info("="*60)
     logger.info("🚀 Initializing Financial RAG Module")
     logger.info("="*60)
     
     try:
-        from financial_rag_module import AutomotiveFinancialRAG
-        
         # ═══════════════════════════════════════════════════════════
         # FAST PATH: Load from existing JSON
         # ═══════════════════════════════════════════════════════════
-        if os.path.exists(QA_JSON_FILE):
-            file_size_kb = os.path.getsize(QA_JSON_FILE) / 1024
-            abs_path = os.path.abspath(QA_JSON_FILE)
-            
+        # ✅ REPOSITORY ROOT PATH (persistent, free, visible in Files tab)
+        qa_path = QA_JSON_FILE
+        file_size_kb = _file_size_kb(qa_path)
+        if file_size_kb is None:
+            qa_path = LEGACY_QA_JSON_FILE
+            file_size_kb = _file_size_kb(qa_path)
+        
+        if file_size_kb is not None:
             logger.info("⚡ FAST PATH: Found existing Q&A file!")
-            logger.info(f"📄 File: {QA_JSON_FILE}")
-            logger.info(f"📍 Path: {abs_path}")
-            logger.info(f"💾 Size: {file_size_kb:.2f} KB")
+            logger.info("📄 File: %s", qa_path)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("📍 Path: %s", os.path.abspath(qa_path))
+            logger.info("💾 Size: %.2f KB", file_size_kb)
             logger.info("⏱️ Loading in <1 second...")
             
-            # Initialize WITHOUT Q&A generation
-            financial_rag = AutomotiveFinancialRAG(skip_qa_generation=True)
-            
-            # Load from file
+            # Parse the file before the heavy RAG module is imported/built,
+            # so a bad file doesn't load the models twice (here and in the slow path)
+            qa_index = None
             try:
-                with open(QA_JSON_FILE, 'r', encoding='utf-8') as f:
-                    financial_rag.qa_index = json.load(f)
+                qa_index = _load_qa_json(qa_path)
+                
+            except json.JSONDecodeError as e:
+                logger.error("❌ Invalid JSON in %s: %s", qa_path, e)
+                logger.info("🔨 Will regenerate Q&A...")
+                # Fall through to slow path
+                
+            except Exception as e:
+                logger.error("❌ Error loading Q&A: %s", e)
+                logger.info("🔨 Will regenerate Q&A...")
+                # Fall through to slow path
+            
+            if qa_index is not None and qa_path != QA_JSON_FILE:
+                # One-time migration of the legacy uncompressed index
+                try:
+                    _dump_qa_json(qa_index, QA_JSON_FILE)
+                    logger.info("🗜️ Compressed Q&A index saved as %s", QA_JSON_FILE)
+                    qa_path = QA_JSON_FILE
+                except Exception as e:
+                    logger.warning("⚠️ Could not write %s: %s", QA_JSON_FILE, e)
+            
+            if qa_index is not None:
+                from financial_rag_module import AutomotiveFinancialRAG
+                
+                # Initialize WITHOUT Q&A generation
+                financial_rag = AutomotiveFinancialRAG(skip_qa_generation=True)
+                financial_rag.qa_index = qa_index
                 
                 # Update the path reference
-                financial_rag.qa_json_path = QA_JSON_FILE
+                financial_rag.qa_json_path = qa_path
                 
-                logger.info(f"✅ Loaded {len(financial_rag.qa_index)} Q&A pairs")
+                logger.info("✅ Loaded %s Q&A pairs", len(financial_rag.qa_index))
                 
-                # Show statistics
-                if financial_rag.qa_index:
-                    companies = {}
-                    for qa in financial_rag.qa_index:
-                        company = qa.get('company', 'Unknown')
-                        companies[company] = companies.get(company, 0) + 1
+                # Show statistics (skipped entirely when INFO is filtered out)
+                if financial_rag.qa_index and logger.isEnabledFor(logging.INFO):
+                    companies = Counter(qa.get('company', 'Unknown') for qa in financial_rag.qa_index)
                     
                     logger.info("🏢 Q&A Distribution:")
                     for company, count in sorted(companies.items()):
-                        logger.info(f"   • {company}: {count} pairs")
+                        logger.info("   • %s: %s pairs", company, count)
                 
                 logger.info("="*60)
                 logger.info("✅ Financial RAG Ready (Fast Mode)")
@@ -77,16 +158,6 @@ def initialize_financial_rag():
                 logger.info("="*60)
                 
                 return financial_rag
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Invalid JSON in {QA_JSON_FILE}: {e}")
-                logger.info("🔨 Will regenerate Q&A...")
-                # Fall through to slow path
-                
-            except Exception as e:
-                logger.error(f"❌ Error loading Q&A: {e}")
-                logger.info("🔨 Will regenerate Q&A...")
-                # Fall through to slow path
         
         # ═══════════════════════════════════════════════════════════
         # SLOW PATH: Generate Q&A from PDFs
@@ -95,6 +166,8 @@ def initialize_financial_rag():
         logger.info("⏱️ This will take 2-3 minutes (one-time setup)")
         logger.info("💡 Next restart will be <1 second!")
         
+        from financial_rag_module import AutomotiveFinancialRAG
+        
         # Full initialization (will generate Q&A)
         financial_rag = AutomotiveFinancialRAG()
         
@@ -104,37 +177,33 @@ def initialize_financial_rag():
                 logger.info("💾 Saving Q&A to repository root...")
                 
                 # Save with explicit path
-                with open(QA_JSON_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(financial_rag.qa_index, f, indent=2, ensure_ascii=False)
+                _dump_qa_json(financial_rag.qa_index, QA_JSON_FILE)
                 
                 # Verify file exists
-                if os.path.exists(QA_JSON_FILE):
-                    file_size_kb = os.path.getsize(QA_JSON_FILE) / 1024
-                    abs_path = os.path.abspath(QA_JSON_FILE)
-                    
+                file_size_kb = _file_size_kb(QA_JSON_FILE)
+                if file_size_kb is not None:
                     logger.info("="*60)
                     logger.info("✅ Q&A JSON SAVED TO REPOSITORY ROOT!")
                     logger.info("="*60)
-                    logger.info(f"📄 File: {QA_JSON_FILE}")
-                    logger.info(f"📍 Absolute path: {abs_path}")
-                    logger.info(f"📊 Q&A Pairs: {len(financial_rag.qa_index)}")
-                    logger.info(f"💾 File size: {file_size_kb:.2f} KB")
+                    logger.info("📄 File: %s", QA_JSON_FILE)
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("📍 Absolute path: %s", os.path.abspath(QA_JSON_FILE))
+                    logger.info("📊 Q&A Pairs: %s", len(financial_rag.qa_index))
+                    logger.info("💾 File size: %.2f KB", file_size_kb)
                     
                     # Count per company
-                    companies = {}
-                    for qa in financial_rag.qa_index:
-                        company = qa.get('company', 'Unknown')
-                        companies[company] = companies.get(company, 0) + 1
-                    
-                    logger.info("🏢 Q&A Distribution:")
-                    for company, count in sorted(companies.items()):
-                        logger.info(f"   • {company}: {count} pairs")
+                    if logger.isEnabledFor(logging.INFO):
+                        companies = Counter(qa.get('company', 'Unknown') for qa in financial_rag.qa_index)
+                        
+                        logger.info("🏢 Q&A Distribution:")
+                        for company, count in sorted(companies.items()):
+                            logger.info("   • %s: %s pairs", company, count)
                     
                     logger.info("="*60)
                     logger.info("🔥 NEXT STEPS TO MAKE PERSISTENT:")
                     logger.info("="*60)
                     logger.info("1. Go to your Space's 'Files' tab")
-                    logger.info(f"2. You should see: {QA_JSON_FILE}")
+                    logger.info("2. You should see: %s", QA_JSON_FILE)
                     logger.info("3. Click the file")
                     logger.info("4. Click 'Commit to main' button")
                     logger.info("5. Restart Space → loads in <1 second!")
@@ -144,31 +213,30 @@ def initialize_financial_rag():
                     financial_rag.qa_json_path = QA_JSON_FILE
                     
                 else:
-                    logger.error(f"❌ File was not created: {QA_JSON_FILE}")
+                    logger.error("❌ File was not created: %s", QA_JSON_FILE)
                     logger.error("❌ Check file permissions!")
                     
             except Exception as e:
-                logger.error(f"❌ Failed to save Q&A JSON: {e}")
-                logger.error(f"   Path: {QA_JSON_FILE}")
-                logger.error(f"   Working directory: {os.getcwd()}")
+                logger.error("❌ Failed to save Q&A JSON: %s", e)
+                logger.error("   Path: %s", QA_JSON_FILE)
+                logger.error("   Working directory: %s", os.getcwd())
                 
                 # Try alternative locations
                 alternative_paths = [
-                    "./automotive_qa_index.json",
-                    "/tmp/automotive_qa_index.json",
-                    "/data/automotive_qa_index.json"
+                    "./automotive_qa_index.json.gz",
+                    "/tmp/automotive_qa_index.json.gz",
+                    "/data/automotive_qa_index.json.gz"
                 ]
                 
                 for alt_path in alternative_paths:
                     try:
-                        logger.info(f"🔄 Trying alternative: {alt_path}")
+                        logger.info("🔄 Trying alternative: %s", alt_path)
                         os.makedirs(os.path.dirname(alt_path) or '.', exist_ok=True)
                         
-                        with open(alt_path, 'w', encoding='utf-8') as f:
-                            json.dump(financial_rag.qa_index, f, indent=2, ensure_ascii=False)
+                        _dump_qa_json(financial_rag.qa_index, alt_path)
                         
                         if os.path.exists(alt_path):
-                            logger.info(f"✅ Saved to: {alt_path}")
+                            logger.info("✅ Saved to: %s", alt_path)
                             financial_rag.qa_json_path = alt_path
                             break
                     except:
@@ -183,13 +251,13 @@ def initialize_financial_rag():
         return financial_rag
         
     except ImportError as e:
-        logger.error(f"❌ Cannot import financial_rag_module: {e}")
+        logger.error("❌ Cannot import financial_rag_module: %s", e)
         logger.error("💡 Make sure financial_rag_module.py is in the repository")
         return None
         
     except Exception as e:
-        logger.error(f"❌ Financial RAG initialization failed: {e}")
-        logger.error(f"   Full error: {str(e)}")
+        logger.error("❌ Financial RAG initialization failed: %s", e)
+        logger.error("   Full error: %s", str(e))
         
         import traceback
         logger.error(traceback.format_exc())
@@ -201,16 +269,23 @@ def initialize_financial_rag():
 # DIAGNOSTIC FUNCTION
 # ==========================================
 
-def check_qa_json_status():
+def check_qa_json_status(deep: bool = False, first_only: bool = True):
     """
     Check if Q&A JSON exists and show status
     Useful for debugging
+    
+    Args:
+        deep: Also parse each file to report Q&A pair count and companies
+        first_only: Stop at the first location where a file is found
     """
     logger.info("="*60)
     logger.info("🔍 Q&A JSON File Check")
     logger.info("="*60)
     
     locations = [
+        ("Repository Root (gzip)", "./automotive_qa_index.json.gz"),
+        ("/tmp (gzip)", "/tmp/automotive_qa_index.json.gz"),
+        ("/data (gzip)", "/data/automotive_qa_index.json.gz"),
         ("Repository Root", "./automotive_qa_index.json"),
         ("Current Directory", "automotive_qa_index.json"),
         ("App Root", "/app/automotive_qa_index.json"),
@@ -223,36 +298,38 @@ def check_qa_json_status():
     found_files = []
     
     for name, path in locations:
-        if os.path.exists(path):
-            file_size = os.path.getsize(path) / 1024  # KB
-            abs_path = os.path.abspath(path)
+        file_size = _file_size_kb(path)
+        if file_size is not None:
+            logger.info("✅ Found at %s:", name)
+            logger.info("   Path: %s", path)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("   Absolute: %s", os.path.abspath(path))
+            logger.info("   Size: %.2f KB", file_size)
             
-            logger.info(f"✅ Found at {name}:")
-            logger.info(f"   Path: {path}")
-            logger.info(f"   Absolute: {abs_path}")
-            logger.info(f"   Size: {file_size:.2f} KB")
-            
-            # Try to read Q&A count
-            try:
-                with open(path, 'r') as f:
-                    qa_data = json.load(f)
-                    logger.info(f"   Q&A Pairs: {len(qa_data)}")
+            # Try to read Q&A count (full parse - only on request)
+            if deep:
+                try:
+                    qa_data = _load_qa_json(path)
+                    logger.info("   Q&A Pairs: %s", len(qa_data))
                     
                     if qa_data:
                         companies = set(qa.get('company', 'Unknown') for qa in qa_data)
-                        logger.info(f"   Companies: {', '.join(sorted(companies))}")
-            except:
-                logger.info("   (Could not read Q&A count)")
+                        logger.info("   Companies: %s", ', '.join(sorted(companies)))
+                except:
+                    logger.info("   (Could not read Q&A count)")
             
             found_files.append((name, path, file_size))
             logger.info("")
+            
+            if first_only:
+                break
         else:
-            logger.info(f"❌ Not found at {name}: {path}")
+            logger.info("❌ Not found at %s: %s", name, path)
     
     logger.info("="*60)
     
     if found_files:
-        logger.info(f"📊 Summary: Found {len(found_files)} Q&A file(s)")
+        logger.info("📊 Summary: Found %s Q&A file(s)", len(found_files))
         logger.info("="*60)
         return found_files
     else:
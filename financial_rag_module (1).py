@@ -8,6 +8,7 @@ Advanced Multi-PDF RAG Financial Analysis Module - HUGGING FACE COMPATIBLE
 ✅ HUGGING FACE SPACES COMPATIBLE
 """
 
+import gzip
 import json
 import logging
 import re
@@ -102,6 +103,12 @@ def get_output_folder():
         logger.info(f"📁 Using output folder: {output_folder}")
         return output_folder
 
+def _open_qa_file(path: str, mode: str):
+    """Open a Q&A JSON file as UTF-8 text, through gzip when the path ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
 # ==========================================
 # NLTK DATA AUTO-SETUP
 # ==========================================
@@ -377,7 +384,8 @@ class AutomotiveFinancialRAG:
         self.qa_index = []  # Pre-computed Q&A pairs
         
         # ✅ SAVE TO REPOSITORY ROOT (PERSISTENT & FREE!)
-        self.qa_json_path = "./automotive_qa_index.json"
+        # (gzip-compressed, matching financial_rag_init; .json paths are still read/written plain)
+        self.qa_json_path = "./automotive_qa_index.json.gz"
         
         logger.info(f"📂 Data folder: {self.data_folder}")
         logger.info(f"📁 Output folder: {self.output_folder}")
@@ -748,8 +756,8 @@ class AutomotiveFinancialRAG:
         
         # Ensure we're saving to a writable location
         try:
-            # Save JSON
-            with open(filepath, 'w', encoding='utf-8') as f:
+            # Save JSON (gzip-compressed for a .gz path)
+            with _open_qa_file(filepath, 'w') as f:
                 json.dump(self.qa_index, f, indent=2, ensure_ascii=False)
             
             # Verify file exists and get size
@@ -768,6 +776,8 @@ class AutomotiveFinancialRAG:
                 logger.info("🔥 IMPORTANT - TO MAKE THIS PERSISTENT:")
                 logger.info("="*60)
                 logger.info(f"1. Commit the file to git:")
+                if filepath.endswith('.gz'):
+                    logger.info("   (*.gz is tracked by Git LFS - run `git lfs install` first)")
                 logger.info(f"   git add {filepath}")
                 logger.info(f'   git commit -m "Add Q&A index"')
                 logger.info(f"   git push")
@@ -789,8 +799,9 @@ class AutomotiveFinancialRAG:
             
             # Try fallback to current directory
             try:
-                fallback_path = f"./automotive_qa_index_{int(time.time())}.json"
-                with open(fallback_path, 'w', encoding='utf-8') as f:
+                suffix = '.json.gz' if filepath.endswith('.gz') else '.json'
+                fallback_path = f"./automotive_qa_index_{int(time.time())}{suffix}"
+                with _open_qa_file(fallback_path, 'w') as f:
                     json.dump(self.qa_index, f, indent=2, ensure_ascii=False)
                 
                 logger.info(f"✅ Saved to fallback location: {fallback_path}")
@@ -805,7 +816,7 @@ class AutomotiveFinancialRAG:
         Load pre-generated Q&A from JSON file
         
         Args:
-            filepath: Path to JSON file containing Q&A pairs
+            filepath: Path to JSON file containing Q&A pairs (.json or .json.gz)
             
         Returns:
             List of Q&A pairs
@@ -815,7 +826,7 @@ class AutomotiveFinancialRAG:
             rag.load_qa_from_file("./automotive_qa_index.json")
         """
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
+            with _open_qa_file(filepath, 'r') as f:
                 self.qa_index = json.load(f)
             
             # Update the JSON path
@@ -22,269 +22,329 @@ WHAT YOU GET:
 # IMPLEMENTATION
 # ═══════════════════════════════════════════════════════════════════
 
-def create_floating_chatbot_widget(app):
-    """Create professional floating chat widget"""
+import base64
+import re
+import threading
+
+import gradio as gr
+
+# Placeholder shown in the bot bubble while process_message runs
+_PENDING_REPLY = "⏳ ..."
+
+# Greeting shown by the empty chat window: static markup, not part of the chat state
+_WELCOME_MESSAGE = (
+    "👋 Hi! I'm your AI assistant. How can I help you today?\n\n"
+    "Try:\n• 'Show me SUVs under 300k'\n• 'Book test drive'\n• 'Check availability'"
+)
+
+# Chat bubble icon, encoded once and painted as a CSS background (no per-button <svg> node)
+_CHAT_ICON_SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" fill="white">'
+    b'<path d="M20 2H4c-1.1 0-2 .9-2 2v18l4-4h14c1.1 0 2-.9 2-2V4c0-1.1-.9-2-2-2zm0 14H6l-2 2V4h16v12z"/>'
+    b'</svg>'
+)
+_CHAT_ICON_URI = "data:image/svg+xml;base64," + base64.b64encode(_CHAT_ICON_SVG).decode('ascii')
+
+# Brand colours, the round button and the entry animations, shared by both widget variants
+_SHARED_CSS = """
+    :root {
+        --brand-grad: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        --brand-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
+    }
     
-    from chatbot_module import AutomotiveChatbot
+    .brand-bg {
+        background: var(--brand-grad);
+    }
     
-    # Initialize chatbot
-    chatbot = AutomotiveChatbot(app)
+    .brand-circle {
+        width: 60px;
+        height: 60px;
+        border-radius: 50%;
+    }
     
-    def chat_with_bot(message, history, chat_open):
-        """Handle chat messages"""
-        if not message:
-            return history, "", chat_open
-        
-        response = chatbot.process_message(message, user_role="customer")
-        history = history or []
-        history.append((message, response))
-        
-        return history, "", chat_open
+    /* Icon layered over the brand gradient (declared after .brand-bg so it wins) */
+    .chat-icon {
+        background: url(""" + _CHAT_ICON_URI + """) center / 32px no-repeat, var(--brand-grad);
+    }
     
-    def toggle_chat(current_state):
-        """Toggle chat window open/closed"""
-        return not current_state
+    @keyframes slideIn {
+        from { opacity: 0; transform: translateY(20px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
     
-    # CSS for floating widget
-    css = """
-    <style>
-        /* Floating Chat Button */
-        #chat-bubble-btn {
-            position: fixed;
-            bottom: 20px;
-            right: 20px;
-            z-index: 9999;
-            width: 60px;
-            height: 60px;
-            border-radius: 50%;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-            border: none;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            transition: all 0.3s ease;
-        }
-        
-        #chat-bubble-btn:hover {
-            transform: scale(1.1);
-            box-shadow: 0 6px 20px rgba(102, 126, 234, 0.6);
-        }
-        
-        #chat-bubble-btn svg {
-            width: 32px;
-            height: 32px;
-            fill: white;
-        }
-        
-        /* Notification Badge */
+    @keyframes slideUp {
+        from { opacity: 0; transform: translateY(30px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
+    
+    /* Tooltip auto-hide (5s delay, runs on the compositor) */
+    @keyframes fadeOut {
+        to { opacity: 0; visibility: hidden; }
+    }
+"""
+
+# CSS for floating widget (minified once at import)
+_WIDGET_CSS_RAW = """
+<style>
+""" + _SHARED_CSS + """
+    /* Floating Chat Button */
+    #chat-bubble-btn {
+        position: fixed;
+        bottom: 20px;
+        right: 20px;
+        z-index: 9999;
+        box-shadow: var(--brand-shadow);
+        border: none;
+        cursor: pointer;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        transition: all 0.3s ease;
+    }
+    
+    #chat-bubble-btn:hover {
+        transform: scale(1.1);
+        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.6);
+    }
+    
+    /* Notification Badge */
+    .chat-notification {
+        position: absolute;
+        top: -5px;
+        right: -5px;
+        background: #f44336;
+        color: white;
+        width: 20px;
+        height: 20px;
+        border-radius: 50%;
+        font-size: 12px;
+        font-weight: bold;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+    }
+    
+    /* Pulse three times then stop; skipped entirely for reduced-motion users */
+    @media (prefers-reduced-motion: no-preference) {
         .chat-notification {
-            position: absolute;
-            top: -5px;
-            right: -5px;
-            background: #f44336;
-            color: white;
-            width: 20px;
-            height: 20px;
-            border-radius: 50%;
-            font-size: 12px;
-            font-weight: bold;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            animation: pulse 2s infinite;
-        }
-        
-        @keyframes pulse {
-            0%, 100% { transform: scale(1); }
-            50% { transform: scale(1.1); }
+            animation: pulse 2s ease 0s 3 both;
         }
-        
-        /* Welcome Message Tooltip */
-        .chat-tooltip {
-            position: fixed;
-            bottom: 90px;
-            right: 20px;
-            background: white;
-            padding: 15px 20px;
-            border-radius: 12px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.15);
-            max-width: 280px;
-            z-index: 9998;
-            animation: slideIn 0.5s ease;
-        }
-        
-        @keyframes slideIn {
-            from { 
-                opacity: 0;
-                transform: translateY(20px);
-            }
-            to { 
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .chat-tooltip::after {
-            content: '';
-            position: absolute;
-            bottom: -10px;
-            right: 25px;
-            width: 0;
-            height: 0;
-            border-left: 10px solid transparent;
-            border-right: 10px solid transparent;
-            border-top: 10px solid white;
-        }
-        
-        .chat-tooltip h4 {
-            margin: 0 0 5px 0;
-            color: #667eea;
-            font-size: 14px;
-        }
-        
-        .chat-tooltip p {
-            margin: 0;
-            color: #666;
-            font-size: 13px;
-        }
-        
-        .chat-tooltip-close {
-            position: absolute;
-            top: 5px;
-            right: 5px;
-            background: none;
-            border: none;
-            color: #999;
-            cursor: pointer;
-            font-size: 16px;
-        }
-        
-        /* Floating Chat Window */
+    }
+    
+    @keyframes pulse {
+        0%, 100% { transform: scale(1); }
+        50% { transform: scale(1.1); }
+    }
+    
+    /* Welcome Message Tooltip */
+    .chat-tooltip {
+        position: fixed;
+        bottom: 90px;
+        right: 20px;
+        background: white;
+        padding: 15px 20px;
+        border-radius: 12px;
+        box-shadow: 0 4px 20px rgba(0,0,0,0.15);
+        max-width: 280px;
+        z-index: 9998;
+        /* Auto-hides after 5s on the compositor, no JS timer */
+        animation: slideIn 0.5s ease, fadeOut 0.3s ease 5s forwards;
+    }
+    
+    .chat-tooltip::after {
+        content: '';
+        position: absolute;
+        bottom: -10px;
+        right: 25px;
+        width: 0;
+        height: 0;
+        border-left: 10px solid transparent;
+        border-right: 10px solid transparent;
+        border-top: 10px solid white;
+    }
+    
+    .chat-tooltip h4 {
+        margin: 0 0 5px 0;
+        color: #667eea;
+        font-size: 14px;
+    }
+    
+    .chat-tooltip p {
+        margin: 0;
+        color: #666;
+        font-size: 13px;
+    }
+    
+    .chat-tooltip-close {
+        position: absolute;
+        top: 5px;
+        right: 5px;
+        background: none;
+        border: none;
+        color: #999;
+        cursor: pointer;
+        font-size: 16px;
+    }
+    
+    /* Floating Chat Window */
+    .chat-window {
+        position: fixed;
+        bottom: 90px;
+        right: 20px;
+        width: 380px;
+        height: 550px;
+        background: white;
+        border-radius: 16px;
+        box-shadow: 0 8px 32px rgba(0,0,0,0.2);
+        z-index: 9998;
+        display: flex;
+        flex-direction: column;
+        animation: slideUp 0.3s ease;
+    }
+    
+    .chat-window-header {
+        background: var(--brand-grad);
+        color: white;
+        padding: 20px;
+        border-radius: 16px 16px 0 0;
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+    }
+    
+    .chat-window-header h3 {
+        margin: 0;
+        font-size: 18px;
+    }
+    
+    .chat-window-close {
+        background: rgba(255,255,255,0.2);
+        border: none;
+        color: white;
+        width: 30px;
+        height: 30px;
+        border-radius: 50%;
+        cursor: pointer;
+        font-size: 18px;
+        transition: all 0.2s;
+    }
+    
+    .chat-window-close:hover {
+        background: rgba(255,255,255,0.3);
+    }
+    
+    /* Mobile Responsive */
+    @media (max-width: 768px) {
         .chat-window {
-            position: fixed;
-            bottom: 90px;
+            width: calc(100% - 40px);
+            height: calc(100% - 100px);
+            bottom: 10px;
             right: 20px;
-            width: 380px;
-            height: 550px;
-            background: white;
-            border-radius: 16px;
-            box-shadow: 0 8px 32px rgba(0,0,0,0.2);
-            z-index: 9998;
-            display: flex;
-            flex-direction: column;
-            animation: slideUp 0.3s ease;
+            left: 20px;
         }
         
-        @keyframes slideUp {
-            from { 
-                opacity: 0;
-                transform: translateY(30px);
-            }
-            to { 
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .chat-window-header {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 16px 16px 0 0;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .chat-window-header h3 {
-            margin: 0;
-            font-size: 18px;
-        }
-        
-        .chat-window-close {
-            background: rgba(255,255,255,0.2);
-            border: none;
-            color: white;
-            width: 30px;
-            height: 30px;
-            border-radius: 50%;
-            cursor: pointer;
-            font-size: 18px;
-            transition: all 0.2s;
-        }
-        
-        .chat-window-close:hover {
-            background: rgba(255,255,255,0.3);
-        }
-        
-        /* Mobile Responsive */
-        @media (max-width: 768px) {
-            .chat-window {
-                width: calc(100% - 40px);
-                height: calc(100% - 100px);
-                bottom: 10px;
-                right: 20px;
-                left: 20px;
-            }
-            
-            .chat-tooltip {
-                max-width: calc(100% - 100px);
-            }
+        .chat-tooltip {
+            max-width: calc(100% - 100px);
         }
-    </style>
-    """
+    }
+</style>
+"""
+
+
+def _minify_css(css):
+    """Strip comments and collapse whitespace in a CSS block"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(': ', ':').strip()
+
+
+_WIDGET_CSS = _minify_css(_WIDGET_CSS_RAW)
+
+
+# HTML for floating widget
+_WIDGET_HTML = """
+<div id="floating-chat-widget">
+    <!-- Chat Bubble Button -->
+    <button id="chat-bubble-btn" class="brand-circle chat-icon" onclick="toggleChatWindow()">
+        <span class="chat-notification">1</span>
+    </button>
     
-    # HTML for floating widget
-    widget_html = """
-    <div id="floating-chat-widget">
-        <!-- Chat Bubble Button -->
-        <button id="chat-bubble-btn" onclick="toggleChatWindow()">
-            <svg viewBox="0 0 24 24">
-                <path d="M20 2H4c-1.1 0-2 .9-2 2v18l4-4h14c1.1 0 2-.9 2-2V4c0-1.1-.9-2-2-2zm0 14H6l-2 2V4h16v12z"/>
-            </svg>
-            <span class="chat-notification">1</span>
-        </button>
-        
-        <!-- Welcome Tooltip -->
-        <div class="chat-tooltip" id="chat-tooltip">
-            <button class="chat-tooltip-close" onclick="closeTooltip()">×</button>
-            <h4>👋 Hi there!</h4>
-            <p>Need help finding the perfect car? Ask me anything!</p>
-        </div>
+    <!-- Welcome Tooltip -->
+    <div class="chat-tooltip" id="chat-tooltip">
+        <button class="chat-tooltip-close" onclick="this.parentElement.style.display='none'">×</button>
+        <h4>👋 Hi there!</h4>
+        <p>Need help finding the perfect car? Ask me anything!</p>
     </div>
+</div>
+
+<script>
+    function toggleChatWindow() {
+        // This will be handled by Gradio component visibility
+        var event = new CustomEvent('toggleChat');
+        document.dispatchEvent(event);
+    }
+</script>
+"""
+
+
+# Built widgets per app (keyed by id; the app is kept alive in the entry so the id can't be reused)
+_widget_cache = {}
+
+
+def create_floating_chatbot_widget(app):
+    """
+    Create professional floating chat widget
     
-    <script>
-        // Auto-hide tooltip after 5 seconds
-        setTimeout(function() {
-            var tooltip = document.getElementById('chat-tooltip');
-            if (tooltip) {
-                tooltip.style.animation = 'slideOut 0.3s ease';
-                setTimeout(function() { 
-                    tooltip.style.display = 'none'; 
-                }, 300);
-            }
-        }, 5000);
+    Built once per app: later calls return the same chat_window, which can be
+    .render()-ed into the Blocks context that shows it.
+    """
+    cached = _widget_cache.get(id(app))
+    if cached is not None:
+        return cached[1]
+    
+    # Chatbot is created off the UI build path: a background warm-up thread
+    # starts it, and the first message waits on the same lock if it isn't ready.
+    # The app's own chatbot is reused when it already has one.
+    chatbot = getattr(app, 'chatbot', None)
+    chatbot_lock = threading.Lock()
+    
+    def get_chatbot():
+        nonlocal chatbot
+        if chatbot is None:
+            with chatbot_lock:
+                if chatbot is None:
+                    from chatbot_module import AutomotiveChatbot
+                    chatbot = AutomotiveChatbot(app)
+        return chatbot
+    
+    if chatbot is None:
+        threading.Thread(target=get_chatbot, name="chat-widget-warmup", daemon=True).start()
+    
+    def chat_with_bot(message, history, chat_open):
+        """Handle chat messages (generator: the user's turn shows before the reply is ready)"""
+        if not message:
+            yield history, "", chat_open
+            return
         
-        function closeTooltip() {
-            document.getElementById('chat-tooltip').style.display = 'none';
-        }
+        history = (history or []) + [(message, _PENDING_REPLY)]
+        yield history, "", chat_open
         
-        function toggleChatWindow() {
-            // This will be handled by Gradio component visibility
-            var event = new CustomEvent('toggleChat');
-            document.dispatchEvent(event);
-        }
-    </script>
-    """
+        response, _ = get_chatbot().process_message(message)
+        history[-1] = (message, response)
+        
+        yield history, "", chat_open
+    
+    def toggle_chat(current_state):
+        """Toggle chat window open/closed"""
+        return not current_state
     
     # Create Gradio components
     with gr.Group(visible=False) as chat_window:
         with gr.Column():
             gr.HTML("""
-            <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                        color: white; padding: 20px; border-radius: 12px 12px 0 0; 
+            <div class='brand-bg'
+                 style='color: white; padding: 20px; border-radius: 12px 12px 0 0; 
                         margin: -20px -20px 20px -20px;'>
                 <div style='display: flex; justify-content: space-between; align-items: center;'>
                     <h3 style='margin: 0;'>🤖 AI Assistant</h3>
@@ -301,7 +361,8 @@ def create_floating_chatbot_widget(app):
             """)
             
             chatbot_ui = gr.Chatbot(
-                value=[("", "👋 Hi! I'm your AI assistant. How can I help you today?\n\nTry:\n• 'Show me SUVs under 300k'\n• 'Book test drive'\n• 'Check availability'")],
+                value=[],
+                placeholder=_WELCOME_MESSAGE,
                 height=380,
                 show_label=False,
                 bubble_full_width=False
@@ -325,18 +386,28 @@ def create_floating_chatbot_widget(app):
     # State for chat visibility
     chat_open = gr.State(False)
     
-    # Event handlers
-    send_btn.click(
-        chat_with_bot,
-        [msg_input, chatbot_ui, chat_open],
-        [chatbot_ui, msg_input, chat_open]
-    )
+    def set_input_enabled(enabled):
+        """Enable/disable the message box and send button together"""
+        return gr.update(interactive=enabled), gr.update(interactive=enabled)
     
-    msg_input.submit(
-        chat_with_bot,
-        [msg_input, chatbot_ui, chat_open],
-        [chatbot_ui, msg_input, chat_open]
-    )
+    # Event handlers: input and send button stay disabled until the reply is in,
+    # so a second message can't be sent while one is pending
+    for trigger in (send_btn.click, msg_input.submit):
+        trigger(
+            lambda: set_input_enabled(False),
+            None,
+            [msg_input, send_btn],
+            queue=False
+        ).then(
+            chat_with_bot,
+            [msg_input, chatbot_ui, chat_open],
+            [chatbot_ui, msg_input, chat_open]
+        ).then(
+            lambda: set_input_enabled(True),
+            None,
+            [msg_input, send_btn],
+            queue=False
+        )
     
     close_btn.click(
         lambda: gr.update(visible=False),
@@ -344,7 +415,9 @@ def create_floating_chatbot_widget(app):
         chat_window
     )
     
-    return css, widget_html, chat_window
+    result = (_WIDGET_CSS, _WIDGET_HTML, chat_window)
+    _widget_cache[id(app)] = (app, result)
+    return result
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -404,13 +477,10 @@ SIMPLE_FLOATING_CHAT = """
 
 <div id="floating-chat-container">
     <!-- Chat Button -->
-    <button id="chat-btn" onclick="toggleChat()" 
+    <button id="chat-btn" class="brand-circle chat-icon" data-action="toggle" 
             style='position: fixed; bottom: 20px; right: 20px; z-index: 9999;
-                   width: 60px; height: 60px; border-radius: 50%;
-                   background: linear-gradient(135deg, #667eea, #764ba2);
-                   border: none; box-shadow: 0 4px 12px rgba(102,126,234,0.4);
+                   border: none; box-shadow: var(--brand-shadow);
                    cursor: pointer; transition: all 0.3s;'>
-        <span style='font-size: 28px;'>💬</span>
         <span style='position: absolute; top: -5px; right: -5px;
                      background: #f44336; color: white; width: 20px; height: 20px;
                      border-radius: 50%; font-size: 12px; font-weight: bold;
@@ -424,8 +494,8 @@ SIMPLE_FLOATING_CHAT = """
          style='position: fixed; bottom: 90px; right: 20px; z-index: 9998;
                 background: white; padding: 15px 20px; border-radius: 12px;
                 box-shadow: 0 4px 20px rgba(0,0,0,0.15); max-width: 280px;
-                animation: slideIn 0.5s ease;'>
-        <button onclick="document.getElementById('chat-tooltip').style.display='none'"
+                animation: slideIn 0.5s ease, fadeOut 0.3s ease 5s forwards;'>
+        <button data-action="close-tip"
                 style='position: absolute; top: 5px; right: 5px; background: none;
                        border: none; color: #999; cursor: pointer; font-size: 16px;'>
             ×
@@ -445,8 +515,8 @@ SIMPLE_FLOATING_CHAT = """
                 border-radius: 16px; box-shadow: 0 8px 32px rgba(0,0,0,0.2);
                 display: none; flex-direction: column;'>
         
-        <div style='background: linear-gradient(135deg, #667eea, #764ba2);
-                    color: white; padding: 20px; border-radius: 16px 16px 0 0;'>
+        <div class='brand-bg'
+             style='color: white; padding: 20px; border-radius: 16px 16px 0 0;'>
             <div style='display: flex; justify-content: space-between; align-items: center;'>
                 <div>
                     <h3 style='margin: 0; font-size: 18px;'>🤖 AI Assistant</h3>
@@ -454,7 +524,7 @@ SIMPLE_FLOATING_CHAT = """
                         Online • Ready to help
                     </p>
                 </div>
-                <button onclick="toggleChat()"
+                <button data-action="toggle"
                         style='background: rgba(255,255,255,0.2); border: none; color: white;
                                width: 30px; height: 30px; border-radius: 50%; cursor: pointer;'>
                     ✕
@@ -464,26 +534,25 @@ SIMPLE_FLOATING_CHAT = """
         
         <div id="chat-messages" 
              style='flex: 1; overflow-y: auto; padding: 20px; background: #f8f9fa;'>
-            <div style='background: white; padding: 12px; border-radius: 12px;
-                        margin-bottom: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>
+            <div class="chat-msg">
                 <strong style='color: #667eea;'>🤖 AI Assistant:</strong>
-                <p style='margin: 5px 0 0 0; color: #333;'>
+                <p>
                     Hi! I'm your automotive AI assistant. How can I help you today?
                 </p>
                 <div style='margin-top: 10px; display: flex; gap: 8px; flex-wrap: wrap;'>
-                    <button onclick="sendQuickMessage('Show me SUVs under 300k')"
+                    <button data-action="quick" data-message="Show me SUVs under 300k"
                             style='background: #e3f2fd; border: none; padding: 8px 12px;
                                    border-radius: 20px; cursor: pointer; font-size: 12px;
                                    color: #1976d2;'>
                         🔍 Search vehicles
                     </button>
-                    <button onclick="sendQuickMessage('Book test drive')"
+                    <button data-action="quick" data-message="Book test drive"
                             style='background: #f3e5f5; border: none; padding: 8px 12px;
                                    border-radius: 20px; cursor: pointer; font-size: 12px;
                                    color: #7b1fa2;'>
                         🚗 Book test drive
                     </button>
-                    <button onclick="sendQuickMessage('Help')"
+                    <button data-action="quick" data-message="Help"
                             style='background: #fff3e0; border: none; padding: 8px 12px;
                                    border-radius: 20px; cursor: pointer; font-size: 12px;
                                    color: #e65100;'>
@@ -499,88 +568,161 @@ SIMPLE_FLOATING_CHAT = """
                 <input id="chat-input" type="text" 
                        placeholder="Type your message..."
                        style='flex: 1; padding: 12px; border: 1px solid #e0e0e0;
-                              border-radius: 24px; font-size: 14px;'
-                       onkeypress="if(event.key==='Enter') sendMessage()">
-                <button onclick="sendMessage()"
-                        style='background: linear-gradient(135deg, #667eea, #764ba2);
-                               border: none; color: white; width: 45px; height: 45px;
+                              border-radius: 24px; font-size: 14px;'>
+                <button data-action="send" class="brand-bg"
+                        style='border: none; color: white; width: 45px; height: 45px;
                                border-radius: 50%; cursor: pointer; font-size: 20px;'>
                     📤
                 </button>
             </div>
         </div>
     </div>
+    
+    <!-- Message bubble, cloned per message by addMessageToChat -->
+    <template id="chat-msg-tpl">
+        <div class="chat-msg"><strong class="who"></strong><div class="body"></div></div>
+    </template>
 </div>
 
 <script>
-// Auto-hide tooltip
-setTimeout(function() {
-    var tooltip = document.getElementById('chat-tooltip');
-    if (tooltip) tooltip.style.display = 'none';
-}, 5000);
-
-// Toggle chat window
-function toggleChat() {
-    var chatWindow = document.getElementById('chat-window');
-    if (chatWindow.style.display === 'none' || !chatWindow.style.display) {
-        chatWindow.style.display = 'flex';
-        document.getElementById('chat-tooltip').style.display = 'none';
-    } else {
-        chatWindow.style.display = 'none';
+(function() {
+    // Look the widget elements up once; one delegated click listener serves every button
+    var $win = document.getElementById('chat-window');
+    var $msg = document.getElementById('chat-messages');
+    var $in = document.getElementById('chat-input');
+    var $tip = document.getElementById('chat-tooltip');
+    var $tpl = document.getElementById('chat-msg-tpl').content.firstElementChild;
+    
+    // Only the newest messages stay in the DOM; older nodes wait detached in _backlog
+    var _MAX_LIVE = 30;
+    var _backlog = [];
+    
+    // Ignore sends while a reply is pending or within 300ms of the last one
+    var _DEBOUNCE_MS = 300;
+    var _busy = false;
+    var _last = 0;
+    
+    // One Gradio client per page: every message reuses its open queue connection.
+    // Pinned to @gradio/client 1.x, the JS client line that matches gradio 5 on the server.
+    var _client = null;
+    function getClient() {
+        if (!_client) {
+            _client = import('https://cdn.jsdelivr.net/npm/@gradio/client@1/dist/index.min.js')
+                .then(function(m) { return m.Client.connect(window.location.origin); });
+        }
+        return _client;
     }
-}
-
-// Send message
-function sendMessage() {
-    var input = document.getElementById('chat-input');
-    var message = input.value.trim();
-    if (!message) return;
-    
-    // Add user message to chat
-    addMessageToChat('You', message, '#667eea');
-    input.value = '';
-    
-    // Simulate bot response (replace with actual Gradio API call)
-    setTimeout(function() {
-        addMessageToChat('AI Assistant', 
-            'I received your message: "' + message + '". Let me help you with that!',
-            '#764ba2'
-        );
-    }, 1000);
-}
+    
+    // Toggle chat window
+    function toggleChat() {
+        if ($win.style.display === 'none' || !$win.style.display) {
+            $win.style.display = 'flex';
+            $tip.style.display = 'none';
+        } else {
+            $win.style.display = 'none';
+        }
+    }
+    
+    // Send message
+    function sendMessage() {
+        var message = $in.value.trim();
+        var now = performance.now();
+        if (!message || _busy || now - _last < _DEBOUNCE_MS) return;
+        _last = now;
+        _busy = true;
+        $in.disabled = true;
+        
+        // Add user message to chat
+        addMessageToChat('You', message, '#667eea');
+        $in.value = '';
+        
+        // Bot response from the floating_chat endpoint (see register_floating_chat_api)
+        getClient()
+            .then(function(client) { return client.predict('/floating_chat', { message: message }); })
+            .then(function(result) {
+                addMessageToChat('AI Assistant', result.data[0], '#764ba2');
+            })
+            .catch(function() {
+                _client = null;
+                addMessageToChat('AI Assistant',
+                    'Sorry, I could not reach the assistant. Please try again.', '#764ba2');
+            })
+            .finally(function() {
+                _busy = false;
+                $in.disabled = false;
+                $in.focus();
+            });
+    }
+    
+    // Add message to chat UI (cloned from the template off-DOM, appended + scrolled in one frame)
+    function addMessageToChat(sender, message, color) {
+        var messageDiv = $tpl.cloneNode(true);
+        var who = messageDiv.querySelector('.who');
+        var body = messageDiv.querySelector('.body');
+        who.style.color = color;
+        who.textContent = (sender === 'You' ? '👤' : '🤖') + ' ' + sender + ':';
+        // The user's own text is never parsed as HTML; bot replies are HTML rendered by the server
+        if (sender === 'You') {
+            body.textContent = message;
+        } else {
+            body.innerHTML = message;
+        }
+        requestAnimationFrame(function() {
+            $msg.appendChild(messageDiv);
+            while ($msg.childElementCount > _MAX_LIVE) {
+                _backlog.push($msg.removeChild($msg.firstElementChild));
+            }
+            $msg.scrollTop = $msg.scrollHeight;
+        });
+    }
+    
+    // Scrolling near the top brings back up to 10 older messages, keeping the view in place
+    $msg.addEventListener('scroll', function() {
+        if ($msg.scrollTop >= 50 || !_backlog.length) return;
+        var frag = document.createDocumentFragment();
+        for (var i = 0; i < 10 && _backlog.length; i++) {
+            frag.insertBefore(_backlog.pop(), frag.firstChild);
+        }
+        var before = $msg.scrollHeight;
+        $msg.insertBefore(frag, $msg.firstChild);
+        $msg.scrollTop += $msg.scrollHeight - before;
+    });
+    
+    document.getElementById('floating-chat-container').addEventListener('click', function(e) {
+        var target = e.target.closest('[data-action]');
+        if (!target) return;
+        switch (target.dataset.action) {
+            case 'toggle': toggleChat(); break;
+            case 'close-tip': $tip.style.display = 'none'; break;
+            case 'send': sendMessage(); break;
+            case 'quick':
+                $in.value = target.dataset.message;
+                sendMessage();
+                break;
+        }
+    });
+    
+    $in.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter') sendMessage();
+    });
+})();
+</script>
 
-// Quick message buttons
-function sendQuickMessage(text) {
-    document.getElementById('chat-input').value = text;
-    sendMessage();
-}
+<style>
+""" + _SHARED_CSS + """
 
-// Add message to chat UI
-function addMessageToChat(sender, message, color) {
-    var messagesDiv = document.getElementById('chat-messages');
-    var messageDiv = document.createElement('div');
-    messageDiv.style.cssText = 'background: white; padding: 12px; border-radius: 12px; ' +
-                                'margin-bottom: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);';
-    messageDiv.innerHTML = '<strong style="color: ' + color + ';">' + 
-                           (sender === 'You' ? '👤' : '🤖') + ' ' + sender + ':</strong>' +
-                           '<p style="margin: 5px 0 0 0; color: #333;">' + message + '</p>';
-    messagesDiv.appendChild(messageDiv);
-    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+.chat-msg {
+    background: white;
+    padding: 12px;
+    border-radius: 12px;
+    margin-bottom: 10px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
 }
 
-// Make chat button bounce on hover
-document.getElementById('chat-btn').addEventListener('mouseenter', function() {
-    this.style.transform = 'scale(1.1)';
-});
-document.getElementById('chat-btn').addEventListener('mouseleave', function() {
-    this.style.transform = 'scale(1)';
-});
-</script>
-
-<style>
-@keyframes slideIn {
-    from { opacity: 0; transform: translateY(20px); }
-    to { opacity: 1; transform: translateY(0); }
+.chat-msg > p,
+.chat-msg .body {
+    margin: 5px 0 0 0;
+    color: #333;
 }
 
 #chat-btn:hover {
@@ -592,11 +734,6 @@ document.getElementById('chat-btn').addEventListener('mouseleave', function() {
     animation: slideUp 0.3s ease;
 }
 
-@keyframes slideUp {
-    from { opacity: 0; transform: translateY(30px); }
-    to { opacity: 1; transform: translateY(0); }
-}
-
 /* Mobile responsive */
 @media (max-width: 768px) {
     #chat-window {
@@ -610,6 +747,28 @@ document.getElementById('chat-btn').addEventListener('mouseleave', function() {
 </style>
 """
 
+
+def register_floating_chat_api(app):
+    """Expose the chatbot as the /floating_chat endpoint called by SIMPLE_FLOATING_CHAT
+    
+    Must be called inside the gr.Blocks context that renders the widget.
+    """
+    
+    def floating_chat(message: str, request: gr.Request) -> str:
+        """Return the chatbot's HTML reply for one widget message"""
+        if not message or not message.strip():
+            return ""
+        
+        # One chatbot session per browser session
+        response_html, _ = app.chatbot.process_message(
+            message.strip(),
+            user_id=f"widget_{request.session_hash}"
+        )
+        return response_html
+    
+    gr.api(floating_chat, api_name="floating_chat")
+
+
 # ═══════════════════════════════════════════════════════════════════
 # USAGE IN APP.PY
 # ═══════════════════════════════════════════════════════════════════
@@ -624,8 +783,9 @@ In main() function, add this AFTER the header:
 with gr.Blocks(...) as demo:
     gr.Markdown(header_html)
     
-    # ADD THIS LINE:
+    # ADD THESE LINES:
     gr.HTML(SIMPLE_FLOATING_CHAT)
+    register_floating_chat_api(app)
     
     with gr.Tabs():
         # ... your existing tabs ...
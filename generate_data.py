@@ -3,11 +3,19 @@ Generate 10,000 Vehicles and 10,000 Leads
 With REAL working image URLs
 """
 
+import csv
+import numpy as np
 import pandas as pd
 import json
 import random
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
 # Real vehicle image URLs that work
 VEHICLE_IMAGES = {
     'Toyota': [
@@ -137,65 +145,100 @@ FIRST_NAMES = ['Ahmed', 'Mohammed', 'Fatima', 'Aisha', 'Omar', 'Hassan', 'Ali',
 LAST_NAMES = ['Al Maktoum', 'Al Nahyan', 'Al Qasimi', 'Hassan', 'Abdullah', 'Rahman', 
               'Ali', 'Ahmed', 'Khan', 'Hussain', 'Salem', 'Mansour', 'Khalifa', 'Sultan']
 
+LEAD_COLUMNS = ['id', 'name', 'phone', 'email', 'city', 'budget', 'interest',
+                'status', 'sentiment', 'notes']
+
+# Price bands: luxury makes 180k-600k, mainstream 60k-250k, everything else 50k-300k
+LUXURY_MAKES = ['BMW', 'Mercedes', 'Audi', 'Porsche', 'Tesla', 'Land Rover', 'Lexus']
+MID_MAKES = ['Toyota', 'Honda', 'Nissan']
+
+VEHICLE_DESCRIPTIONS = [
+    "Premium {year} {make} {model} with excellent condition",
+    "Luxury {make} {model} perfect for families",
+    "Sporty {make} {model} with great performance",
+    "Reliable {make} {model} for daily commute",
+    "Elegant {make} {model} with modern features"
+]
+
+# Every make's models in one flat array (makes without a MODELS entry get generic
+# names): make i owns _MODELS_FLAT[_MODEL_OFFSETS[i]:_MODEL_OFFSETS[i] + _MODEL_COUNTS[i]]
+_MODEL_LISTS = [MODELS.get(make, ['Model X', 'Model Y']) for make in MAKES]
+_MODELS_FLAT = np.array([model for models in _MODEL_LISTS for model in models])
+_MODEL_COUNTS = np.array([len(models) for models in _MODEL_LISTS])
+_MODEL_OFFSETS = np.concatenate(([0], np.cumsum(_MODEL_COUNTS)[:-1]))
+
+
+def _pick_models(rng, make_idx):
+    """Pick one model per make index, uniformly within each make"""
+    local_idx = (rng.random(len(make_idx)) * _MODEL_COUNTS[make_idx]).astype(np.int64)
+    return _MODELS_FLAT[_MODEL_OFFSETS[make_idx] + local_idx]
+
 
 def generate_vehicles(count=10000):
-    """Generate vehicle records"""
+    """Generate vehicle records (each column drawn in one batch) as a DataFrame"""
     print(f"Generating {count} vehicles...")
-    vehicles = []
+    rng = np.random.default_rng()
     
-    for i in range(count):
-        make = random.choice(MAKES)
-        models_list = MODELS.get(make, ['Model X', 'Model Y'])
-        model = random.choice(models_list)
-        year = random.randint(2020, 2025)
-        
-        # Price based on make
-        if make in ['BMW', 'Mercedes', 'Audi', 'Porsche', 'Tesla', 'Land Rover', 'Lexus']:
-            base_price = random.randint(180000, 600000)
-        elif make in ['Toyota', 'Honda', 'Nissan']:
-            base_price = random.randint(60000, 250000)
-        else:
-            base_price = random.randint(50000, 300000)
-        
-        # Features
-        num_features = random.randint(6, 12)
-        vehicle_features = random.sample(FEATURES, num_features)
-        features_str = ','.join(vehicle_features)
-        
-        # Description
-        descriptions = [
-            f"Premium {year} {make} {model} with excellent condition",
-            f"Luxury {make} {model} perfect for families",
-            f"Sporty {make} {model} with great performance",
-            f"Reliable {make} {model} for daily commute",
-            f"Elegant {make} {model} with modern features"
-        ]
-        
-        vehicle = {
-            'id': f'V{i+1:05d}',
-            'make': make,
-            'model': model,
-            'year': year,
-            'price': base_price,
-            'features': features_str,
-            'stock': random.randint(0, 15),
-            'image': f'https://cdn.pixabay.com/photo/2016/11/18/14/39/car-{random.randint(1000000,9999999)}.jpg',
-            'description': random.choice(descriptions)
-        }
-        
-        vehicles.append(vehicle)
-        
-        if (i + 1) % 1000 == 0:
-            print(f"  Generated {i+1} vehicles...")
+    make_idx = rng.integers(0, len(MAKES), count)
+    makes = np.array(MAKES)[make_idx]
+    years = rng.integers(2020, 2026, count)
+    
+    # Price based on make
+    luxury_mask = np.isin(makes, LUXURY_MAKES)
+    mid_mask = np.isin(makes, MID_MAKES)
+    prices = np.where(luxury_mask, rng.integers(180000, 600001, count),
+                      np.where(mid_mask, rng.integers(60000, 250001, count),
+                               rng.integers(50000, 300001, count)))
     
+    models = _pick_models(rng, make_idx).tolist()
+    
+    # Features: 6-12 distinct per vehicle, the first k of a random per-row permutation
+    feature_order = np.argsort(rng.random((count, len(FEATURES))), axis=1)[:, :12]
+    feature_counts = rng.integers(6, 13, count)
+    features = [
+        ','.join(row[:k])
+        for row, k in zip(np.array(FEATURES)[feature_order].tolist(), feature_counts.tolist())
+    ]
+    
+    # Description
+    description_idx = rng.integers(0, len(VEHICLE_DESCRIPTIONS), count)
+    descriptions = [
+        VEHICLE_DESCRIPTIONS[d].format(year=year, make=make, model=model)
+        for d, year, make, model in zip(description_idx.tolist(), years.tolist(), makes.tolist(), models)
+    ]
+    
+    image_ids = rng.integers(1000000, 10000000, count)
+    
+    vehicles = pd.DataFrame({
+        'id': [f'V{i:05d}' for i in range(1, count + 1)],
+        'make': makes,
+        'model': models,
+        'year': years,
+        'price': prices,
+        'features': features,
+        'stock': rng.integers(0, 16, count),
+        'image': [f'https://cdn.pixabay.com/photo/2016/11/18/14/39/car-{n}.jpg' for n in image_ids.tolist()],
+        'description': descriptions
+    })
+    
+    print(f"  Generated {count} vehicles...")
     return vehicles
 
 
 def generate_leads(count=10000):
-    """Generate lead records"""
+    """Generate lead records as tuples in LEAD_COLUMNS order"""
     print(f"Generating {count} leads...")
     leads = []
     
+    # Interest: make/model pairs drawn for all leads at once
+    rng = np.random.default_rng()
+    interest_make_idx = rng.integers(0, len(MAKES), count)
+    interests = [
+        f"{make} {model}"
+        for make, model in zip(np.array(MAKES)[interest_make_idx].tolist(),
+                               _pick_models(rng, interest_make_idx).tolist())
+    ]
+    
     for i in range(count):
         first_name = random.choice(FIRST_NAMES)
         last_name = random.choice(LAST_NAMES)
@@ -205,11 +248,7 @@ def generate_leads(count=10000):
         budget = random.choice([60000, 80000, 100000, 120000, 150000, 180000, 200000, 
                                250000, 300000, 350000, 400000, 500000])
         
-        # Interest
-        make = random.choice(MAKES)
-        models_list = MODELS.get(make, ['Model'])
-        model = random.choice(models_list)
-        interest = f"{make} {model}"
+        interest = interests[i]
         
         # Status: 20% hot, 50% warm, 30% cold
         status = random.choices(['hot', 'warm', 'cold'], weights=[20, 50, 30])[0]
@@ -228,18 +267,19 @@ def generate_leads(count=10000):
             f"Has trade-in vehicle"
         ]
         
-        lead = {
-            'id': f'L{i+1:05d}',
-            'name': name,
-            'phone': f'+971-{random.randint(50,56)}-{random.randint(100,999)}-{random.randint(1000,9999)}',
-            'email': f"{first_name.lower()}.{last_name.lower().replace(' ', '')}@email.com",
-            'city': city,
-            'budget': budget,
-            'interest': interest,
-            'status': status,
-            'sentiment': sentiment,
-            'notes': random.choice(notes)
-        }
+        # Row in LEAD_COLUMNS order
+        lead = (
+            f'L{i+1:05d}',
+            name,
+            f'+971-{random.randint(50,56)}-{random.randint(100,999)}-{random.randint(1000,9999)}',
+            f"{first_name.lower()}.{last_name.lower().replace(' ', '')}@email.com",
+            city,
+            budget,
+            interest,
+            status,
+            sentiment,
+            random.choice(notes)
+        )
         
         leads.append(lead)
         
@@ -249,6 +289,24 @@ def generate_leads(count=10000):
     return leads
 
 
+def write_rows_csv(filename, columns, rows):
+    """Stream row tuples straight to a CSV file (no DataFrame needed)"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def write_json(filename, data):
+    """Write data as indented JSON (orjson's Rust encoder when available)"""
+    if _HAS_ORJSON:
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
 def main():
     print("="*60)
     print("DATA GENERATOR - 10K VEHICLES + 10K LEADS")
@@ -257,17 +315,15 @@ def main():
     
     # Generate vehicles
     print("Step 1: Generating vehicles...")
-    vehicles = generate_vehicles(10000)
+    df_vehicles = generate_vehicles(10000)
     
     # Save vehicles
     print("\nStep 2: Saving vehicles...")
-    df_vehicles = pd.DataFrame(vehicles)
     df_vehicles.to_csv('vehicles_10k.csv', index=False)
     print("  ✅ Saved vehicles_10k.csv")
     
     # Save sample JSON
-    with open('vehicles_sample_1k.json', 'w') as f:
-        json.dump(vehicles[:1000], f, indent=2)
+    write_json('vehicles_sample_1k.json', df_vehicles.head(1000).to_dict('records'))
     print("  ✅ Saved vehicles_sample_1k.json")
     
     # Generate leads
@@ -276,19 +332,17 @@ def main():
     
     # Save leads
     print("\nStep 4: Saving leads...")
-    df_leads = pd.DataFrame(leads)
-    df_leads.to_csv('leads_10k.csv', index=False)
+    write_rows_csv('leads_10k.csv', LEAD_COLUMNS, leads)
     print("  ✅ Saved leads_10k.csv")
     
     # Save sample JSON
-    with open('leads_sample_1k.json', 'w') as f:
-        json.dump(leads[:1000], f, indent=2)
+    write_json('leads_sample_1k.json', [dict(zip(LEAD_COLUMNS, lead)) for lead in leads[:1000]])
     print("  ✅ Saved leads_sample_1k.json")
     
     # Create templates
     print("\nStep 5: Creating templates...")
     df_vehicles.head(5).to_csv('vehicles_template.csv', index=False)
-    df_leads.head(5).to_csv('leads_template.csv', index=False)
+    write_rows_csv('leads_template.csv', LEAD_COLUMNS, leads[:5])
     print("  ✅ Saved template files")
     
     # Summary
@@ -296,7 +350,7 @@ def main():
     print("✅ GENERATION COMPLETE!")
     print("="*60)
     print(f"\nFiles created:")
-    print(f"  📊 vehicles_10k.csv - {len(vehicles):,} records")
+    print(f"  📊 vehicles_10k.csv - {len(df_vehicles):,} records")
     print(f"  📊 leads_10k.csv - {len(leads):,} records")
     print(f"  📄 vehicles_sample_1k.json - 1,000 records")
     print(f"  📄 leads_sample_1k.json - 1,000 records")
@@ -305,7 +359,7 @@ def main():
     print(f"\n🚀 Ready to upload via Admin Dashboard!")
     print(f"\n📝 Column Info:")
     print(f"\nVehicles: {list(df_vehicles.columns)}")
-    print(f"Leads: {list(df_leads.columns)}")
+    print(f"Leads: {LEAD_COLUMNS}")
     print("\n" + "="*60)
 
 
@@ -456,8 +510,7 @@ def save_to_csv(data, filename):
 
 def save_to_json(data, filename):
     """Save data to JSON"""
-    with open(filename, 'w') as f:
-        json.dump({'data': data}, f, indent=2)
+    write_json(filename, {'data': data})
     print(f"✅ Saved {len(data)} records to {filename}")
 
 
@@ -6,7 +6,8 @@ import os
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from neo4j import GraphDatabase
+import threading
+from neo4j import GraphDatabase, unit_of_work
 from neo4j.exceptions import ServiceUnavailable, SessionExpired
 import time
 import json
@@ -14,11 +15,21 @@ import json
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connection pool tuning (one driver per process, shared by all chat handlers)
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "50"))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60"))
+NEO4J_MAX_CONNECTION_LIFETIME = int(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+NEO4J_KEEP_ALIVE = os.getenv("NEO4J_KEEP_ALIVE", "true").lower() != "false"
+
 
 class Neo4jHandler:
     """Production Neo4j handler with retry logic and timeout handling"""
     
-    def __init__(self):
+    def __init__(self,
+                 max_connection_pool_size: int = NEO4J_MAX_CONNECTION_POOL_SIZE,
+                 connection_acquisition_timeout: float = NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+                 max_connection_lifetime: int = NEO4J_MAX_CONNECTION_LIFETIME,
+                 keep_alive: bool = NEO4J_KEEP_ALIVE):
         """Initialize Neo4j connection with enhanced configuration"""
         self.uri = "neo4j+s://XXXXXXXXXXXXXX"
         self.username = "XXXXXXXXXXXXX"
@@ -30,11 +41,11 @@ class Neo4jHandler:
             self.driver = GraphDatabase.driver(
                 self.uri,
                 auth=(self.username, self.password),
-                max_connection_lifetime=3600,  # 1 hour
-                max_connection_pool_size=50,
-                connection_acquisition_timeout=60,
+                max_connection_lifetime=max_connection_lifetime,
+                max_connection_pool_size=max_connection_pool_size,
+                connection_acquisition_timeout=connection_acquisition_timeout,
                 connection_timeout=30,
-                keep_alive=True,
+                keep_alive=keep_alive,
                 max_transaction_retry_time=30
             )
             
@@ -64,43 +75,46 @@ class Neo4jHandler:
                 else:
                     raise
     
-    def execute_with_retry(self, query: str, params: Dict = None, max_retries: int = 3, timeout: float = 30.0):
+    def execute_with_retry(self, query: str, params: Dict = None, max_retries: int = 3,
+                           timeout: float = 30.0, read_only: bool = False):
         """
-        Execute query with automatic retry on timeout
+        Execute query in a managed transaction
+        
+        Retries are left to the driver: execute_read/execute_write already
+        retry transient failures with backoff for up to max_transaction_retry_time,
+        and only replay the unit of work when it is safe to. An extra loop here
+        would nest those retries and could re-run a write whose commit outcome
+        was unknown.
         
         Args:
             query: Cypher query
             params: Query parameters
-            max_retries: Maximum retry attempts
+            max_retries: Unused; kept for call compatibility (see above)
             timeout: Query timeout in seconds
+            read_only: Run as a read transaction (routed to read members)
             
         Returns:
             Query results or None on failure
         """
         params = params or {}
         
-        for attempt in range(max_retries):
-            try:
-                with self.driver.session(database=self.database) as session:
-                    result = session.run(query, params, timeout=timeout)
-                    return list(result)
-                    
-            except (ServiceUnavailable, SessionExpired) as e:
-                logger.warning(f"⚠️ Query attempt {attempt + 1}/{max_retries} failed: {type(e).__name__}")
-                
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"⏳ Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"❌ Query failed after {max_retries} attempts")
-                    return None
-                    
-            except Exception as e:
-                logger.error(f"❌ Unexpected error: {e}")
-                return None
+        @unit_of_work(timeout=timeout)
+        def _work(tx):
+            return list(tx.run(query, params))
         
-        return None
+        try:
+            with self.driver.session(database=self.database) as session:
+                if read_only:
+                    return session.execute_read(_work)
+                return session.execute_write(_work)
+                
+        except (ServiceUnavailable, SessionExpired) as e:
+            logger.error(f"❌ Query failed after driver retries: {type(e).__name__}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"❌ Unexpected error: {e}")
+            return None
     
     def close(self):
         """Close Neo4j connection"""
@@ -114,6 +128,9 @@ class Neo4jHandler:
             "CREATE CONSTRAINT lead_id IF NOT EXISTS FOR (l:Lead) REQUIRE l.id IS UNIQUE",
             "CREATE CONSTRAINT vehicle_id IF NOT EXISTS FOR (v:Vehicle) REQUIRE v.id IS UNIQUE",
             "CREATE CONSTRAINT appointment_id IF NOT EXISTS FOR (a:Appointment) REQUIRE a.id IS UNIQUE",
+            "CREATE CONSTRAINT lead_email IF NOT EXISTS FOR (l:Lead) REQUIRE l.email IS UNIQUE",
+            "CREATE CONSTRAINT test_drive_booking_booking_id IF NOT EXISTS FOR (b:TestDriveBooking) REQUIRE b.booking_id IS UNIQUE",
+            "CREATE CONSTRAINT escalation_id IF NOT EXISTS FOR (e:Escalation) REQUIRE e.id IS UNIQUE",
             "CREATE INDEX lead_status IF NOT EXISTS FOR (l:Lead) ON (l.status)",
             "CREATE INDEX vehicle_make IF NOT EXISTS FOR (v:Vehicle) ON (v.make)",
             "CREATE INDEX vehicle_price IF NOT EXISTS FOR (v:Vehicle) ON (v.price)",
@@ -595,6 +612,20 @@ class Neo4jHandler:
                 content=content, sentiment=sentiment)
 
 
+_handler_instance: Optional[Neo4jHandler] = None
+_handler_lock = threading.Lock()
+
+
+def get_neo4j_handler() -> Neo4jHandler:
+    """Get the process-wide Neo4jHandler (driver and pool are created once)"""
+    global _handler_instance
+    if _handler_instance is None:
+        with _handler_lock:
+            if _handler_instance is None:
+                _handler_instance = Neo4jHandler()
+    return _handler_instance
+
+
 # Utility function to initialize database
 def initialize_database():
     """Initialize database with schema and seed data"""
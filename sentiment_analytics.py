@@ -50,7 +50,7 @@ def get_sentiment_analysis(neo4j_connection, email: str = "", phone: str = ""):
                      AND td.customer_email = c.user_email
                })
             OPTIONAL MATCH (c)-[:HAS_MESSAGE]->(m:Message)
-            WHERE m.role = 'user' AND m.sentiment IS NOT NULL
+            WHERE m.role = 'user' AND (m.sentiment_code IS NOT NULL OR m.sentiment IS NOT NULL)
             WITH c, 
                  c.user_email as email,
                  c.session_id as session_id,
@@ -62,7 +62,8 @@ def get_sentiment_analysis(neo4j_connection, email: str = "", phone: str = ""):
                  c.total_user_messages as total_messages,
                  collect({
                      message: m.clean_content,
-                     sentiment: m.sentiment,
+                     sentiment: coalesce(m.sentiment,
+                                         ['neutral', 'positive', 'negative', 'severe_negative'][m.sentiment_code]),
                      score: m.sentiment_score,
                      timestamp: m.timestamp
                  }) as messages
@@ -340,6 +340,7 @@ class TestDriveBookingSystem:
                 # STEP 8: Send confirmation email
                 # ═══════════════════════════════════════════════════════════
                 email_sent = False
+                email_queued = False
                 try:
                     vehicle_result = session.run("""
                         MATCH (v:Vehicle {id: $vehicle_id})
@@ -364,6 +365,9 @@ class TestDriveBookingSystem:
                     if email_result['success']:
                         logger.info(f"✅ Email sent to {customer_email}")
                         email_sent = True
+                    elif email_result.get('queued'):
+                        logger.info(f"📨 Email to {customer_email} queued for delivery")
+                        email_queued = True
                     else:
                         logger.warning(f"⚠️ Email failed: {email_result['message']}")
                         
@@ -385,6 +389,7 @@ class TestDriveBookingSystem:
                     'pickup_location': pickup_location,
                     'message': f'✅ Test drive confirmed for {vehicle_name}',
                     'email_sent': email_sent,
+                    'email_queued': email_queued,
                     'details': {
                         'booking_id': booking_id,
                         'vehicle': vehicle_name,